@@ -8,6 +8,7 @@ class MarketBanner {
         this.indices = [];
         this.currentDisplayMode = 'percentage'; // 'percentage' or 'absolute'
         this.updateInterval = null;
+        this.quoteStream = null;
         this.displayToggleInterval = null;
         this.isInitialized = false;
         
@@ -19,7 +20,9 @@ class MarketBanner {
         
         this.createBannerHTML();
         await this.fetchMarketData();
-        this.startUpdateCycle();
+        if (!this.startQuoteStream()) {
+            this.startUpdateCycle();
+        }
         this.startDisplayToggle();
         
         this.isInitialized = true;
@@ -210,11 +213,54 @@ class MarketBanner {
         }
     }
 
-    startUpdateCycle() {
-        // Update market data every 60 seconds
-        this.updateInterval = setInterval(async () => {
+    startQuoteStream() {
+        // Push updates from the server's shared quote feed instead of polling;
+        // falls back to the polling cycle if the browser or server can't stream
+        if (!window.EventSource) return false;
+
+        this.quoteStream = new EventSource('/stream/quotes?symbols=indices');
+        this.quoteStream.addEventListener('quotes', (event) => {
+            const quotes = JSON.parse(event.data);
+            let changed = false;
+            this.indices.forEach(index => {
+                const quote = quotes[index.symbol];
+                if (!quote) return;
+                index.currentPrice = quote.price;
+                index.change = quote.change;
+                index.changePercent = quote.changePercent;
+                changed = true;
+            });
+            if (changed) this.updateBannerDisplay();
+        });
+        this.quoteStream.onerror = () => {
+            if (this.quoteStream.readyState === EventSource.CLOSED) {
+                this.quoteStream = null;
+                this.startUpdateCycle();
+            }
+        };
+        return true;
+    }
+
+    async startUpdateCycle() {
+        // Update market data every 60 seconds while the market is open,
+        // and at the server's slower refresh cadence while it is closed
+        let delay = 60000;
+        try {
+            const response = await fetch('/market-status');
+            if (response.ok) {
+                const status = await response.json();
+                if (!status.open) {
+                    delay = Math.max(delay, status.refreshSeconds * 1000);
+                }
+            }
+        } catch (error) {
+            console.error('Error fetching market status:', error);
+        }
+
+        this.updateInterval = setTimeout(async () => {
             await this.fetchMarketData();
-        }, 60000); 
+            this.startUpdateCycle();
+        }, delay);
     }
 
     startDisplayToggle() {
@@ -226,8 +272,11 @@ class MarketBanner {
     }
 
     destroy() {
+        if (this.quoteStream) {
+            this.quoteStream.close();
+        }
         if (this.updateInterval) {
-            clearInterval(this.updateInterval);
+            clearTimeout(this.updateInterval);
         }
         if (this.displayToggleInterval) {
             clearInterval(this.displayToggleInterval);
@@ -55,4 +55,7 @@ CREATE TABLE stockstransactions (
     quantity INT DEFAULT 0,
     price DECIMAL(10, 2) DEFAULT 0.00,
     transaction_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Later schema changes (indexes, cache tables) live in server/migrations and are
+-- applied when the server starts (or with: python -m utils.migrations)
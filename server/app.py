@@ -1,13 +1,15 @@
 from flask import Flask
 from flask_cors import CORS
 from routes import portfolio_bp
-from db import init_db
+from db import DB_HEALTH_CHECK, init_db, release_request_db
+from config import CONFIG
 from flask import Flask, send_from_directory
 import os
 
 app = Flask(__name__, static_folder='../client')
 CORS(app)  # Enable CORS for all routes
 app.register_blueprint(portfolio_bp)
+app.teardown_appcontext(release_request_db)
 
 @app.route('/portfoliotable')
 def portfolio():
@@ -28,6 +30,32 @@ def serve_static(filename):
     return send_from_directory(app.static_folder, filename)
 
 
+def start_background_jobs():
+    """Start the jobs that keep caches warm outside of request handlers"""
+    if CONFIG.PRICE_REFRESHER_ENABLED:
+        from utils.price_refresher import PRICE_REFRESHER
+        PRICE_REFRESHER.start()
+    from utils.stock_metadata import METADATA_REFRESHER
+    METADATA_REFRESHER.start()
+    from utils.news import NEWS_REFRESHER
+    NEWS_REFRESHER.start()
+    DB_HEALTH_CHECK.start()
+    from utils.snapshots import SNAPSHOT_JOB
+    SNAPSHOT_JOB.start()
+    from utils.valuation import VALUATION_JOB
+    VALUATION_JOB.start()
+    if CONFIG.BACKUP_ENABLED:
+        from utils.backup import BACKUP_JOB
+        BACKUP_JOB.start()
+
+
 if __name__ == '__main__':
-    init_db()
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if CONFIG.MIGRATE_ON_STARTUP:
+        from utils.migrations import apply_migrations
+        apply_migrations()
+    else:
+        init_db().close()
+    # With debug=True the reloader imports this file twice; only the serving child runs jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_jobs()
+    app.run(debug=True, host='0.0.0.0', port=5000)
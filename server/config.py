@@ -9,12 +9,40 @@ class Config:
     # Finnhub API Configuration
     FINNHUB_API_TOKEN = os.getenv('FINNHUB_API_TOKEN', 'd296b71r01qhoena6e2gd296b71r01qhoena6e30')
     FINNHUB_BASE_URL = 'https://finnhub.io/api/v1'
+    FINNHUB_CALLS_PER_MINUTE = int(os.getenv('FINNHUB_CALLS_PER_MINUTE', 60))  # free tier quota
+    FINNHUB_BURST = int(os.getenv('FINNHUB_BURST', 30))  # free tier allows 30 calls/second
+    FINNHUB_TIMEOUT_SECONDS = float(os.getenv('FINNHUB_TIMEOUT_SECONDS', 5))
+    FINNHUB_QUEUE_SECONDS = float(os.getenv('FINNHUB_QUEUE_SECONDS', 3))  # request threads wait this long for quota
+    FINNHUB_WORKERS = int(os.getenv('FINNHUB_WORKERS', 16))
+    FINNHUB_CACHE_TTL_SECONDS = int(os.getenv('FINNHUB_CACHE_TTL_SECONDS', 900))
     
     # Database Configuration
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_USER = os.getenv('DB_USER', 'root')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'n3u3da!')
     DB_NAME = os.getenv('DB_NAME', 'bygdb')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # at most 32
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', 5))
+    DB_POOL_HEALTH_CHECK_SECONDS = int(os.getenv('DB_POOL_HEALTH_CHECK_SECONDS', 60))
+    # Read replicas: 'host[:port],host[:port]' (empty: every query goes to DB_HOST)
+    DB_REPLICA_HOSTS = os.getenv('DB_REPLICA_HOSTS', '')
+    DB_REPLICA_USER = os.getenv('DB_REPLICA_USER', DB_USER)
+    DB_REPLICA_PASSWORD = os.getenv('DB_REPLICA_PASSWORD', DB_PASSWORD)
+    DB_REPLICA_RETRY_SECONDS = int(os.getenv('DB_REPLICA_RETRY_SECONDS', 30))  # a failing replica sits out this long
+    DB_READ_PIN_SECONDS = float(os.getenv('DB_READ_PIN_SECONDS', 10))  # reads of a user who just wrote stay on the primary
+    TIMELINE_CACHE_MAX_USERS = int(os.getenv('TIMELINE_CACHE_MAX_USERS', 1024))  # per-user historical series kept in memory
+    MIGRATE_ON_STARTUP = os.getenv('MIGRATE_ON_STARTUP', '1') == '1'  # apply server/migrations at startup
+    
+    # Database backups (utils/backup.py): compressed per-table dumps written by a background job
+    BACKUP_ENABLED = os.getenv('BACKUP_ENABLED', '1') == '1'
+    BACKUP_DIR = os.getenv('BACKUP_DIR', os.path.join(os.path.dirname(__file__), 'data', 'backups'))
+    BACKUP_INTERVAL_SECONDS = int(os.getenv('BACKUP_INTERVAL_SECONDS', 24 * 3600))
+    BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', 7))  # newest backups kept, older ones are deleted
+    BACKUP_FETCH_ROWS = int(os.getenv('BACKUP_FETCH_ROWS', 10000))  # rows streamed per fetch while dumping
+    BACKUP_RESTORE_CHUNK_ROWS = int(os.getenv('BACKUP_RESTORE_CHUNK_ROWS', 200000))  # rows per LOAD DATA
+
+    # Firm-wide valuation (utils/valuation.py): every holding priced in one pass, served by /analytics/*
+    VALUATION_INTERVAL_SECONDS = int(os.getenv('VALUATION_INTERVAL_SECONDS', 15 * 60))
     
     # API Configuration
     API_BASE = 'http://localhost:5000'
@@ -23,6 +51,11 @@ class Config:
     SEARCH_DEBOUNCE_MS = 300
     MAX_SEARCH_RESULTS = 8
     MIN_SEARCH_LENGTH = 2
+    # Small seed listing shipped with the repo; the full Alpha Vantage LISTING_STATUS is downloaded next to it
+    SYMBOL_LISTING_PATH = os.getenv('SYMBOL_LISTING_PATH', os.path.join(os.path.dirname(__file__), 'data', 'listings.csv'))
+    SYMBOL_FULL_LISTING_PATH = os.getenv('SYMBOL_FULL_LISTING_PATH',
+                                         os.path.join(os.path.dirname(__file__), 'data', 'listings_full.csv'))
+    SYMBOL_LISTING_REFRESH_SECONDS = int(os.getenv('SYMBOL_LISTING_REFRESH_SECONDS', 7 * 24 * 3600))
     
     # Chart Configuration
     DEFAULT_CHART_PERIOD = '1D'
@@ -33,6 +66,12 @@ class Config:
     MAX_QUANTITY = 999999
     PRICE_DECIMAL_PLACES = 2
     
+    # Order queue: /trade enqueues, workers fill orders in group-committed batches
+    ORDER_WORKERS = int(os.getenv('ORDER_WORKERS', 4))  # each account always lands on the same worker
+    ORDER_BATCH_SIZE = int(os.getenv('ORDER_BATCH_SIZE', 100))  # orders per transaction
+    ORDER_BATCH_WAIT_MS = int(os.getenv('ORDER_BATCH_WAIT_MS', 5))  # how long a worker waits to fill a batch
+    ORDER_STATUS_MAX = int(os.getenv('ORDER_STATUS_MAX', 10000))  # finished orders kept for status lookups
+    
     # UI Configuration
     LOADING_TIMEOUT = 10000  # 10 seconds
     ERROR_DISPLAY_TIME = 5000  # 5 seconds
@@ -41,6 +80,56 @@ class Config:
     API_CALLS_PER_MINUTE = 5
     API_CALLS_PER_DAY = 500
 
+    # Quote Cache Configuration (TTLs in seconds)
+    QUOTE_CACHE_MAX_ENTRIES = int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', 2048))
+    QUOTE_TTL_LAST_PRICE = int(os.getenv('QUOTE_TTL_LAST_PRICE', 15))
+    QUOTE_TTL_FAST_INFO = int(os.getenv('QUOTE_TTL_FAST_INFO', 60))
+    QUOTE_TTL_INFO = int(os.getenv('QUOTE_TTL_INFO', 300))
+    QUOTE_TTL_HISTORY_7D = int(os.getenv('QUOTE_TTL_HISTORY_7D', 300))
+    HISTORY_MAX_TTL_SECONDS = int(os.getenv('HISTORY_MAX_TTL_SECONDS', 900))
+
+    # Market data fan-out (per-symbol calls run on a shared thread pool)
+    MARKET_DATA_WORKERS = int(os.getenv('MARKET_DATA_WORKERS', 8))
+    # Background warmers (metadata, logos) fetch on their own pool so request fan-outs never queue behind them
+    BACKGROUND_FETCH_WORKERS = int(os.getenv('BACKGROUND_FETCH_WORKERS', 2))
+    WALLET_DEADLINE_SECONDS = float(os.getenv('WALLET_DEADLINE_SECONDS', 3.0))
+
+    # Upstream market data: live, record (live + save every response) or replay (recorded responses only)
+    MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'live')
+    MARKET_DATA_REPLAY_DIR = os.getenv('MARKET_DATA_REPLAY_DIR', os.path.join(os.path.dirname(__file__), 'data', 'replay'))
+    # Simulated upstream latency per call in ms: '150' or 'download=800,history=300,default=100'
+    MARKET_DATA_REPLAY_LATENCY_MS = os.getenv('MARKET_DATA_REPLAY_LATENCY_MS', '0')
+    MARKET_DATA_REPLAY_JITTER_MS = int(os.getenv('MARKET_DATA_REPLAY_JITTER_MS', 0))
+
+    # Local daily price store (set PRICE_STORE_OFFLINE=1 to never call Yahoo)
+    PRICE_STORE_DIR = os.getenv('PRICE_STORE_DIR', os.path.join(os.path.dirname(__file__), 'data', 'prices'))
+    PRICE_STORE_OFFLINE = os.getenv('PRICE_STORE_OFFLINE', '0') == '1'
+    PRICE_STORE_REFRESH_SECONDS = int(os.getenv('PRICE_STORE_REFRESH_SECONDS', 900))
+
+    # Background price refresher (cadence depends on US market hours)
+    PRICE_REFRESHER_ENABLED = os.getenv('PRICE_REFRESHER_ENABLED', '1') == '1'
+    PRICE_REFRESH_OPEN_SECONDS = int(os.getenv('PRICE_REFRESH_OPEN_SECONDS', 15))
+    PRICE_REFRESH_CLOSED_SECONDS = int(os.getenv('PRICE_REFRESH_CLOSED_SECONDS', 900))
+    STREAM_HEARTBEAT_SECONDS = int(os.getenv('STREAM_HEARTBEAT_SECONDS', 15))
+
+    # Stock metadata (company name, sector, industry) kept in the stocks table
+    METADATA_REFRESH_SECONDS = int(os.getenv('METADATA_REFRESH_SECONDS', 3600))  # backfill cadence
+    METADATA_TTL_SECONDS = int(os.getenv('METADATA_TTL_SECONDS', 7 * 24 * 3600))  # full refresh
+    METADATA_FETCH_TIMEOUT_SECONDS = float(os.getenv('METADATA_FETCH_TIMEOUT_SECONDS', 60))
+
+    # Persistent logo cache (stock_logos table)
+    LOGO_TTL_SECONDS = int(os.getenv('LOGO_TTL_SECONDS', 30 * 24 * 3600))
+    LOGO_NEGATIVE_TTL_SECONDS = int(os.getenv('LOGO_NEGATIVE_TTL_SECONDS', 24 * 3600))  # symbols without a logo
+    LOGO_RETRY_SECONDS = int(os.getenv('LOGO_RETRY_SECONDS', 300))  # after a failed lookup (not stored)
+    LOGO_WARM_TIMEOUT_SECONDS = float(os.getenv('LOGO_WARM_TIMEOUT_SECONDS', 120))
+
+    # News (RSS feed + article images)
+    NEWS_REFRESH_SECONDS = int(os.getenv('NEWS_REFRESH_SECONDS', 300))
+    NEWS_IMAGE_WORKERS = int(os.getenv('NEWS_IMAGE_WORKERS', 8))
+    NEWS_ARTICLE_TIMEOUT_SECONDS = float(os.getenv('NEWS_ARTICLE_TIMEOUT_SECONDS', 10))
+    NEWS_IMAGE_DEADLINE_SECONDS = float(os.getenv('NEWS_IMAGE_DEADLINE_SECONDS', 5))
+    NEWS_IMAGE_TTL_SECONDS = int(os.getenv('NEWS_IMAGE_TTL_SECONDS', 24 * 3600))
+
 # Create a global config instance
 CONFIG = Config()
 
@@ -1,94 +1,334 @@
 import mysql.connector
-import subprocess
-from datetime import datetime
-import os 
-import glob
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+import threading
+import time
 
+from flask import g, has_app_context
 
-MYSQL_PATH = r"C:\Program Files\MySQL\MySQL Server 8.0\bin\mysql.exe"
-MYSQLDUMP_PATH = r"C:\Program Files\MySQL\MySQL Server 8.0\bin\mysqldump.exe"
+from config import CONFIG
+from utils.scheduler import PeriodicJob, register_job
 
-DB_HOST ='localhost'
-DB_USER ='root'
-DB_PASSWORD='n3u3da!'
-DB_NAME='bygdb'
 
-def init_db():
-    
-     return mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='n3u3da!',
-        database='bygdb'
-    )
-    
-    
-    # conn =  mysql.connector.connect(
-    #     host = DB_HOST,
-    #     user = DB_USER,
-    #     password = DB_PASSWORD,
-    # )
-    
-    # cursor = conn.cursor()
-    # cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
-    # cursor.close()
-    
-    # conn = mysql.connector.connect(
-    #     host = DB_HOST,
-    #     user = DB_USER,
-    #     password = DB_PASSWORD,
-    #     database = DB_NAME
-    # )
-    # cursor = conn.cursor()
-    # cursor.execute(f"USE {DB_NAME}")
-    
-    # cursor.execute("SHOW TABLES")
-    # tables = cursor.fetchall()
-    
-    # if not tables:
-    #  latest_dump = get_latest_dump()
-    #  if latest_dump:
-    #     try:
-    #          with open(latest_dump, "r") as dump_file:
-                 
-    #             subprocess.run(
-    #                 [MYSQL_PATH, 
-    #                 f"-u{DB_USER}", 
-    #                 f"-p{DB_PASSWORD}",
-    #                 "--binary-mode=1", 
-    #                 DB_NAME],
-    #                 stdin=dump_file,
-    #                 check=True
-    #             )
-    #     except subprocess.CalledProcessError as e:
-    #         print(f"Error importing dump file: {e}")
-    #     except FileNotFoundError:
-    #         print(f"Dump file not found: {latest_dump}")
-    
-    # return conn
-    
-    
-def get_latest_dump():
-    dump_dir = "./data/dumps"
-    dumps = [f for f in os.listdir(dump_dir) if f.endswith('.sql')]
-    if not dumps:
+class PoolTimeout(PoolError):
+    """No pooled connection became free within the checkout timeout"""
+
+
+class PooledConnection:
+    """
+    A connection checked out of ConnectionPool. close() hands it back to the pool
+    (and frees its slot) instead of closing the socket; everything else is the
+    underlying mysql connection.
+    """
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class RequestConnection(PooledConnection):
+    """The connection shared by everything in one Flask request; released at teardown"""
+
+    def close(self):
+        pass
+
+    def release(self):
+        PooledConnection.close(self)
+
+
+class ConnectionPool:
+    """
+    mysql.connector.pooling with a checkout timeout (the stock pool fails at once
+    when exhausted), periodic health checks of idle connections, and wait-time
+    and utilization counters. The underlying pool is created on first use so
+    importing this module never needs a database.
+    """
+
+    def __init__(self, size, timeout, name="bygdb", **connect_args):
+        # mysql.connector caps a pool at 32 connections
+        self.name = name
+        self.size = max(1, min(size, pooling.CNX_POOL_MAXSIZE))
+        self.timeout = timeout
+        self.connect_args = connect_args
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.health_checks = 0
+        self.health_failures = 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = pooling.MySQLConnectionPool(pool_name=self.name, pool_size=self.size,
+                                                         pool_reset_session=True, **self.connect_args)
+            return self._pool
+
+    def _checkout(self, timeout):
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No database connection free after {timeout}s ({self.size} in use)")
+        waited = time.monotonic() - started
+        try:
+            # The stock pool pings the connection and reconnects it if the server dropped it
+            conn = self._get_pool().get_connection()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return conn
+
+    def connect(self):
+        """A pooled connection; close() returns it to the pool"""
+        return PooledConnection(self._checkout(self.timeout), self)
+
+    def release(self, conn):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def health_check(self):
+        """Check out every idle connection (the pool pings each one), run SELECT 1, and return them"""
+        checked = []
+        try:
+            while len(checked) < self.size and self._slots.acquire(blocking=False):
+                try:
+                    conn = self._get_pool().get_connection()
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT 1")
+                    cursor.fetchall()
+                    cursor.close()
+                    checked.append(conn)
+                except Exception as e:
+                    self._slots.release()
+                    with self._lock:
+                        self.health_failures += 1
+                    print(f"Database health check failed: {e}")
+                    break
+        finally:
+            for conn in checked:
+                conn.close()
+                self._slots.release()
+            with self._lock:
+                self.health_checks += 1
+        return len(checked)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "inUse": self.in_use,
+                "peakInUse": self.peak_in_use,
+                "utilization": round(self.in_use / self.size, 3),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avgWaitMs": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "maxWaitMs": round(self.max_wait_seconds * 1000, 3),
+                "healthChecks": self.health_checks,
+                "healthFailures": self.health_failures,
+            }
+
+
+DB_POOL = ConnectionPool(
+    size=CONFIG.DB_POOL_SIZE,
+    timeout=CONFIG.DB_POOL_TIMEOUT_SECONDS,
+    host=CONFIG.DB_HOST,
+    user=CONFIG.DB_USER,
+    password=CONFIG.DB_PASSWORD,
+    database=CONFIG.DB_NAME,
+    # A request shares one connection; never let a half-read result block its next query
+    consume_results=True,
+)
+
+class ReplicaSet:
+    """
+    Pools of the read replicas, used round robin. A replica that cannot be reached
+    sits out for retry_seconds; with no replica available, reads go to the primary.
+    """
+
+    def __init__(self, pools, retry_seconds):
+        self.pools = pools
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._next = 0
+        self._down_until = {}   # pool name -> monotonic time it may be tried again
+        self.reads = 0
+        self.pinned_reads = 0
+        self.fallbacks = 0
+
+    def _candidates(self):
+        with self._lock:
+            now = time.monotonic()
+            start = self._next
+            self._next = (self._next + 1) % len(self.pools)
+            rotated = self.pools[start:] + self.pools[:start]
+            return [pool for pool in rotated if self._down_until.get(pool.name, 0) <= now]
+
+    def checkout(self):
+        """(connection, pool) from the next healthy replica, or None when there is none"""
+        for pool in self._candidates():
+            try:
+                conn = pool._checkout(pool.timeout)
+            except PoolTimeout:
+                continue  # busy, not broken
+            except Exception as e:
+                print(f"Read replica {pool.name} unavailable: {e}")
+                with self._lock:
+                    self._down_until[pool.name] = time.monotonic() + self.retry_seconds
+                continue
+            with self._lock:
+                self.reads += 1
+            return conn, pool
+        with self._lock:
+            self.fallbacks += 1
         return None
-    latest_dump = max(dumps, key=lambda x: os.path.getmtime(os.path.join(dump_dir, x)))
-    return os.path.join(dump_dir, latest_dump)
-    
-    
-
-def dump_db():
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    dump_file = f"./data/dumps/{timestamp}.sql"
-    subprocess.run(
-        [
-            "mysqldump",
-            "-u", "root",
-            "n3u3da!",  # or better: read from env var
-            "bygDB"
-        ],
-        stdout=open(dump_file, "w"),
-        check=True
-    )
-    
+
+    def count_pinned(self):
+        with self._lock:
+            self.pinned_reads += 1
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            down = {name for name, until in self._down_until.items() if until > now}
+            counters = {"reads": self.reads, "pinnedReads": self.pinned_reads, "fallbacks": self.fallbacks}
+        return {**counters, "replicas": {pool.name: {**pool.stats(), "down": pool.name in down}
+                                         for pool in self.pools}}
+
+
+class PrimaryPins:
+    """
+    Users who wrote in the last `window` seconds. Their reads stay on the primary
+    until a replica has certainly applied the write (read-your-writes). In-process
+    only, like the rest of the server's state.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._until = {}   # user id -> monotonic expiry
+
+    def pin(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._until[str(user_id)] = now + self.window
+            if len(self._until) > 1024:
+                self._until = {user: until for user, until in self._until.items() if until > now}
+
+    def pinned(self, user_id):
+        with self._lock:
+            until = self._until.get(str(user_id))
+        return until is not None and until > time.monotonic()
+
+
+def replica_pools(hosts):
+    """A ConnectionPool per 'host[:port]' in a comma separated list"""
+    pools = []
+    for host in filter(None, (host.strip() for host in hosts.split(","))):
+        hostname, _, port = host.partition(":")
+        pools.append(ConnectionPool(
+            size=CONFIG.DB_POOL_SIZE,
+            timeout=CONFIG.DB_POOL_TIMEOUT_SECONDS,
+            name=f"bygdb-replica-{len(pools) + 1}",
+            host=hostname,
+            port=int(port or 3306),
+            user=CONFIG.DB_REPLICA_USER,
+            password=CONFIG.DB_REPLICA_PASSWORD,
+            database=CONFIG.DB_NAME,
+            consume_results=True,
+        ))
+    return pools
+
+
+REPLICAS = ReplicaSet(replica_pools(CONFIG.DB_REPLICA_HOSTS), CONFIG.DB_REPLICA_RETRY_SECONDS)
+PRIMARY_PINS = PrimaryPins(CONFIG.DB_READ_PIN_SECONDS)
+
+
+def check_pools():
+    for pool in [DB_POOL] + REPLICAS.pools:
+        pool.health_check()
+
+
+DB_HEALTH_CHECK = register_job(PeriodicJob("db-health-check", check_pools,
+                                           CONFIG.DB_POOL_HEALTH_CHECK_SECONDS, run_immediately=False))
+
+
+def init_db():
+    """
+    A pooled connection to the primary. Inside a Flask request every call returns
+    the same connection, and close() leaves it open until the request's teardown;
+    elsewhere (background jobs, CLIs) close() returns it to the pool.
+    """
+    if has_app_context():
+        if "db_conn" not in g:
+            g.db_conn = RequestConnection(DB_POOL._checkout(DB_POOL.timeout), DB_POOL)
+        return g.db_conn
+    return DB_POOL.connect()
+
+
+def init_read_db(user_id=None):
+    """
+    A connection for read-only queries: a read replica when any are configured
+    (DB_REPLICA_HOSTS), the primary otherwise, when none is reachable, or when
+    user_id wrote within the last DB_READ_PIN_SECONDS (see pin_to_primary).
+    Shared and released like init_db().
+    """
+    if not REPLICAS.pools:
+        return init_db()
+    if user_id is not None and PRIMARY_PINS.pinned(user_id):
+        REPLICAS.count_pinned()
+        return init_db()
+    if has_app_context() and "db_read_conn" in g:
+        return g.db_read_conn
+    checked_out = REPLICAS.checkout()
+    if checked_out is None:
+        return init_db()
+    if has_app_context():
+        g.db_read_conn = RequestConnection(*checked_out)
+        return g.db_read_conn
+    return PooledConnection(*checked_out)
+
+
+def pin_to_primary(user_id):
+    """Call after committing a write for user_id, so their next reads see it"""
+    PRIMARY_PINS.pin(user_id)
+
+
+def release_request_db(exception=None):
+    """Flask teardown hook: hand the request's connections back to their pools"""
+    for key in ("db_conn", "db_read_conn"):
+        conn = g.pop(key, None)
+        if conn is not None:
+            conn.release()
+
+
+def connect_direct(**options):
+    """
+    A dedicated connection outside the pool, for long jobs (backups, restores) that
+    would otherwise hold a pooled connection for minutes. Close it when done.
+    """
+    return mysql.connector.connect(host=CONFIG.DB_HOST, user=CONFIG.DB_USER, password=CONFIG.DB_PASSWORD,
+                                   database=CONFIG.DB_NAME, **options)
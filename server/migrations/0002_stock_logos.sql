@@ -0,0 +1,6 @@
+-- Persistent logo cache (utils/logo_cache.py); logo_url NULL means "no logo found"
+CREATE TABLE IF NOT EXISTS stock_logos (
+    symbol VARCHAR(10) PRIMARY KEY,
+    logo_url VARCHAR(255) NULL,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,57 @@
+-- One stocks row per symbol: point duplicate rows' holdings at the oldest row, then drop the duplicates.
+-- stock_canonical maps every row of a duplicated symbol (the kept one included) to the kept id.
+DROP TEMPORARY TABLE IF EXISTS stock_canonical, holding_merge, holding_survivor;
+
+CREATE TEMPORARY TABLE stock_canonical AS
+SELECT s.id AS stock_id, d.keep_id
+FROM stocks s
+JOIN (SELECT symbol, MIN(id) AS keep_id FROM stocks GROUP BY symbol HAVING COUNT(*) > 1) d ON d.symbol = s.symbol;
+
+-- A portfolio holding the same symbol under several stocks rows would break
+-- UNIQUE (portfolios_id, stock_id) once re-pointed: merge those holdings into the
+-- oldest one first (summed quantity, quantity-weighted average cost, all transactions)
+CREATE TEMPORARY TABLE holding_merge AS
+SELECT sp.id AS holding_id, sp.portfolios_id, c.keep_id, sp.quantity, sp.average_cost
+FROM stocksportfolios sp
+JOIN stock_canonical c ON sp.stock_id = c.stock_id;
+
+CREATE TEMPORARY TABLE holding_survivor AS
+SELECT portfolios_id, keep_id, MIN(holding_id) AS survivor_id, SUM(quantity) AS quantity,
+       COALESCE(SUM(quantity * average_cost) / NULLIF(SUM(quantity), 0), 0) AS average_cost
+FROM holding_merge
+GROUP BY portfolios_id, keep_id
+HAVING COUNT(*) > 1;
+
+UPDATE stockstransactions t
+JOIN holding_merge m ON t.stocksportfolios_id = m.holding_id
+JOIN holding_survivor h ON h.portfolios_id = m.portfolios_id AND h.keep_id = m.keep_id
+SET t.stocksportfolios_id = h.survivor_id
+WHERE m.holding_id <> h.survivor_id;
+
+UPDATE stocksportfolios sp
+JOIN holding_survivor h ON sp.id = h.survivor_id
+SET sp.quantity = h.quantity, sp.average_cost = ROUND(h.average_cost, 2);
+
+DELETE sp FROM stocksportfolios sp
+JOIN holding_merge m ON sp.id = m.holding_id
+JOIN holding_survivor h ON h.portfolios_id = m.portfolios_id AND h.keep_id = m.keep_id
+WHERE sp.id <> h.survivor_id;
+
+UPDATE stocksportfolios sp
+JOIN stock_canonical c ON sp.stock_id = c.stock_id
+SET sp.stock_id = c.keep_id
+WHERE sp.stock_id <> c.keep_id;
+
+DELETE s FROM stocks s
+JOIN stock_canonical c ON s.id = c.stock_id
+WHERE s.id <> c.keep_id;
+
+DROP TEMPORARY TABLE stock_canonical, holding_merge, holding_survivor;
+
+-- buy/sell, search and the company-name lookups find stocks by symbol
+ALTER TABLE stocks ADD UNIQUE KEY uq_stocks_symbol (symbol);
+
+-- Every historical endpoint and /transactions reads one portfolio's transactions by date;
+-- the trailing columns make the index covering for the historical queries
+CREATE INDEX idx_transactions_holding_date
+    ON stockstransactions (stocksportfolios_id, transaction_date, transaction_type, quantity, price);
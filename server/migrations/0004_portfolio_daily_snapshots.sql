@@ -0,0 +1,12 @@
+-- End-of-day value of every user's portfolio, appended by the daily-snapshots job
+-- (utils/snapshots.py). The primary key makes a user's history one range scan.
+CREATE TABLE IF NOT EXISTS portfolio_daily_snapshots (
+    user_id INT NOT NULL,
+    snapshot_date DATE NOT NULL,
+    market_value DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    cost_basis DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    cash_balance DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, snapshot_date),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
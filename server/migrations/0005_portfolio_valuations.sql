@@ -0,0 +1,26 @@
+-- Latest valuation of every user's account and the firm-wide exposure per symbol,
+-- rewritten by the portfolio-valuation job (utils/valuation.py) from one pass over
+-- all holdings; rows a run did not touch (valued_at older than the run) are deleted.
+CREATE TABLE IF NOT EXISTS portfolio_valuations (
+    user_id INT NOT NULL PRIMARY KEY,
+    valued_at DATETIME NOT NULL,
+    market_value DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    cost_basis DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    cash_balance DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    gain_loss DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    return_pct DECIMAL(10, 4) NULL,
+    positions INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    -- The leaderboard reads the top of this index
+    INDEX idx_valuations_return (return_pct)
+);
+
+CREATE TABLE IF NOT EXISTS symbol_exposure (
+    symbol VARCHAR(10) NOT NULL PRIMARY KEY,
+    valued_at DATETIME NOT NULL,
+    quantity BIGINT NOT NULL DEFAULT 0,
+    price DECIMAL(14, 4) NULL,
+    market_value DECIMAL(16, 2) NOT NULL DEFAULT 0.00,
+    holders INT NOT NULL DEFAULT 0,
+    INDEX idx_exposure_value (market_value)
+);
@@ -0,0 +1,3 @@
+-- When utils/stock_metadata.py last fetched a row's metadata, so a symbol whose real
+-- sector or industry is 'Unknown' is not refetched by every backfill run
+ALTER TABLE stocks ADD COLUMN metadata_checked_at TIMESTAMP NULL;
@@ -0,0 +1,201 @@
+# SQL for the request paths that run on every page load or trade.
+# utils/query_plans.py EXPLAINs each entry of HOT_QUERIES, so a query added here is
+# checked against full table scans; keep the routes using these constants.
+
+ACCOUNT_BALANCE = "SELECT balance FROM accounts WHERE user_id = %s"
+
+WALLET_HOLDINGS = """
+    SELECT s.symbol, sp.quantity, sp.average_cost AS avg_cost, s.company_name, s.sector, s.industry
+    FROM accounts a
+    INNER JOIN portfolios p ON a.id = p.account_id
+    JOIN stocksportfolios sp ON p.id = sp.portfolios_id
+    JOIN stocks s ON sp.stock_id = s.id
+    WHERE a.user_id = %s AND sp.quantity > 0
+    ORDER BY s.symbol
+"""
+
+STOCK_ID_BY_SYMBOL = "SELECT id FROM stocks WHERE symbol = %s"
+
+# Trade engine (utils/trade_engine.py): one locking read of the account row, its
+# portfolio and the traded holding (if any), so concurrent trades on an account queue up
+TRADE_ACCOUNT_FOR_UPDATE = """
+    SELECT a.id AS account_id, a.balance, p.id AS portfolio_id,
+           sp.id AS holding_id, sp.quantity, sp.average_cost
+    FROM accounts a
+    JOIN portfolios p ON p.account_id = a.id
+    LEFT JOIN stocksportfolios sp ON sp.portfolios_id = p.id AND sp.stock_id = %s
+    WHERE a.user_id = %s
+    ORDER BY p.id
+    LIMIT 1
+    FOR UPDATE
+"""
+
+INSERT_STOCK = """
+    INSERT INTO stocks (symbol, company_name, sector, industry) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+"""
+
+INSERT_HOLDING = "INSERT INTO stocksportfolios (portfolios_id, stock_id, quantity, average_cost) VALUES (%s, %s, %s, %s)"
+
+UPDATE_HOLDING = "UPDATE stocksportfolios SET quantity = %s, average_cost = %s WHERE id = %s"
+
+UPDATE_BALANCE = "UPDATE accounts SET balance = %s WHERE id = %s"
+
+INSERT_TRANSACTION = """
+    INSERT INTO stockstransactions (stocksportfolios_id, transaction_type, quantity, price, transaction_date)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Whether a commit whose outcome is unknown went through (utils/order_queue.py)
+TRANSACTION_EXISTS = "SELECT id FROM stockstransactions WHERE id = %s"
+
+# Bulk import (utils/trade_import.py): the account row and every holding of its portfolio
+IMPORT_ACCOUNT_FOR_UPDATE = """
+    SELECT a.id AS account_id, a.balance, p.id AS portfolio_id
+    FROM accounts a
+    JOIN portfolios p ON p.account_id = a.id
+    WHERE a.user_id = %s
+    ORDER BY p.id
+    LIMIT 1
+    FOR UPDATE
+"""
+
+PORTFOLIO_HOLDINGS_FOR_UPDATE = """
+    SELECT sp.id, s.symbol, sp.quantity, sp.average_cost
+    FROM stocksportfolios sp
+    JOIN stocks s ON sp.stock_id = s.id
+    WHERE sp.portfolios_id = %s
+    FOR UPDATE
+"""
+
+UPSERT_HOLDING = """
+    INSERT INTO stocksportfolios (portfolios_id, stock_id, quantity, average_cost) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE quantity = VALUES(quantity), average_cost = VALUES(average_cost)
+"""
+
+# A user's trades; utils/transactions.py appends filters, the keyset condition and
+# USER_TRANSACTIONS_ORDER (newest first, id breaking ties so pages never overlap)
+USER_TRANSACTIONS = """
+    SELECT
+        st.id AS transaction_id,
+        st.transaction_type,
+        st.quantity,
+        st.price,
+        st.transaction_date,
+        s.symbol,
+        s.company_name,
+        s.sector,
+        s.industry
+    FROM stockstransactions st
+    JOIN stocksportfolios sp ON st.stocksportfolios_id = sp.id
+    JOIN stocks s ON sp.stock_id = s.id
+    JOIN portfolios p ON sp.portfolios_id = p.id
+    JOIN accounts a ON p.account_id = a.id
+    WHERE a.user_id = %s
+"""
+
+USER_TRANSACTIONS_ORDER = " ORDER BY st.transaction_date DESC, st.id DESC"
+
+SNAPSHOT_RANGE = """
+    SELECT snapshot_date, market_value, cost_basis, cash_balance
+    FROM portfolio_daily_snapshots
+    WHERE user_id = %s AND snapshot_date BETWEEN %s AND %s
+    ORDER BY snapshot_date
+"""
+
+# Identity of a user's timeline (utils/timeline_cache.py): it changes with every trade
+LATEST_TRANSACTION_ID = """
+    SELECT MAX(t.id) AS latest_id
+    FROM stockstransactions t
+    JOIN stocksportfolios sp ON t.stocksportfolios_id = sp.id
+    JOIN portfolios p ON sp.portfolios_id = p.id
+    JOIN accounts a ON p.account_id = a.id
+    WHERE a.user_id = %s
+"""
+
+# Earliest trade date among transactions newer than a given id (imports may be backdated)
+FIRST_TRADE_AFTER = """
+    SELECT MIN(t.transaction_date) AS first_date
+    FROM stockstransactions t
+    JOIN stocksportfolios sp ON t.stocksportfolios_id = sp.id
+    JOIN portfolios p ON sp.portfolios_id = p.id
+    JOIN accounts a ON p.account_id = a.id
+    WHERE a.user_id = %s AND t.id > %s
+"""
+
+# Net amount a user put into stocks since a date (buys minus sell proceeds)
+NET_INVESTED_SINCE = """
+    SELECT COALESCE(SUM(CASE WHEN t.transaction_type = 'buy' THEN t.quantity * t.price
+                             ELSE -t.quantity * t.price END), 0) AS net_invested
+    FROM stockstransactions t
+    JOIN stocksportfolios sp ON t.stocksportfolios_id = sp.id
+    JOIN portfolios p ON sp.portfolios_id = p.id
+    JOIN accounts a ON p.account_id = a.id
+    WHERE a.user_id = %s AND t.transaction_date >= %s
+"""
+
+# Every trade of every user (batch jobs only; add "AND a.user_id IN (...)" for a subset)
+LEDGER = """
+    SELECT a.user_id, s.symbol, t.transaction_type, t.quantity, t.price, t.transaction_date
+    FROM stockstransactions t
+    JOIN stocksportfolios sp ON t.stocksportfolios_id = sp.id
+    JOIN portfolios p ON sp.portfolios_id = p.id
+    JOIN accounts a ON p.account_id = a.id
+    JOIN stocks s ON sp.stock_id = s.id
+    WHERE a.user_id IS NOT NULL
+"""
+
+ACCOUNT_BALANCES = "SELECT user_id, balance FROM accounts WHERE user_id IS NOT NULL"
+
+# Every user's cost basis on one day (the nightly append continues from it)
+SNAPSHOT_COST_ON = "SELECT user_id, cost_basis FROM portfolio_daily_snapshots WHERE snapshot_date = %s"
+
+# Every open holding of every user (the valuation job's one pass over stocksportfolios)
+ALL_HOLDINGS = """
+    SELECT a.user_id, s.symbol, sp.quantity, sp.average_cost
+    FROM stocksportfolios sp
+    JOIN portfolios p ON sp.portfolios_id = p.id
+    JOIN accounts a ON p.account_id = a.id
+    JOIN stocks s ON sp.stock_id = s.id
+    WHERE a.user_id IS NOT NULL AND sp.quantity > 0
+"""
+
+VALUATION_TOTALS = """
+    SELECT COUNT(*) AS accounts, SUM(market_value) AS market_value, SUM(cash_balance) AS cash_balance,
+           SUM(cost_basis) AS cost_basis, SUM(gain_loss) AS gain_loss, MAX(valued_at) AS valued_at
+    FROM portfolio_valuations
+"""
+
+SYMBOL_EXPOSURE = """
+    SELECT symbol, quantity, price, market_value, holders, valued_at
+    FROM symbol_exposure
+    ORDER BY market_value DESC
+    LIMIT %s
+"""
+
+LEADERBOARD = """
+    SELECT v.user_id, u.username, u.name, v.market_value, v.cost_basis, v.gain_loss, v.return_pct, v.positions
+    FROM portfolio_valuations v
+    JOIN users u ON u.id = v.user_id
+    WHERE v.return_pct IS NOT NULL
+    ORDER BY v.return_pct DESC
+    LIMIT %s
+"""
+
+# name -> (sql, sample parameters used for EXPLAIN)
+HOT_QUERIES = {
+    "account_balance": (ACCOUNT_BALANCE, (1,)),
+    "wallet_holdings": (WALLET_HOLDINGS, (1,)),
+    "stock_id_by_symbol": (STOCK_ID_BY_SYMBOL, ("AAPL",)),
+    "trade_account_for_update": (TRADE_ACCOUNT_FOR_UPDATE, (1, 1)),
+    "portfolio_holdings_for_update": (PORTFOLIO_HOLDINGS_FOR_UPDATE, (1,)),
+    "user_transactions": (USER_TRANSACTIONS + USER_TRANSACTIONS_ORDER + " LIMIT 50", (1,)),
+    "user_transactions_by_symbol": (USER_TRANSACTIONS + " AND s.symbol = %s" + USER_TRANSACTIONS_ORDER + " LIMIT 50",
+                                    (1, "AAPL")),
+    "snapshot_range": (SNAPSHOT_RANGE, (1, "2025-01-01", "2025-12-31")),
+    "net_invested_since": (NET_INVESTED_SINCE, (1, "2025-01-01")),
+    "latest_transaction_id": (LATEST_TRANSACTION_ID, (1,)),
+    "first_trade_after": (FIRST_TRADE_AFTER, (1, 0)),
+    "symbol_exposure": (SYMBOL_EXPOSURE, (20,)),
+    "leaderboard": (LEADERBOARD, (20,)),
+}
@@ -1,23 +1,41 @@
-from flask import Blueprint, request, jsonify
-import yfinance as yf
-import requests
-import os
-from datetime import datetime, timedelta
-from db import init_db, dump_db
-from time import sleep
-import pandas as pd
-from decimal import Decimal
-import feedparser
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from db import DB_POOL, REPLICAS, init_read_db
+import time
 # import API keys from Python config
 from config import CONFIG, RANDOM_STOCKS
+import queries
 import random
+from utils.market_data import (
+    MARKET_DATA_POOL, MARKET_INDICES, get_history, get_ticker_info, get_fast_info, get_recent_closes,
+    get_last_known_closes, fetch_concurrently, compute_wallet_frame
+)
+from utils.quote_cache import QUOTE_CACHE
+from utils.price_refresher import PRICE_REFRESHER, is_market_open, refresh_interval
+from utils.quote_stream import QUOTE_FEED, stream_quotes
+from utils.market_provider import get_provider
+from utils.scheduler import JOBS
+from utils.stock_metadata import METADATA_REFRESHER
+from utils.logo_cache import get_logo
+from utils.finnhub_client import FINNHUB
+from utils.news import DEFAULT_NEWS_SYMBOLS, get_news_snapshot
+from utils.symbol_index import search_symbols
+from utils.downsample import lttb_indices
+from utils.snapshots import get_daily_series
+from utils.timeline_cache import TIMELINES
+from utils.order_queue import ORDER_QUEUE
+from utils.backup import BACKUP_JOB, list_backups
+from utils.trade_engine import STOCK_IDS
+from utils.valuation import VALUATION_JOB
+from utils.trade_import import ImportRejected, import_fills, parse_fills, read_fills
+from utils.transactions import (
+    iter_rows, json_array, ndjson, parse_transaction_filters, split_page, transactions_query
+)
 
 portfolio_bp = Blueprint('portfolio', __name__)
 
-# API config from Python config file
-ALPHA_VANTAGE_API_KEY = CONFIG.ALPHA_VANTAGE_API_KEY
-ALPHA_VANTAGE_BASE_URL = CONFIG.ALPHA_VANTAGE_BASE_URL
-FINNHUB_TOKEN = CONFIG.FINNHUB_API_TOKEN
+# Longest an order status request may wait for the order to finish
+ORDER_STATUS_MAX_WAIT_SECONDS = 30
+
 
 
 #get all users from users table
@@ -25,7 +43,7 @@ FINNHUB_TOKEN = CONFIG.FINNHUB_API_TOKEN
 def get_users():
     """Get all users from the users table"""
     try:
-        conn = init_db()
+        conn = init_read_db()
         cursor = conn.cursor(dictionary=True)
         cursor.execute("SELECT * FROM users")
         
@@ -45,14 +63,14 @@ def get_users():
 def get_balance():
     # Implementation for getting portfolio balance
     try:
-        conn = init_db()
+        conn = init_read_db(request.args.get('user_id'))
         cursor = conn.cursor(dictionary=True)
         user_id = request.args.get('user_id')
         
         if not user_id:
             return jsonify({"error": "user_id is required"}), 400
            
-        cursor.execute("SELECT balance FROM accounts WHERE user_id = %s", (user_id,))
+        cursor.execute(queries.ACCOUNT_BALANCE, (user_id,))
         result = cursor.fetchone()
         
         cursor.close()
@@ -75,7 +93,7 @@ def get_balance():
 def get_total_portfolio_value():
     """Get total portfolio value for a user"""
     try:
-        conn = init_db()
+        conn = init_read_db(request.args.get('user_id'))
         cursor = conn.cursor(dictionary=True)
         user_id = request.args.get('user_id')
         
@@ -107,23 +125,15 @@ def get_total_portfolio_value():
 def get_wallet():
     """Get user's wallet/portfolio with current stock prices"""
     try:
-        conn = init_db()
+        conn = init_read_db(request.args.get('user_id'))
         cursor = conn.cursor(dictionary=True)
         user_id = request.args.get('user_id')
         
         if not user_id:
             return jsonify({"error": "user_id is required"}), 400
         
-        # Get user's stock portfolio with symbol, quantity, avg_cost, company_name
-        cursor.execute("""
-            SELECT s.symbol, sp.quantity, sp.average_cost AS avg_cost, s.company_name
-            FROM accounts a  
-            INNER JOIN portfolios p ON a.id = p.account_id
-            JOIN stocksportfolios sp ON p.id = sp.portfolios_id
-            JOIN stocks s ON sp.stock_id = s.id
-            WHERE a.user_id = %s AND sp.quantity > 0
-            ORDER BY s.symbol;
-        """, (user_id,))
+        # Get user's stock portfolio with symbol, quantity, avg_cost and the stored metadata
+        cursor.execute(queries.WALLET_HOLDINGS, (user_id,))
         
         portfolio_stocks = cursor.fetchall()
         
@@ -135,76 +145,49 @@ def get_wallet():
         
         wallet_data = []
         total_portfolio_value = 0.00
-        
-        for stock in portfolio_stocks:
+
+        # Price the whole wallet from one bulk download of 7-day closes while the
+        # per-symbol enrichment runs concurrently, all under one deadline
+        symbols = [stock['symbol'] for stock in portfolio_stocks]
+        deadline = time.monotonic() + CONFIG.WALLET_DEADLINE_SECONDS
+        closes_future = MARKET_DATA_POOL.submit(get_recent_closes, symbols)
+        enrichment, stale = fetch_concurrently(enrich_holding, symbols, CONFIG.WALLET_DEADLINE_SECONDS, "enrichment")
+        try:
+            closes = closes_future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception as price_error:
+            print(f"Using last known prices for wallet: {price_error!r}")
+            closes = get_last_known_closes(symbols)
+            stale.update(symbols)
+        quotes = compute_wallet_frame(portfolio_stocks, closes)
+
+        # Rows the metadata job has not filled in yet are backfilled in the background
+        if any(not stock['sector'] or not stock['industry'] for stock in portfolio_stocks):
+            METADATA_REFRESHER.trigger()
+        
+        for stock, quote in zip(portfolio_stocks, quotes.to_dict(orient='records')):
             symbol = stock['symbol']
-            # print(symbol)
-            quantity = float(stock['quantity'])
-            avg_cost = float(stock['avg_cost']) if stock['avg_cost'] else 0.00
             name = stock.get('company_name', symbol)
+            extra = enrichment.get(symbol) or {}
 
-            try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="7d")
-
-                current_price = float(hist['Close'].iloc[-1]) if not hist.empty else 0.00
-                price_24h = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_price
-                price_7d = float(hist['Close'].iloc[0]) if len(hist) > 0 else current_price
-
-                change_1h = 0.00  # Yahoo doesn't support 1h granularity
-                change_24h = ((current_price - price_24h) / price_24h * 100) if price_24h > 0 else 0.00
-                change_7d = ((current_price - price_7d) / price_7d * 100) if price_7d > 0 else 0.00
-
-                market_value = quantity * current_price
-                total_cost = quantity * avg_cost
-                gain_loss = market_value - total_cost
-                gain_loss_percent = (gain_loss / total_cost * 100) if total_cost > 0 else 0.00
-
-                # Use fast_info for limited info (faster than .info)
-                info = ticker.fast_info if hasattr(ticker, "fast_info") else {}
-                sector = ticker.info.get("sector", "Unknown")
-                industry = ticker.info.get("industry", "Unknown")
-
-                wallet_item = {
-                    "symbol": symbol,
-                    "name": name,
-                    "quantity": quantity,
-                    "avgCost": avg_cost,
-                    "currentPrice": current_price,
-                    "marketValue": market_value,
-                    "gainLoss": gain_loss,
-                    "gainLossPercent": gain_loss_percent,
-                    "change1h": change_1h,
-                    "change24h": change_24h,
-                    "change7d": change_7d,
-                    "marketCap": info.get("market_cap", 0),
-                    "volume": info.get("volume", 0),
-                    "sector": sector,
-                    "industry": industry,
-                    "logo": get_company_logo(symbol)
-                }
-
-            except Exception as stock_error:
-                print(f"Error processing stock {symbol}: {stock_error}")
-                market_value = quantity * 0.00
-                wallet_item = {
-                    "symbol": symbol,
-                    "name": name,
-                    "quantity": quantity,
-                    "avgCost": avg_cost,
-                    "currentPrice": 0.00,
-                    "marketValue": market_value,
-                    "gainLoss": 0.00,
-                    "gainLossPercent": 0.00,
-                    "change1h": 0.00,
-                    "change24h": 0.00,
-                    "change7d": 0.00,
-                    "marketCap": 0,
-                    "volume": 0,
-                    "sector": "Unknown",
-                    "industry": "Unknown",
-                    "logo": get_company_logo(symbol)
-                }
+            wallet_item = {
+                "symbol": symbol,
+                "name": name,
+                "quantity": quote["quantity"],
+                "avgCost": quote["avg_cost"],
+                "currentPrice": quote["currentPrice"],
+                "marketValue": quote["marketValue"],
+                "gainLoss": quote["gainLoss"],
+                "gainLossPercent": quote["gainLossPercent"],
+                "change1h": 0.00,  # Yahoo doesn't support 1h granularity
+                "change24h": quote["change24h"],
+                "change7d": quote["change7d"],
+                "marketCap": extra.get("marketCap", 0),
+                "volume": extra.get("volume", 0),
+                "sector": stock['sector'] or "Unknown",
+                "industry": stock['industry'] or "Unknown",
+                "logo": extra.get("logo"),
+                "stale": symbol in stale
+            }
 
             wallet_data.append(wallet_item)
             total_portfolio_value += wallet_item["marketValue"]
@@ -220,310 +203,103 @@ def get_wallet():
         return jsonify({"error": f"Failed to get wallet data: {str(e)}"}), 500
 
 
+def enrich_holding(symbol):
+    """Per-symbol wallet fields that are neither in the bulk price download nor the stocks table"""
+    # Use fast_info for limited info (faster than .info)
+    info = get_fast_info(symbol)
+    return {
+        "marketCap": info.get("market_cap", 0),
+        "volume": info.get("volume", 0),
+        "logo": get_company_logo(symbol)
+    }
+
+
 
 
 
     
 @portfolio_bp.route('/trade', methods=['POST'])
 def execute_trade():
-    """Execute a trade order"""
+    """Queue a trade order; returns its order id right away (see /orders/<order_id>)"""
     try:
         data = request.get_json()
-        print("data", data)
         
-        required_fields = ['user_id', 'symbol', 'action', 'quantity']
+        required_fields = ['user_id', 'symbol', 'action', 'quantity', 'estimatedPrice']
         for field in required_fields:
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
-        user_id = data['user_id']
-        symbol = data['symbol'].upper()
         action = data['action'].lower()  # 'buy' or 'sell'
-        quantity = Decimal(data['quantity'])
-        price = Decimal(data.get('estimatedPrice', None))
-        
         if action not in ['buy', 'sell']:
             return jsonify({"error": "Action must be 'buy' or 'sell'"}), 400
         
-        if quantity <= 0:
-            return jsonify({"error": "Quantity must be positive"}), 400
-        
-        # Get current stock price for validation
-        ticker = yf.Ticker(symbol)
+        order = ORDER_QUEUE.submit(data['user_id'], data['symbol'], action, data['quantity'],
+                                   data['estimatedPrice'])
+        return jsonify({"success": True, "order_id": order.id, "status": order.status}), 202
         
-        
-        trade_price = price
-        
-    
-        # Here you would typically:
-        # 1. Check user's account balance (for buy orders)  
-        date = datetime.now().isoformat()
-        if action == 'buy':
-            result = buy_stock(user_id, symbol, quantity, trade_price, date)
-        # 2. Check user's stock holdings (for sell orders)
-        elif action == 'sell':
-            result = sell_stock(user_id, symbol, quantity, trade_price, date)
-        
-        return result, 200
-        
-    except ValueError as e:
+    except (ValueError, TypeError, ArithmeticError) as e:
         return jsonify({"error": "Invalid quantity or price format"}), 400
     except Exception as e:
-        print(f"Error executing trade: {e}")
+        print(f"Error queueing trade: {e}")
         return jsonify({"error": "Failed to execute trade"}), 500
 
-    
-#buy stock -> update stocksportfolio qty and avg cost (include symbol if not there yet), update accounts balance, update stcoks table if we don't have the symbol there yet,  
-
-#buy stock -> update stocksportfolio qty and avg cost (include symbol if not there yet), update accounts balance, update stcoks table if we don't have the symbol there yet,  
-def buy_stock(user_id, symbol, quantity, price, date):
-    # Implementation for buying stocks
-    try:
-        conn = init_db()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("SELECT balance FROM accounts WHERE user_id = %s", (user_id,))
-        result = cursor.fetchone()
-        balance = result['balance'] 
-        
-        
-        #check if user has enough balance
-        if balance > (quantity * price):
-            
-            # Deduct the amount from user's balance
-            new_balance = balance - (quantity * price)
-            print("new_balance", new_balance)
-            cursor.execute("UPDATE accounts SET balance = %s WHERE user_id = %s", (new_balance, user_id))  
-            conn.commit()
-
-            #get portfolio id for user 
-            cursor.execute("SELECT id FROM portfolios WHERE account_id = (SELECT id FROM accounts WHERE user_id = %s)", (user_id,)) #this will need to be changed if we have multiple portfolios per user
-            portfolio_id = cursor.fetchone()['id']
-            
-            print("portfolio_id", portfolio_id)
-        
-            
-            #check if stock exists in stocksportfolios for that given user
-            cursor.execute("SELECT sp.id as row_num, sp.quantity, sp.average_cost, sp.stock_id, s.symbol, a.user_id, p.account_id, p.id FROM stocksportfolios sp JOIN portfolios p on sp.portfolios_id = p.id JOIN accounts a on a.id = p.account_id JOIN stocks s on (s.id = sp.stock_id AND s.symbol =%s)  where a.user_id = %s ", (symbol, user_id))
-            stock = cursor.fetchone()
-            row_num_on_stocksportfolio = stock['row_num'] if stock else None
-            print("row_num_on_stocksportfolio", row_num_on_stocksportfolio)
-            
-            # update stocksportfolio table with new stock OR update stocksportfolios existing row with new stock quantity and avg cost
-            #if it exists, update quantity and avg cost
-            if stock:
-                print("stock exists in stocksportfolio")
-                #update stocksportfolio with new quantity and avg cost
-                new_quantity = stock['quantity'] + quantity
-                new_avg_cost = (stock['average_cost'] * stock['quantity'] + price * quantity) / new_quantity
-                cursor.execute("UPDATE stocksportfolios SET quantity=%s, average_cost=%s WHERE id=%s", (new_quantity, new_avg_cost, row_num_on_stocksportfolio))
-                conn.commit()
-                                             
-             #else, insert new stock into stocksportfolio
-            else:
-                print("stock does not exist in stocksportfolio")
-                #check if stock exists in stocks table
-                cursor.execute("SELECT id FROM stocks WHERE symbol = %s", (symbol,))
-                stocks_exists = cursor.fetchone()
-                
-                if not stocks_exists:
-                    print("stock does not exist in stocks table, inerting new stock")
-                    #insert new stock into stocks table
-                    insert_stock_in_stocks_table(symbol, cursor, conn)
-                    #get stock id from stocks table
-                
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute("SELECT id FROM stocks WHERE symbol = %s", (symbol,))
-                stock_data = cursor.fetchone()
-                print("stock_data", stock_data)
-                stock_id = stock_data['id'] 
-                print("here is the stock_id", stock_id)
-                         
-                #insert new stock into stocksportfolio
-                cursor.execute("INSERT INTO stocksportfolios (portfolios_id, stock_id, quantity, average_cost) VALUES (%s, %s, %s, %s)", (portfolio_id, stock_id, quantity, price))
-                conn.commit()
-                row_num_on_stocksportfolio = cursor.lastrowid
-                print("row_num_on_stocksportfolio after insert", row_num_on_stocksportfolio)
-                
-            
-            # insert transaction into stockstransactions table
-            cursor.execute("INSERT INTO stockstransactions (stocksportfolios_id, transaction_type, quantity, price, transaction_date) VALUES (%s, %s, %s, %s, %s)", (row_num_on_stocksportfolio, 'buy', quantity, price, date))
-            conn.commit()
-            
-            # Commit the transaction
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return jsonify({"success": True, "message": "Stock purchased successfully"})
-        
-        else:
-            # Insufficient balance
-            cursor.close()
-            conn.close()
-            return jsonify({"error": "Insufficient balance for this purchase"}), 400
 
-    except Exception as e:
-        print(f"Error buying stock: {e}")
-        return jsonify({"error": "Failed to buy stock"}), 500
-    
+@portfolio_bp.route('/orders/<order_id>', methods=['GET'])
+def get_order_status(order_id):
+    """Status of a queued order; ?wait=SECONDS holds the request until it is finished (long polling)"""
+    wait = min(request.args.get('wait', 0, type=float), ORDER_STATUS_MAX_WAIT_SECONDS)
+    order = ORDER_QUEUE.wait(order_id, wait) if wait > 0 else ORDER_QUEUE.get(order_id)
+    if order is None:
+        return jsonify({"error": "Order not found"}), 404
+    return jsonify(order.to_dict())
 
-    
-#inserts a stocks intro the stock table 
-def insert_stock_in_stocks_table(symbol, cursor, conn):
-    #symbol, company_name, sector, industry
-    
-    ticker = yf.Ticker(symbol)
-    company_name = ticker.info.get("longName", "Unknown")   
-    sector = ticker.info.get("sector", "Unknown")
-    industry = ticker.info.get("industry", "Unknown")
-      
-    cursor.execute("INSERT INTO stocks (symbol, company_name, sector, industry) VALUES (%s, %s, %s, %s)", (symbol, company_name, sector, industry))
-    conn.commit()  
-      
-    
 
-def sell_stock(user_id, symbol, quantity, current_price, date):
-    """Sell stock for a user"""
+@portfolio_bp.route('/trades/import', methods=['POST'])
+def import_trades():
+    """
+    Import a user's historical fills in one transaction: a JSON body
+    {"user_id": ..., "fills": [{symbol, action, quantity, price, timestamp}, ...]}
+    or a CSV body (Content-Type text/csv) with ?user_id=
+    """
     try:
-        # Input validation
-        if not user_id or not symbol or not quantity or not current_price:
-            return {"success": False, "error": "Missing required parameters"}
-        
-        if quantity <= 0:
-            return {"success": False, "error": "Quantity must be positive"}
-        
-        if current_price <= 0:
-            return {"success": False, "error": "Price must be positive"}
-        
-        # Database connection
-        conn = init_db()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check if user has enough stock to sell
-        # Join through the relationship chain: users -> accounts -> portfolios -> stocksportfolios -> stocks
-        cursor.execute("""
-            SELECT sp.id as stocksportfolio_id, sp.quantity, sp.average_cost, s.symbol, s.company_name
-            FROM users u
-            JOIN accounts a ON u.id = a.user_id
-            JOIN portfolios p ON a.id = p.account_id
-            JOIN stocksportfolios sp ON p.id = sp.portfolios_id
-            JOIN stocks s ON sp.stock_id = s.id
-            WHERE u.id = %s AND s.symbol = %s AND sp.quantity > 0
-        """, (user_id, symbol.upper()))
-        
-        stock_holding = cursor.fetchone()
-        
-        # Check if user owns this stock
-        if not stock_holding:
-            cursor.close()
-            conn.close()
-            return {"success": False, "error": f"You don't own any shares of {symbol}"}
-        
-        # Check if user has enough shares to sell
-        current_quantity = stock_holding['quantity']
-        if current_quantity < quantity:
-            cursor.close()
-            conn.close()
-            return {"success": False, "error": f"Insufficient shares. You own {current_quantity} shares but trying to sell {quantity}"}
-        
-        # Calculate remaining quantity and sale proceeds
-        remaining_quantity = current_quantity - quantity
-        sale_proceeds = quantity * current_price
-        stocksportfolio_id = stock_holding['stocksportfolio_id']
-        
-        # Start transaction for database updates
+        if request.mimetype == 'text/csv':
+            user_id = request.args.get('user_id')
+            raw = read_fills(request.get_data(as_text=True), 'csv')
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({"error": "Body must be a JSON object or a CSV document"}), 400
+            user_id = data.get('user_id')
+            raw = read_fills(data.get('fills', []), 'json')
+        if not user_id:
+            return jsonify({"error": "Missing required field: user_id"}), 400
         try:
-            # 1. Insert transaction record into stockstransactions table
-            cursor.execute("""
-                INSERT INTO stockstransactions (stocksportfolios_id, transaction_type, quantity, price, transaction_date)
-                VALUES (%s, 'sell', %s, %s, NOW())
-            """, (stocksportfolio_id, quantity, current_price))
-            conn.commit()
-                
-
-                # Update quantity if shares remain
-            cursor.execute("""
-                UPDATE stocksportfolios 
-                SET quantity = %s 
-                WHERE id = %s
-            """, (remaining_quantity, stocksportfolio_id))
-            conn.commit()
-
-            # 3. Update user's account balance (add sale proceeds)
-            cursor.execute("""
-                UPDATE accounts a
-                JOIN portfolios p ON a.id = p.account_id
-                JOIN stocksportfolios sp ON p.id = sp.portfolios_id
-                SET a.balance = a.balance + %s
-                WHERE sp.id = %s
-            """, (sale_proceeds, stocksportfolio_id))
-
-            conn.commit()
-            
-            cursor.close()
-            conn.close()
-            
-            # Return success with transaction details
-            return {
-                "success": True,
-                "message": f"Successfully sold {quantity} shares of {symbol} for ${sale_proceeds:.2f}",
-                "transaction_details": {
-                    "symbol": symbol,
-                    "quantity_sold": quantity,
-                    "price_per_share": current_price,
-                    "total_proceeds": sale_proceeds,
-                    "remaining_shares": remaining_quantity,
-                    "shares_deleted": remaining_quantity == 0
-                }
-            }
-            
-        except Exception as db_error:
-            # Rollback transaction on error
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            print(f"Database transaction error: {db_error}")
-            return {"success": False, "error": f"Failed to complete sell transaction: {str(db_error)}"}
-        
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "user_id must be an integer"}), 400
+
+        summary = import_fills(user_id, parse_fills(raw))
+        return jsonify({"success": True, **summary}), 200
+
+    except ImportRejected as e:
+        return jsonify({"success": False, "errors": e.errors}), 400
     except Exception as e:
-        print(f"Error in sell_stock validation: {e}")
-        return {"success": False, "error": f"Database error: {str(e)}"}
+        print(f"Error importing trades: {e}")
+        return jsonify({"error": "Failed to import trades"}), 500
 
 
 #alpha vatnage search utility function to search stocks 
 @portfolio_bp.route('/search', methods=['GET'])
 def search_stocks():
-    """Search for stocks using Alpha Vantage API"""
+    """Search for stocks in the local symbol index (Alpha Vantage only when nothing matches)"""
     query = request.args.get('query', '').strip()
     
     if not query or len(query) < 2:
         return jsonify({"error": "Query must be at least 2 characters"}), 400
     
     try:
-        # Alpha Vantage Symbol Search
-        params = {
-            'function': 'SYMBOL_SEARCH',
-            'keywords': query,
-            'apikey': ALPHA_VANTAGE_API_KEY
-        }
-        
-        response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params)
-        data = response.json()
-        
-        if 'bestMatches' in data:
-            results = []
-            for match in data['bestMatches'][:10]:  # Limit to 10 results
-                results.append({
-                    'symbol': match.get('1. symbol', ''),
-                    'name': match.get('2. name', ''),
-                    'type': match.get('3. type', ''),
-                    'region': match.get('4. region', ''),
-                    'currency': match.get('8. currency', '')
-                })
-            return jsonify({"results": results})
-        else:
-            return jsonify({"results": []})
+        # Local symbol index, falling back to Alpha Vantage Symbol Search
+        return jsonify({"results": search_symbols(query)})
             
     except Exception as e:
         print(f"Error searching stocks: {e}")
@@ -535,8 +311,7 @@ def search_stocks():
 def get_stock_info(symbol):
     """Get detailed stock information using Yahoo Finance"""
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = get_ticker_info(symbol)
         
         # Get current price and basic info
         stock_data = {
@@ -595,7 +370,8 @@ def get_stock_history(symbol):
             '5D': {'period': '5d', 'interval': '15m'},
             '1M': {'period': '1mo', 'interval': '1d'},
             '3M': {'period': '3mo', 'interval': '1d'},
-            '1Y': {'period': '1y', 'interval': '1d'}
+            '1Y': {'period': '1y', 'interval': '1d'},
+            '5Y': {'period': '5y', 'interval': '1d'}
         }
         
         frontend_period = request.args.get('frontend_period', '1D')
@@ -603,28 +379,29 @@ def get_stock_history(symbol):
             period = period_mapping[frontend_period]['period']
             interval = period_mapping[frontend_period]['interval']
         
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period, interval=interval)
+        max_points = request.args.get('max_points', type=int)
+        if max_points is not None and max_points < 2:
+            return jsonify({"error": "max_points must be at least 2"}), 400
+        
+        hist = get_history(symbol, period, interval)
+        closes = hist['Close'].dropna() if not hist.empty else hist
         
-        if hist.empty:
+        if closes.empty:
             return jsonify({"error": "No historical data found"}), 404
         
-        # Convert to format suitable for Chart.js
+        # Downsample long series, keeping their shape (LTTB)
+        if max_points is not None and max_points < len(closes):
+            closes = closes.iloc[lttb_indices(closes.to_numpy(), max_points)]
+        
+        # Format timestamps based on interval; convert to format suitable for Chart.js
+        label_format = '%H:%M' if interval in ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h'] else '%m/%d'
+        if period in ['2y', '5y', '10y', 'max']:
+            label_format = '%m/%Y'
         chart_data = {
-            'labels': [],
-            'data': []
+            'labels': closes.index.strftime(label_format).tolist(),
+            'data': closes.astype(float).tolist()
         }
         
-        for index, row in hist.iterrows():
-            # Format timestamp based on interval
-            if interval in ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h']:
-                label = index.strftime('%H:%M')
-            else:
-                label = index.strftime('%m/%d')
-            
-            chart_data['labels'].append(label)
-            chart_data['data'].append(float(row['Close']))
-        
         return jsonify(chart_data)
         
     except Exception as e:
@@ -633,91 +410,18 @@ def get_stock_history(symbol):
 
 @portfolio_bp.route('/historical-data', methods=['GET'])
 def get_historical_data_for_user():
+    """Daily market value of the user's holdings over the last year (today at live prices)"""
     try:
-        conn = init_db()
-        cursor = conn.cursor(dictionary=True)
         user_id = request.args.get('user_id')
 
         if not user_id:
             return jsonify({"error": "user_id is required"}), 400
 
-        query = """
-            SELECT s.symbol, t.transaction_type, t.quantity, t.transaction_date
-            FROM stockstransactions t
-            JOIN stocksportfolios sp ON t.stocksportfolios_id = sp.id
-            JOIN portfolios p ON sp.portfolios_id = p.id
-            JOIN accounts a ON p.account_id = a.id
-            JOIN users u ON a.user_id = u.id
-            JOIN stocks s ON sp.stock_id = s.id
-            WHERE u.id = %s
-            AND t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
-            ORDER BY t.transaction_date;
-        """
-        cursor.execute(query, (user_id,))
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        if not rows:
+        series = get_daily_series(user_id)
+        if series is None or not has_positions(series):
             return jsonify([])
 
-        df = pd.DataFrame(rows)
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-        df['date'] = df['transaction_date'].dt.date
-        df['signed_qty'] = df.apply(lambda x: x['quantity'] if x['transaction_type'] == 'buy' else -x['quantity'], axis=1)
-
-        daily_positions = (
-            df.groupby(['date', 'symbol'])['signed_qty'].sum()
-            .groupby(level=1).cumsum().reset_index()
-        )
-        daily_positions.rename(columns={'signed_qty': 'shares'}, inplace=True)
-
-        start_date = datetime.today().date() - timedelta(days=365)
-        end_date = datetime.today().date()
-        date_range = pd.date_range(start=start_date, end=end_date)
-        portfolio_values = pd.DataFrame(index=date_range)
-
-        today = datetime.today().date()
-        today_index = portfolio_values.index[-1]
-        today_values = {}
-
-        for symbol in daily_positions['symbol'].unique():
-            hist = yf.download(symbol, start=start_date, end=end_date, auto_adjust=True)['Close']
-            hist.index = hist.index.date
-
-            symbol_positions = (
-                daily_positions[daily_positions['symbol'] == symbol]
-                .set_index('date')
-                .reindex(date_range.date, method='ffill')
-                .fillna(0)
-            )
-            shares = symbol_positions['shares'].reindex(date_range.date, fill_value=0).ffill()
-
-            prices = hist.reindex(date_range.date).ffill()
-            portfolio_values[symbol] = shares * prices[symbol]
-            
-            # 🔥 Patch today's value with current price
-            try:
-                current_price = yf.Ticker(symbol).fast_info['last_price']
-                today_shares = shares.loc[today]
-                today_values[symbol] = today_shares * current_price
-            except Exception as e:
-                print(f"Warning: Could not fetch current price for {symbol}: {e}")
-                today_values[symbol] = portfolio_values.at[today, symbol]
-            
-        # Apply today's updated values
-        for symbol in today_values:
-            portfolio_values.loc[today_index, symbol] = today_values[symbol]
-        
-        portfolio_values['total_value'] = portfolio_values.sum(axis=1)
-        result = (
-            portfolio_values['total_value']
-            .reset_index()
-            .rename(columns={'index': 'date', 'total_value': 'value'})
-            .to_dict(orient='records')
-        )
-
-        return jsonify(result)
+        return jsonify([{"date": day, "value": value} for day, value in series['market_value'].items()])
 
     except Exception as e:
         print(f"Error getting historical data: {e}")
@@ -727,73 +431,31 @@ def get_historical_data_for_user():
         
 @portfolio_bp.route('/historical-cost', methods=['GET'])
 def get_historical_cost_for_user():
+    """Daily net amount invested (buys minus sell proceeds) over the last year"""
     try:
-        conn = init_db()
-        cursor = conn.cursor(dictionary=True)
         user_id = request.args.get('user_id')
 
         if not user_id:
             return jsonify({"error": "user_id is required"}), 400
 
-        query = """
-            SELECT t.transaction_type, t.quantity, t.price, t.transaction_date
-            FROM stockstransactions t
-            JOIN stocksportfolios sp ON t.stocksportfolios_id = sp.id
-            JOIN portfolios p ON sp.portfolios_id = p.id
-            JOIN accounts a ON p.account_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.id = %s
-              AND t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
-            ORDER BY t.transaction_date;
-        """
-        cursor.execute(query, (user_id,))
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        if not rows:
+        series = get_daily_series(user_id)
+        if series is None or not has_positions(series):
             return jsonify([])
 
-        df = pd.DataFrame(rows)
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-        df['date'] = df['transaction_date'].dt.date
-
-        # Compute signed cost per transaction
-        df['signed_cost'] = df.apply(
-            lambda x: x['quantity'] * float(x['price']) if x['transaction_type'] == 'buy' else -x['quantity'] * float(x['price']),
-            axis=1
-        )
-
-        # Aggregate signed cost by day
-        daily_cost = df.groupby('date')['signed_cost'].sum()
-
-        # Generate full date range
-        start_date = datetime.today().date() - timedelta(days=365)
-        end_date = datetime.today().date()
-        date_range = pd.date_range(start=start_date, end=end_date)
-        cost_df = pd.DataFrame(index=date_range)
-        cost_df.index.name = 'date'
-
-        # Fill missing dates and compute cumulative spend
-        cost_df['daily_cost'] = daily_cost.reindex(date_range.date, fill_value=0)
-        cost_df['total_cost'] = cost_df['daily_cost'].cumsum()
-
-        result = (
-            cost_df['total_cost']
-            .reset_index()
-            .rename(columns={'total_cost': 'value'})
-            .to_dict(orient='records')
-        )
-
-        return jsonify(result)
+        return jsonify([{"date": day, "value": value} for day, value in series['cost_basis'].items()])
 
     except Exception as e:
         print(f"Error getting historical cost: {e}")
         return jsonify({"error": f"Failed to get historical cost: {e}"}), 500
 
+
+def has_positions(series):
+    """False for a user who never traded (the charts show their empty state)"""
+    return bool((series['market_value'] != 0).any() or (series['cost_basis'] != 0).any())
+
 def get_user_stocks(user_id):
     """Fetch up to 10 stocks from DB, fill with random if less than 10."""
-    conn = init_db()
+    conn = init_read_db(user_id)
     cursor = conn.cursor(dictionary=True)
     
     
@@ -819,42 +481,27 @@ def get_user_stocks(user_id):
             stocks.append(extra)
     return stocks
 
-def get_finnhub_data(symbol):
-    """Fetch recommendation, price-target, sentiment, company news, and news sentiment for a symbol using Finnhub."""
-    
-    # Get company name using Yahoo Finance (same as get_stock_info)
-    try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        company_name = info.get('longName', info.get('shortName', symbol))
-    except Exception as e:
-        print(f"Error getting company name for {symbol}: {e}")
-        company_name = symbol
-    
-    # Analyst Recommendations
-    rec_url = f"https://finnhub.io/api/v1/stock/recommendation?symbol={symbol}&token={FINNHUB_TOKEN}"
-    rec_data = requests.get(rec_url).json()
-    recommendation = rec_data[0] if rec_data else {}
-
-    # Price Targets
-    target_url = f"https://finnhub.io/api/v1/stock/price-target?symbol={symbol}&token={FINNHUB_TOKEN}"
-    price_target = requests.get(target_url).json()
-
-    # News Sentiment
-    sentiment_url = f"https://finnhub.io/api/v1/news-sentiment?symbol={symbol}&token={FINNHUB_TOKEN}"
-    sentiment = requests.get(sentiment_url).json()
-    print(f"Sentiment for {symbol}: {sentiment}")
-    
-    # Company News (last 7 days)
-    from datetime import datetime, timedelta
-    to_date = datetime.now()
-    from_date = to_date - timedelta(days=7)
-    
-    company_news_url = f"https://finnhub.io/api/v1/company-news?symbol={symbol}&from={from_date.strftime('%Y-%m-%d')}&to={to_date.strftime('%Y-%m-%d')}&token={FINNHUB_TOKEN}"
-    company_news = requests.get(company_news_url).json()
-    
+def get_company_names(symbols):
+    """company_name for every symbol already in the stocks table, in one query"""
+    if not symbols:
+        return {}
+    conn = init_read_db()
+    cursor = conn.cursor()
+    placeholders = ", ".join(["%s"] * len(symbols))
+    cursor.execute(f"SELECT symbol, company_name FROM stocks WHERE symbol IN ({placeholders})", tuple(symbols))
+    names = {symbol: name for symbol, name in cursor.fetchall() if name and name != "Unknown"}
+    cursor.close()
+    conn.close()
+    return names
+
+
+def format_finnhub_data(symbol, company_name, data):
+    """Shape the raw Finnhub responses for one symbol (see FinnhubClient.overviews)"""
+    recommendation = data["recommendation"][0] if data["recommendation"] else {}
+    price_target = data["price_target"] or {}
+    sentiment = data["sentiment"] or {}
     # Limit to top 5 news articles
-    company_news = company_news[:5] if company_news else []
+    company_news = data["company_news"][:5] if data["company_news"] else []
 
     return {
         "symbol": symbol,
@@ -879,151 +526,86 @@ def get_finnhub_data(symbol):
         "company_news": company_news,
         "news_sentiment": sentiment
     }
+
+
+def get_finnhub_data_for_symbols(symbols):
+    """Recommendation, price-target, sentiment and company news for many symbols, fetched concurrently."""
+    try:
+        names = get_company_names(symbols)
+    except Exception as e:
+        print(f"Error getting company names: {e}")
+        names = {}
+
+    # Symbols we know nothing about get their name from the Finnhub profile in the same fan-out
+    unnamed = [symbol for symbol in symbols if symbol not in names]
+    raw = FINNHUB.overviews(symbols, with_profile=unnamed)
+
+    results = []
+    for symbol in symbols:
+        profile = raw[symbol].get("profile") or {}
+        company_name = names.get(symbol) or profile.get("name") or symbol
+        results.append(format_finnhub_data(symbol, company_name, raw[symbol]))
+    return results
+
+
+def get_finnhub_data(symbol):
+    """Fetch recommendation, price-target, sentiment, company news, and news sentiment for a symbol using Finnhub."""
+    return get_finnhub_data_for_symbols([symbol])[0]
     
 @portfolio_bp.route('/historical-balance', methods=['GET'])
 def get_historical_balance_for_user():
+    """Daily cash balance over the last year"""
     try:
-        conn = init_db()
-        cursor = conn.cursor(dictionary=True)
         user_id = request.args.get('user_id')
 
         if not user_id:
             return jsonify({"error": "user_id is required"}), 400
 
-        # Get current account balance
-        cursor.execute("""
-            SELECT a.balance 
-            FROM accounts a
-            WHERE a.user_id = %s
-        """, (user_id,))
-        result = cursor.fetchone()
-        if not result:
+        series = get_daily_series(user_id)
+        if series is None:
             return jsonify({"error": "Account not found"}), 404
 
-        current_balance = result['balance']
-
-        # Get all transactions in the past year
-        query = """
-            SELECT t.transaction_type, t.price, t.quantity, t.transaction_date
-            FROM stockstransactions t
-            JOIN stocksportfolios sp ON t.stocksportfolios_id = sp.id
-            JOIN portfolios p ON sp.portfolios_id = p.id
-            JOIN accounts a ON p.account_id = a.id
-            WHERE a.user_id = %s
-            AND t.transaction_date >= DATE_SUB(CURDATE(), INTERVAL 1 YEAR)
-            ORDER BY t.transaction_date DESC
-        """
-        cursor.execute(query, (user_id,))
-        transactions = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        # Convert to DataFrame
-        df = pd.DataFrame(transactions)
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-        df['date'] = (df['transaction_date'] - pd.Timedelta(days=1)).dt.date
-
+        return jsonify([{"date": day, "balance": balance} for day, balance in series['cash_balance'].items()])
 
-        # Cash flow REVERSED to undo effects day by day
-        df['reverse_cash'] = df.apply(
-            lambda x: x['price'] * x['quantity'] if x['transaction_type'] == 'buy' else -x['price'] * x['quantity'],
-            axis=1
-        )
-
-        # Aggregate by day
-        daily_reversal = df.groupby('date')['reverse_cash'].sum()
+    except Exception as e:
+        print(f"Error getting historical balance: {e}")
+        return jsonify({"error": f"Failed to get historical balance: {e}"}), 500
 
-        # Build full date range
-        end_date = datetime.today().date()
-        start_date = end_date - timedelta(days=365)
-        date_range = pd.date_range(start=start_date, end=end_date)
-        balance_series = pd.Series(
-            [Decimal('0.00')] * len(date_range),
-            index=date_range.date,
-            dtype='object'
-        )
-        balance_series[:] = 0
 
-        # Fill in reversed cash changes
-        balance_series.update(daily_reversal)
+@portfolio_bp.route('/historical', methods=['GET'])
+def get_historical_series_for_user():
+    """
+    /historical-data, /historical-cost and /historical-balance in one response,
+    from a single timeline load: {"value": [...], "cost": [...], "balance": [...]}
+    """
+    try:
+        user_id = request.args.get('user_id')
 
-        # Backward cumulative sum (from today → past), then reverse it
-        balance_series = balance_series[::-1].cumsum()[::-1]
+        if not user_id:
+            return jsonify({"error": "user_id is required"}), 400
 
-        # Add current balance to get historical balances
-        balance_series = current_balance + balance_series
-        
-        balance_series.iloc[-1] = current_balance
+        series = get_daily_series(user_id)
+        if series is None:
+            return jsonify({"error": "Account not found"}), 404
 
-        result_df = balance_series.reset_index()
-        result_df.columns = ['date', 'balance']
-        result = result_df.to_dict(orient='records')
-        return jsonify(result)
+        traded = has_positions(series)
+        return jsonify({
+            "value": [{"date": day, "value": value} for day, value in series['market_value'].items()] if traded else [],
+            "cost": [{"date": day, "value": value} for day, value in series['cost_basis'].items()] if traded else [],
+            "balance": [{"date": day, "balance": balance} for day, balance in series['cash_balance'].items()],
+        })
 
     except Exception as e:
-        print(f"Error getting historical balance: {e}")
-        return jsonify({"error": f"Failed to get historical balance: {e}"}), 500
+        print(f"Error getting historical series: {e}")
+        return jsonify({"error": f"Failed to get historical series: {e}"}), 500
 
 
 
 def get_company_logo(symbol, domain_fallback=None):
     """
-    Fetch company logo using multiple sources with fallbacks.
+    Company logo from the persistent logo cache (see utils/logo_cache.py).
     """
-
-    # 1. Try Finnhub company profile (includes logo)
-    try:
-        print("Using finnhub")
-        finnhub_url = f"https://finnhub.io/api/v1/stock/profile2?symbol={symbol}&token={FINNHUB_TOKEN}"
-        resp = requests.get(finnhub_url, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            if data and data.get("logo") and data["logo"].strip():
-                return data["logo"]
-    except Exception as e:
-        print(f"Finnhub logo fetch error for {symbol}: {e}")
-
-    # 2. Try Yahoo Finance logo (alternative approach)
-    try:
-        print("print yahoo finance")
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        if info and info.get("logo_url"):
-            return info["logo_url"]
-    except Exception as e:
-        print(f"Yahoo Finance logo fetch error for {symbol}: {e}")
-
-    # 3. Optional fallback using Clearbit (requires domain)
-    if domain_fallback:
-        try:
-            print("Using clearbit")
-            clearbit_url = f"https://logo.clearbit.com/{domain_fallback}"
-            # Test if the Clearbit logo exists
-            resp = requests.head(clearbit_url, timeout=3)
-            if resp.status_code == 200:
-                return clearbit_url
-        except Exception as e:
-            print(f"Clearbit logo fetch error for {symbol}: {e}")
-
-    # 4. Generic fallback logos based on common company patterns
-    common_logos = {
-        'AAPL': 'https://logo.clearbit.com/apple.com',
-        'GOOGL': 'https://logo.clearbit.com/google.com',
-        'GOOG': 'https://logo.clearbit.com/google.com',
-        'MSFT': 'https://logo.clearbit.com/microsoft.com',
-        'AMZN': 'https://logo.clearbit.com/amazon.com',
-        'TSLA': 'https://logo.clearbit.com/tesla.com',
-        'META': 'https://logo.clearbit.com/meta.com',
-        'NVDA': 'https://logo.clearbit.com/nvidia.com',
-        'NFLX': 'https://logo.clearbit.com/netflix.com',
-        'ADBE': 'https://logo.clearbit.com/adobe.com'
-    }
-    
-    if symbol in common_logos:
-        return common_logos[symbol]
-
-    # 5. No logo found
-    return None
+    return get_logo(symbol, domain_fallback)
 
 @portfolio_bp.route("/recommendationsandsentiment", methods=["GET"])
 def recommendations_and_sentiment():
@@ -1031,195 +613,85 @@ def recommendations_and_sentiment():
     user_id = request.args.get("user_id", 1)
     stocks = get_user_stocks(user_id)
 
-    results = []
-    for symbol in stocks:
-        stock_data = get_finnhub_data(symbol)
-        stock_data['logo'] = get_company_logo(symbol)
-        results.append(stock_data)
-    
-    return jsonify(results)
-
-
-def fetch_yahoo_news(symbols):
-    """Fetch news from Yahoo Finance RSS feed and extract images from article pages"""
-    base_url = "https://feeds.finance.yahoo.com/rss/2.0/headline"
-    url = f"{base_url}?s={symbols}&region=US&lang=en-US"
-    feed = feedparser.parse(url)
-    
-    def extract_image_from_page(article_url):
-        """Extract the main image from the news article page"""
+    # Logos come from the persistent cache; look up any unseen ones while Finnhub is queried
+    logos = {symbol: MARKET_DATA_POOL.submit(get_company_logo, symbol) for symbol in stocks}
+    results = get_finnhub_data_for_symbols(stocks)
+    for stock_data in results:
         try:
-            from bs4 import BeautifulSoup
-            import re
-            
-            # Set headers to mimic a real browser
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            # Fetch the article page with timeout
-            response = requests.get(article_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try different methods to find the main image
-            image_url = None
-            
-            # Method 1: Look for Open Graph image
-            og_image = soup.find('meta', property='og:image')
-            if og_image and og_image.get('content'):
-                image_url = og_image['content']
-            
-            # Method 2: Look for Twitter card image
-            if not image_url:
-                twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-                if twitter_image and twitter_image.get('content'):
-                    image_url = twitter_image['content']
-            
-            # Method 3: Look for article images (common patterns)
-            if not image_url:
-                # Look for images in article content
-                article_selectors = [
-                    'article img',
-                    '.article-content img',
-                    '.story-content img',
-                    '.post-content img',
-                    '.entry-content img',
-                    '[data-module="ArticleBody"] img',
-                    '.caas-body img'  # Yahoo Finance specific
-                ]
-                
-                for selector in article_selectors:
-                    img_tag = soup.select_one(selector)
-                    if img_tag and img_tag.get('src'):
-                        src = img_tag['src']
-                        # Skip small images, icons, and ads
-                        if not any(skip in src.lower() for skip in ['icon', 'logo', 'avatar', 'ad', 'banner']) and \
-                           not src.endswith('.svg'):
-                            image_url = src
-                            break
-            
-            # Method 4: Look for the first significant image in the page
-            if not image_url:
-                all_images = soup.find_all('img')
-                for img in all_images:
-                    src = img.get('src', '')
-                    if src and not any(skip in src.lower() for skip in ['icon', 'logo', 'avatar', 'ad', 'banner', 'pixel']) and \
-                       not src.endswith('.svg'):
-                        # Try to get image dimensions if available
-                        width = img.get('width')
-                        height = img.get('height')
-                        if width and height:
-                            try:
-                                w, h = int(width), int(height)
-                                if w >= 200 and h >= 150:  # Reasonable size for article image
-                                    image_url = src
-                                    break
-                            except ValueError:
-                                pass
-                        else:
-                            # If no dimensions, take the first reasonable image
-                            image_url = src
-                            break
-            
-            # Convert relative URLs to absolute URLs
-            if image_url and image_url.startswith('/'):
-                from urllib.parse import urljoin
-                image_url = urljoin(article_url, image_url)
-            
-            return image_url
-            
+            stock_data['logo'] = logos[stock_data['symbol']].result()
         except Exception as e:
-            print(f"Error extracting image from {article_url}: {e}")
-            return None
-    
-    articles = []
-    for entry in feed.entries[:10]:
-        # Extract image from the actual article page
-        image_url = extract_image_from_page(entry.link)
-        
-        article = {
-            "title": entry.title,
-            "link": entry.link,
-            "published": entry.published,
-            "summary": entry.get("summary", ""),
-            "category": "Market News"
-        }
-        
-        # Only add image if one was found
-        if image_url:
-            article["image"] = image_url
-            
-        articles.append(article)
+            print(f"Error getting logo for {stock_data['symbol']}: {e}")
+            stock_data['logo'] = None
     
-    return articles
+    return jsonify(results)
+
 
 @portfolio_bp.route("/news")
 def get_news():
     """Get financial news with images extracted from article pages"""
-    symbols = "^GSPC,BTC-USD,EURUSD=X"
-    return jsonify(fetch_yahoo_news(symbols))
+    try:
+        return jsonify(get_news_snapshot(DEFAULT_NEWS_SYMBOLS))
+    except Exception as e:
+        print(f"Error getting news: {e}")
+        return jsonify({"error": "Failed to get news"}), 500
 
 @portfolio_bp.route('/transactions', methods=['GET'])
 def get_user_transactions():
+    """
+    A user's transactions, newest first, optionally filtered by symbol, type (buy/sell)
+    and from/to dates (YYYY-MM-DD, inclusive).
+    Without limit or cursor the whole history is streamed as one JSON array (NDJSON
+    with format=ndjson) straight off the database cursor. With limit, one page is
+    returned as {"transactions", "next_cursor"}; pass next_cursor as cursor for the
+    next one (in NDJSON mode it is sent in the X-Next-Cursor header).
+    """
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'ndjson'):
+        return jsonify({"error": "format must be json or ndjson"}), 400
     try:
-        user_id = request.args.get('user_id')
-
-        if not user_id:
-            return jsonify({"error": "user_id is required"}), 400
+        filters = parse_transaction_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        conn = init_db()
+    dumps = current_app.json.dumps
+    mimetype = 'application/json' if fmt == 'json' else 'application/x-ndjson'
+    try:
+        conn = init_read_db(user_id)
         cursor = conn.cursor(dictionary=True)
+        if filters['limit']:
+            limit = filters['limit']
+            cursor.execute(*transactions_query(user_id, **{**filters, 'limit': limit + 1}))
+            rows, next_cursor = split_page(cursor.fetchall(), limit)
+            cursor.close()
+            if fmt == 'json':
+                return jsonify({"transactions": rows, "next_cursor": next_cursor})
+            return Response(ndjson(rows, dumps), mimetype=mimetype, headers={'X-Next-Cursor': next_cursor or ''})
 
-        query = """
-            SELECT 
-                st.id AS transaction_id,
-                st.transaction_type,
-                st.quantity,
-                st.price,
-                st.transaction_date,
-                s.symbol,
-                s.company_name,
-                s.sector,
-                s.industry
-            FROM stockstransactions st
-            JOIN stocksportfolios sp ON st.stocksportfolios_id = sp.id
-            JOIN stocks s ON sp.stock_id = s.id
-            JOIN portfolios p ON sp.portfolios_id = p.id
-            JOIN accounts a ON p.account_id = a.id
-            WHERE a.user_id = %s
-            ORDER BY st.transaction_date DESC
-        """
-        cursor.execute(query, (user_id,))
-        transactions = cursor.fetchall()
-
-        return jsonify(transactions)
-
+        cursor.execute(*transactions_query(user_id, **filters))
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        print(f"Error getting transactions: {e}")
+        return jsonify({"error": "Failed to get transactions"}), 500
+
+    def generate():
+        try:
+            rows = iter_rows(cursor)
+            yield from (json_array(rows, dumps) if fmt == 'json' else ndjson(rows, dumps))
+        finally:
+            cursor.close()
+
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 
-    finally:
-        cursor.close()
-        conn.close()
 @portfolio_bp.route("/marketsindices")
 def get_market_indices():
     """Get market indices data from Yahoo Finance"""
-    indices = {
-        "NASDAQ": "^IXIC",
-        "S&P 500": "^GSPC",
-        "Dow Jones": "^DJI",
-        "EUR-USD": "EURUSD=X",
-        "Bitcoin": "BTC-USD",
-        "Gold": "GC=F", 
-        "Oil": "CL=F",
-    }
-    
     results = []
-    for name, symbol in indices.items():
+    for name, symbol in MARKET_INDICES.items():
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = get_ticker_info(symbol)
             
             index_data = {
                 "name": name,
@@ -1238,4 +710,136 @@ def get_market_indices():
         except Exception as e:
             print(f"Error fetching data for {name} ({symbol}): {e}")
     
-    return jsonify(results) 
+    return jsonify(results)
+
+
+@portfolio_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose in-process cache and background job counters"""
+    return jsonify({
+        "quote_cache": QUOTE_CACHE.stats(),
+        "jobs": {name: job.stats() for name, job in JOBS.items()},
+        "finnhub": FINNHUB.stats(),
+        "quote_stream": QUOTE_FEED.stats(),
+        "market_data": get_provider().stats(),
+        "db_pool": DB_POOL.stats(),
+        "db_replicas": REPLICAS.stats(),
+        "timelines": TIMELINES.stats(),
+        "stock_ids": STOCK_IDS.stats(),
+        "orders": ORDER_QUEUE.stats()
+    })
+
+
+ANALYTICS_MAX_ROWS = 500
+
+
+def analytics_rows(sql, default_limit):
+    """Rows of an /analytics query taking a ?limit= (clamped to ANALYTICS_MAX_ROWS)"""
+    limit = min(max(request.args.get('limit', default_limit, type=int), 1), ANALYTICS_MAX_ROWS)
+    conn = init_read_db()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(sql, (limit,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@portfolio_bp.route('/analytics/aum', methods=['GET'])
+def get_assets_under_management():
+    """Firm-wide totals of the latest valuation run (market value + cash = AUM)"""
+    try:
+        conn = init_read_db()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(queries.VALUATION_TOTALS)
+        totals = cursor.fetchone()
+        cursor.close()
+        conn.close()
+
+        market_value = float(totals['market_value'] or 0)
+        cash_balance = float(totals['cash_balance'] or 0)
+        return jsonify({
+            "aum": round(market_value + cash_balance, 2),
+            "market_value": market_value,
+            "cash_balance": cash_balance,
+            "cost_basis": float(totals['cost_basis'] or 0),
+            "gain_loss": float(totals['gain_loss'] or 0),
+            "accounts": totals['accounts'],
+            "valued_at": totals['valued_at'],
+        })
+
+    except Exception as e:
+        print(f"Error getting AUM: {e}")
+        return jsonify({"error": "Failed to get AUM"}), 500
+
+
+@portfolio_bp.route('/analytics/exposure', methods=['GET'])
+def get_symbol_exposure():
+    """Firm-wide exposure per symbol, largest first (?limit=, default 50)"""
+    try:
+        return jsonify(analytics_rows(queries.SYMBOL_EXPOSURE, 50))
+    except Exception as e:
+        print(f"Error getting exposure: {e}")
+        return jsonify({"error": "Failed to get exposure"}), 500
+
+
+@portfolio_bp.route('/analytics/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """Users ranked by unrealized return on their open positions (?limit=, default 10)"""
+    try:
+        return jsonify(analytics_rows(queries.LEADERBOARD, 10))
+    except Exception as e:
+        print(f"Error getting leaderboard: {e}")
+        return jsonify({"error": "Failed to get leaderboard"}), 500
+
+
+@portfolio_bp.route('/analytics/refresh', methods=['POST'])
+def refresh_analytics():
+    """Run the valuation job now instead of waiting for its next interval"""
+    VALUATION_JOB.start().trigger()
+    return jsonify({"success": True, "message": "Valuation started", "job": VALUATION_JOB.stats()}), 202
+
+
+@portfolio_bp.route('/backups', methods=['GET', 'POST'])
+def backups():
+    """List the database backups on disk; POST starts one now in the background job"""
+    if request.method == 'POST':
+        BACKUP_JOB.start().trigger()
+        return jsonify({"success": True, "message": "Backup started"}), 202
+    return jsonify({"backups": list_backups(), "job": BACKUP_JOB.stats()})
+
+
+@portfolio_bp.route('/market-status', methods=['GET'])
+def get_market_status():
+    """Whether the US market is open and how often clients should refresh quotes"""
+    market_open = is_market_open()
+    return jsonify({
+        "open": market_open,
+        "refreshSeconds": refresh_interval()
+    })
+
+
+@portfolio_bp.route('/stream/quotes', methods=['GET'])
+def stream_quote_updates():
+    """Server-sent quote deltas for ?symbols=AAPL,MSFT (or ?symbols=indices for the market banner)"""
+    symbols = request.args.get('symbols', '')
+    if symbols == 'indices':
+        symbols = list(MARKET_INDICES.values())
+    else:
+        symbols = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+    if not symbols:
+        return jsonify({"error": "symbols is required"}), 400
+    # The price refresher is the feed's only publisher: without it the stream would stay silent
+    if not PRICE_REFRESHER.is_running():
+        return jsonify({"error": "Live quotes are not available (price refresher is not running)"}), 503
+
+    # New symbols are picked up on the next refresh; don't make the client wait a full cycle
+    if set(symbols) - QUOTE_FEED.subscribed_symbols():
+        PRICE_REFRESHER.trigger()
+
+    return Response(
+        stream_with_context(stream_quotes(QUOTE_FEED, symbols)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+# Tests import server modules the same way app.py does (from the server directory)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeCursor:
+    """Cursor of a FakeConnection: logs every statement and serves the rows its respond() returns"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = conn.description
+        self.lastrowid = None
+        self.rows = []
+        self.closed = False
+
+    def execute(self, sql, params=()):
+        self.conn.log.append(sql)
+        self.conn.executed.append((sql, params))
+        self.rows = list(self.conn.respond(self, sql, params) or [])
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        self.conn.log.append(sql)
+        self.conn.executed.append((sql, rows))
+        self.conn.respond(self, sql, rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """
+    A mysql.connector connection stand-in. Every statement (COMMIT and ROLLBACK
+    included) is appended to log and (sql, params) to executed, then handed to
+    respond(cursor, sql, params): what it returns is the statement's result set,
+    what it raises is the statement's error, and it may set cursor.lastrowid.
+    Without respond every query returns `rows`.
+    """
+
+    def __init__(self, respond=None, rows=(), description=None):
+        self.respond = respond or (lambda cursor, sql, params: self.rows)
+        self.rows = list(rows)
+        self.description = description
+        self.log = []
+        self.executed = []
+        self.cursors = []
+        self.commits = 0
+        self.closes = 0
+
+    def cursor(self, dictionary=False, raw=False):
+        cursor = FakeCursor(self)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.log.append("COMMIT")
+        self.respond(None, "COMMIT", ())
+        self.commits += 1
+
+    def rollback(self):
+        self.log.append("ROLLBACK")
+        self.respond(None, "ROLLBACK", ())
+
+    def close(self):
+        self.closes += 1
+
+
+@pytest.fixture
+def fake_connection():
+    """Factory for FakeConnection(respond=None, rows=(), description=None)"""
+    return FakeConnection
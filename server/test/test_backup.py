@@ -0,0 +1,47 @@
+import gzip
+import os
+
+from utils.backup import MANIFEST, dump_table, encode_row, list_backups, load_table, rotate_backups
+
+
+def backup_db(fake_connection, rows=()):
+    """A two-column table to dump; LOAD DATA files are read back into conn.chunks"""
+
+    def respond(cursor, sql, params):
+        if sql.startswith("LOAD DATA"):
+            with open(params[0], "rb") as f:
+                conn.chunks.append(f.read())
+        return conn.rows
+
+    conn = fake_connection(respond, rows=rows, description=[("id",), ("note",)])
+    conn.chunks = []
+    return conn
+
+
+def test_rows_are_escaped_for_load_data():
+    assert encode_row([bytearray(b"7"), None, bytearray(b"a\tb\\c\nd")]) == b"7\t\\N\ta\\tb\\\\c\\nd\n"
+
+
+def test_table_is_streamed_to_gzip_and_loaded_back_in_chunks(tmp_path, fake_connection):
+    rows = [(bytearray(str(i).encode()), bytearray(b"line\none") if i % 2 else None) for i in range(5)]
+    path = tmp_path / "notes.tsv.gz"
+    columns, count = dump_table(backup_db(fake_connection, rows), "notes", path, fetch_rows=2)
+    assert (columns, count) == (["id", "note"], 5)
+    assert gzip.open(path).read().splitlines()[:2] == [b"0\t\\N", b"1\tline\\none"]
+
+    conn = backup_db(fake_connection)
+    table = {"name": "notes", "columns": columns, "rows": count}
+    assert load_table(conn, table, path, tmp_path, chunk_rows=2) == 5
+    assert [chunk.count(b"\n") for chunk in conn.chunks] == [2, 2, 1]
+    assert conn.commits == 3
+    assert conn.log[0].startswith("LOAD DATA LOCAL INFILE %s INTO TABLE `notes` CHARACTER SET utf8mb4 "
+                                         "(`id`, `note`)")
+
+
+def test_rotation_keeps_the_newest_complete_backups(tmp_path):
+    for name in ["2025-01-01_00-00-00", "2025-01-02_00-00-00", "2025-01-03_00-00-00"]:
+        os.makedirs(tmp_path / name)
+        (tmp_path / name / MANIFEST).write_text("{}")
+    os.makedirs(tmp_path / "2025-01-04_00-00-00")  # no manifest: never finished
+    assert rotate_backups(tmp_path, keep=2) == ["2025-01-01_00-00-00"]
+    assert list_backups(tmp_path) == ["2025-01-03_00-00-00", "2025-01-02_00-00-00"]
@@ -0,0 +1,84 @@
+import pytest
+from flask import Flask
+
+import db
+from db import ConnectionPool, PoolTimeout
+
+
+class FakePool:
+    def __init__(self, connect):
+        self.connect = connect
+
+    def get_connection(self):
+        return self.connect()
+
+
+@pytest.fixture
+def make_pool(fake_connection):
+    def make_pool(size=2, timeout=0.05):
+        pool = ConnectionPool(size=size, timeout=timeout)
+        pool._pool = FakePool(fake_connection)
+        return pool
+    return make_pool
+
+
+def test_checkout_times_out_when_pool_is_exhausted(make_pool):
+    pool = make_pool(size=1)
+    conn = pool.connect()
+    with pytest.raises(PoolTimeout):
+        pool.connect()
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["utilization"] == 1.0
+
+    conn.close()
+    conn.close()  # closing twice only returns it once
+    assert pool.stats()["inUse"] == 0
+    pool.connect().close()
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_request_shares_one_connection_until_teardown(monkeypatch, make_pool):
+    pool = make_pool()
+    monkeypatch.setattr(db, "DB_POOL", pool)
+    app = Flask(__name__)
+    app.teardown_appcontext(db.release_request_db)
+
+    with app.app_context():
+        first = db.init_db()
+        first.close()
+        assert db.init_db() is first
+        assert pool.stats()["inUse"] == 1
+    assert pool.stats()["inUse"] == 0
+    assert pool.stats()["peakInUse"] == 1
+
+
+class BrokenPool:
+    def get_connection(self):
+        raise ConnectionError("replica down")
+
+
+def test_reads_go_to_replicas_unless_the_user_just_wrote(monkeypatch, make_pool):
+    primary, replica, broken = make_pool(), make_pool(), make_pool()
+    broken._pool = BrokenPool()
+    primary.name, replica.name, broken.name = "primary", "replica-1", "replica-2"
+    replicas = db.ReplicaSet([broken, replica], retry_seconds=60)
+    monkeypatch.setattr(db, "DB_POOL", primary)
+    monkeypatch.setattr(db, "REPLICAS", replicas)
+    monkeypatch.setattr(db, "PRIMARY_PINS", db.PrimaryPins(window=60))
+    app = Flask(__name__)
+    app.teardown_appcontext(db.release_request_db)
+
+    with app.app_context():
+        # The broken replica is skipped (and sits out), the request shares the healthy one
+        conn = db.init_read_db(user_id=1)
+        assert db.init_read_db(user_id=1) is conn
+        assert replica.stats()["inUse"] == 1 and primary.stats()["inUse"] == 0
+    assert replicas.stats()["replicas"]["replica-2"]["down"]
+
+    db.pin_to_primary(1)
+    with app.app_context():
+        db.init_read_db(user_id=1)
+        db.init_read_db(user_id=2)
+        assert primary.stats()["inUse"] == 1 and replica.stats()["inUse"] == 1
+    assert replicas.stats()["pinnedReads"] == 1
+    assert primary.stats()["inUse"] == 0 and replica.stats()["inUse"] == 0
@@ -0,0 +1,27 @@
+import numpy as np
+
+from utils.downsample import lttb_indices
+
+
+def test_keeps_endpoints_and_requested_size():
+    y = np.sin(np.linspace(0, 20, 1000))
+
+    idx = lttb_indices(y, 100)
+
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_keeps_spikes():
+    y = np.zeros(500)
+    y[123] = 50.0
+    y[377] = -50.0
+
+    idx = lttb_indices(y, 20)
+
+    assert 123 in idx and 377 in idx
+
+
+def test_short_series_untouched():
+    assert list(lttb_indices([1.0, 2.0, 3.0], 10)) == [0, 1, 2]
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from utils import finnhub_client
+from utils.finnhub_client import FinnhubClient, FinnhubUnavailable, TokenBucket
+from utils.quote_cache import QuoteCache
+
+
+def test_token_bucket_allows_burst_then_refills():
+    bucket = TokenBucket(rate=20, capacity=3)
+
+    started = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=1)  # one refill at 20 tokens/second takes ~50ms
+    elapsed = time.monotonic() - started
+
+    assert 0.03 < elapsed < 0.5
+
+
+class FlakyProvider:
+    def __init__(self, failures=1):
+        self.calls = 0
+        self.failures = failures
+        self.timeouts = []
+
+    def finnhub(self, path, params, timeout=None):
+        self.calls += 1
+        self.timeouts.append(timeout)
+        if self.calls <= self.failures:
+            raise ConnectionError("timed out")
+        return {"name": "Apple Inc"}
+
+
+def test_failures_surface_through_fetch_and_are_not_cached(monkeypatch):
+    provider = FlakyProvider()
+    monkeypatch.setattr(finnhub_client, "get_provider", lambda: provider)
+    monkeypatch.setattr(finnhub_client, "QUOTE_CACHE", QuoteCache(max_entries=10, ttls={"finnhub": 60}))
+    client = FinnhubClient(calls_per_minute=600, burst=5, timeout=1, workers=1)
+
+    with pytest.raises(FinnhubUnavailable):
+        client.fetch("stock/profile2", symbol="AAPL")
+    assert client.get("stock/profile2", {}, symbol="AAPL") == {"name": "Apple Inc"}
+    assert client.stats()["calls"] == 2 and client.stats()["errors"] == 1
+
+
+def test_calls_beyond_the_burst_queue_for_quota_instead_of_failing(monkeypatch):
+    monkeypatch.setattr(finnhub_client, "get_provider", lambda: FlakyProvider(failures=0))
+    monkeypatch.setattr(finnhub_client, "QUOTE_CACHE", QuoteCache(max_entries=10, ttls={"finnhub": 60}))
+    client = FinnhubClient(calls_per_minute=1200, burst=1, timeout=1, workers=1, queue_timeout=0)
+    client.limiter.acquire()
+
+    assert client.get("stock/profile2", "throttled", symbol="MSFT") == "throttled"
+    assert client.stats()["throttled"] == 1
+
+    client.queue_timeout = 1  # a token every 50ms: the call waits for it
+    assert client.get("stock/profile2", "throttled", symbol="MSFT") != "throttled"
+
+
+def test_calls_use_the_client_timeout_and_fall_back_to_the_last_response(monkeypatch):
+    provider = FlakyProvider(failures=0)
+    cache = QuoteCache(max_entries=10, ttls={"finnhub": 0})
+    monkeypatch.setattr(finnhub_client, "get_provider", lambda: provider)
+    monkeypatch.setattr(finnhub_client, "QUOTE_CACHE", cache)
+    client = FinnhubClient(calls_per_minute=60, burst=1, timeout=2.5, workers=1, queue_timeout=0)
+
+    assert client.get("stock/profile2", {}, symbol="AAPL") == {"name": "Apple Inc"}
+    assert provider.timeouts == [2.5]
+    # Expired and out of quota: the expired response beats the empty default
+    assert client.get("stock/profile2", {}, symbol="AAPL") == {"name": "Apple Inc"}
+    assert client.get("stock/profile2", {}, symbol="MSFT") == {}
+    assert client.stats()["throttled"] == 2
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from config import CONFIG
+from utils import logo_cache
+from utils.finnhub_client import FinnhubUnavailable
+from utils.logo_cache import LogoUnavailable, fetch_logo, get_logo
+
+
+class FakeFinnhub:
+    def __init__(self, profiles):
+        self.profiles = profiles
+
+    def fetch(self, path, symbol):
+        profile = self.profiles.get(symbol)
+        if isinstance(profile, Exception):
+            raise profile
+        return profile or {}
+
+
+class FakeProvider:
+    def url_exists(self, url):
+        return url == "https://logo.clearbit.com/clear.com"
+
+
+class Immediate:
+    def submit(self, fn):
+        fn()
+
+
+@pytest.fixture
+def cache(monkeypatch, fake_connection):
+    """An empty logo cache with fake sources; returns the fake stock_logos table"""
+    conn = fake_connection()
+    monkeypatch.setattr(logo_cache, "_logos", {})
+    monkeypatch.setattr(logo_cache, "_failed_at", {})
+    monkeypatch.setattr(logo_cache, "_loaded", False)
+    monkeypatch.setattr(logo_cache, "init_db", lambda: conn)
+    monkeypatch.setattr(logo_cache, "BACKGROUND_POOL", Immediate())
+    monkeypatch.setattr(logo_cache, "get_provider", lambda: FakeProvider())
+    monkeypatch.setattr(logo_cache, "FINNHUB", FakeFinnhub({
+        "FH": {"logo": "https://finnhub/fh.png"},
+        "DOWN": FinnhubUnavailable("timed out"),
+    }))
+    monkeypatch.setattr(logo_cache, "get_ticker_info",
+                        lambda symbol: {"logo_url": "https://yahoo/yh.png"} if symbol == "YH" else {})
+    return conn
+
+
+def test_sources_are_tried_in_order(cache):
+    assert fetch_logo("FH") == "https://finnhub/fh.png"
+    assert fetch_logo("YH") == "https://yahoo/yh.png"
+    assert fetch_logo("CB", domain_fallback="clear.com") == "https://logo.clearbit.com/clear.com"
+    assert fetch_logo("AAPL") == logo_cache.COMMON_LOGOS["AAPL"]
+    assert fetch_logo("NONE") is None
+    with pytest.raises(LogoUnavailable):
+        fetch_logo("DOWN")
+
+
+def test_found_and_missing_logos_are_stored_but_failures_are_not(cache):
+    assert get_logo("FH") == "https://finnhub/fh.png"
+    assert get_logo("NONE") is None
+    assert get_logo("DOWN") is None
+    stored = [row for sql, rows in cache.executed if "INSERT INTO stock_logos" in sql for row in rows]
+    assert [symbol for symbol, _ in stored] == ["FH", "NONE"]
+    assert "DOWN" in logo_cache._failed_at
+
+
+def test_positive_and_negative_entries_expire_separately(cache):
+    now = time.time()
+    old = now - CONFIG.LOGO_NEGATIVE_TTL_SECONDS - 1
+    assert logo_cache._is_fresh("https://x/logo.png", old)  # well inside LOGO_TTL_SECONDS
+    assert not logo_cache._is_fresh(None, old)
+    assert not logo_cache._is_fresh("https://x/logo.png", now - CONFIG.LOGO_TTL_SECONDS - 1)
+
+
+def test_expired_entry_is_served_then_refreshed_in_the_background(cache):
+    expired = time.time() - CONFIG.LOGO_TTL_SECONDS - 1
+    logo_cache._logos.update({"FH": ("https://finnhub/old.png", expired), "DOWN": ("https://down/old.png", expired)})
+    logo_cache._loaded = True
+
+    assert get_logo("FH") == "https://finnhub/old.png"
+    assert get_logo("FH") == "https://finnhub/fh.png"
+    # A failed refresh keeps the stored logo
+    assert get_logo("DOWN") == "https://down/old.png"
+    assert logo_cache._logos["DOWN"][0] == "https://down/old.png"
+
+
+def test_a_failed_load_is_retried(cache, monkeypatch):
+    cache.rows = [("OLD", "https://stored/old.png", time.time())]
+    attempts = []
+
+    def flaky_db():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database is down")
+        return cache
+
+    monkeypatch.setattr(logo_cache, "init_db", flaky_db)
+    logo_cache._load()
+    assert not logo_cache._loaded
+
+    assert get_logo("OLD") == "https://stored/old.png"
+    assert logo_cache._loaded
@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from utils.market_data import compute_wallet_frame
+
+
+def test_wallet_frame_uses_each_symbols_own_bars():
+    index = pd.to_datetime(["2025-08-01", "2025-08-02", "2025-08-03", "2025-08-04"])
+    closes = pd.DataFrame({
+        "AAPL": [100.0, np.nan, 110.0, 121.0],   # no bar on the weekend
+        "BTC-USD": [50.0, 55.0, 60.0, np.nan],   # no bar yet today
+    }, index=index)
+    holdings = [
+        {"symbol": "AAPL", "quantity": 2, "avg_cost": Decimal("100.00")},
+        {"symbol": "BTC-USD", "quantity": 1, "avg_cost": None},
+    ]
+
+    df = compute_wallet_frame(holdings, closes).set_index("symbol")
+
+    assert df.loc["AAPL", "currentPrice"] == 121.0
+    assert round(df.loc["AAPL", "change24h"], 6) == 10.0
+    assert round(df.loc["AAPL", "change7d"], 6) == 21.0
+    assert df.loc["AAPL", "marketValue"] == 242.0
+    assert df.loc["AAPL", "gainLoss"] == 42.0
+    assert df.loc["BTC-USD", "currentPrice"] == 60.0
+    assert round(df.loc["BTC-USD", "change24h"], 6) == round((60 - 55) / 55 * 100, 6)
+    assert df.loc["BTC-USD", "gainLossPercent"] == 0.0
+
+
+def test_wallet_frame_without_prices_is_all_zeros():
+    holdings = [{"symbol": "ZZZZ", "quantity": 3, "avg_cost": Decimal("5.00")}]
+
+    df = compute_wallet_frame(holdings, pd.DataFrame(columns=["ZZZZ"], dtype=float))
+
+    assert df.loc[0, "currentPrice"] == 0.0
+    assert df.loc[0, "marketValue"] == 0.0
+    assert df.loc[0, "change24h"] == 0.0
+    assert df.loc[0, "gainLoss"] == -15.0
+
+
+def test_fetch_concurrently_returns_last_known_for_slow_symbols():
+    import threading
+    import time
+    from utils.market_data import fetch_concurrently
+    from utils.quote_cache import QUOTE_CACHE
+
+    QUOTE_CACHE.put("test_enrichment", "SLOW", {"sector": "Cached"})
+    release = threading.Event()
+
+    def fetch(symbol):
+        if symbol == "SLOW":
+            release.wait(2)
+        return {"sector": f"Fresh {symbol}"}
+
+    started = time.monotonic()
+    results, stale = fetch_concurrently(fetch, ["FAST", "SLOW"], 0.2, "test_enrichment")
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert elapsed < 1
+    assert results["FAST"] == {"sector": "Fresh FAST"}
+    assert results["SLOW"] == {"sector": "Cached"}
+    assert stale == {"SLOW"}
@@ -0,0 +1,54 @@
+import time
+
+import pandas as pd
+import pytest
+
+from utils.market_provider import (MarketDataProvider, RecordingProvider, ReplayMiss, ReplayProvider,
+                                   ReplayStore, parse_latency)
+
+
+class FakeUpstream(MarketDataProvider):
+    def __init__(self):
+        self.calls = 0
+
+    def ticker_info(self, symbol):
+        self.calls += 1
+        return {"symbol": symbol, "currentPrice": 101.5}
+
+    def download(self, symbols, **kwargs):
+        self.calls += 1
+        return pd.DataFrame({symbol: [1.0, 2.0] for symbol in symbols})
+
+
+def test_recorded_calls_replay_without_upstream(tmp_path):
+    store = ReplayStore(str(tmp_path))
+    upstream = FakeUpstream()
+    recorder = RecordingProvider(upstream, store)
+    recorder.ticker_info("AAPL")
+    recorder.download(["MSFT", "AAPL"], period="7d")
+
+    replay = ReplayProvider(store)
+    assert replay.ticker_info("AAPL") == {"symbol": "AAPL", "currentPrice": 101.5}
+    # Symbol order does not change the recording a bulk download maps to
+    assert list(replay.download(["AAPL", "MSFT"], period="7d").columns) == ["MSFT", "AAPL"]
+    assert upstream.calls == 2
+
+    with pytest.raises(ReplayMiss):
+        replay.ticker_info("TSLA")
+    assert replay.stats()["misses"] == 1
+
+
+def test_replay_latency_is_configurable_and_deterministic(tmp_path):
+    assert parse_latency("download=800,default=100") == {"download": 800.0, "default": 100.0}
+    assert parse_latency("150") == {"default": 150.0}
+
+    replay = ReplayProvider(ReplayStore(str(tmp_path)), {"ticker_info": 30, "default": 0}, jitter_ms=20)
+    first = replay.delay_for("ticker_info", "AAPL")
+    assert first == replay.delay_for("ticker_info", "AAPL")
+    assert 0.03 <= first <= 0.05
+    assert replay.delay_for("download", "AAPL") <= 0.02
+
+    started = time.monotonic()
+    with pytest.raises(ReplayMiss):
+        replay.ticker_info("AAPL")
+    assert time.monotonic() - started >= 0.03
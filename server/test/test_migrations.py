@@ -0,0 +1,93 @@
+import os
+import shutil
+from decimal import Decimal
+
+import mysql.connector
+import pytest
+
+from config import CONFIG
+from utils.migrations import MIGRATIONS_DIR, apply_migrations, load_migrations, split_statements
+from utils.query_plans import check_query_plans, full_scans
+
+
+def test_split_statements_drops_comments():
+    sql = """
+    -- first
+    CREATE TABLE a (id INT);
+    UPDATE a SET id = 1
+    WHERE id = 0;
+    """
+    assert split_statements(sql) == ["CREATE TABLE a (id INT)", "UPDATE a SET id = 1\n    WHERE id = 0"]
+
+
+def test_shipped_migrations_are_ordered_and_index_the_hot_paths():
+    migrations = load_migrations(MIGRATIONS_DIR)
+    versions = [version for version, _, _ in migrations]
+    assert versions == sorted(versions) == list(range(1, len(versions) + 1))
+    statements = "\n".join(s for _, _, statements in migrations for s in statements)
+    assert "uq_stocks_symbol (symbol)" in statements
+    assert "stockstransactions (stocksportfolios_id, transaction_date" in statements
+    # Colliding holdings are merged before holdings are re-pointed at the kept stocks row
+    assert statements.index("DELETE sp FROM stocksportfolios") < statements.index("SET sp.stock_id = c.keep_id")
+
+
+def test_plan_check_reports_full_table_scans(fake_connection):
+    plans = {
+        "indexed": [{"table": "a", "type": "const"}, {"table": "t", "type": "ref"}],
+        "scanning": [{"table": "a", "type": "const"}, {"table": "t", "type": "ALL"},
+                     {"table": "<derived2>", "type": "ALL"}],
+    }
+    assert full_scans(plans["scanning"]) == ["t"]
+    conn = fake_connection(lambda cursor, sql, params: plans[sql.split()[1]])
+    problems = check_query_plans(conn, {"ok": ("indexed", ()), "bad": ("scanning", ())})
+    assert problems == ["bad: full table scan on t"]
+
+
+@pytest.fixture
+def scratch_db():
+    """A throwaway database on the configured MySQL server (skipped without one)"""
+    try:
+        conn = mysql.connector.connect(host=CONFIG.DB_HOST, user=CONFIG.DB_USER, password=CONFIG.DB_PASSWORD,
+                                       connection_timeout=2)
+    except mysql.connector.Error:
+        pytest.skip("needs a MySQL server")
+    cursor = conn.cursor()
+    cursor.execute("DROP DATABASE IF EXISTS bygdb_migration_test")
+    cursor.execute("CREATE DATABASE bygdb_migration_test")
+    cursor.execute("USE bygdb_migration_test")
+    try:
+        yield conn
+    finally:
+        cursor.execute("DROP DATABASE IF EXISTS bygdb_migration_test")
+        cursor.close()
+        conn.close()
+
+
+def test_symbol_dedupe_merges_holdings_of_both_duplicate_rows(scratch_db, tmp_path):
+    for name in ["0001_baseline.sql", "0002_stock_logos.sql"]:
+        shutil.copy(os.path.join(MIGRATIONS_DIR, name), tmp_path)
+    apply_migrations(scratch_db, str(tmp_path))
+
+    cursor = scratch_db.cursor()
+    cursor.execute("INSERT INTO users (id, username) VALUES (1, 'a'), (2, 'b')")
+    cursor.execute("INSERT INTO accounts (id, user_id) VALUES (1, 1), (2, 2)")
+    cursor.execute("INSERT INTO portfolios (id, account_id) VALUES (1, 1), (2, 2)")
+    cursor.execute("INSERT INTO stocks (id, symbol) VALUES (1, 'AAPL'), (2, 'AAPL'), (3, 'MSFT')")
+    # Portfolio 1 holds AAPL under both rows; portfolio 2 only under the duplicate
+    cursor.execute("""INSERT INTO stocksportfolios (id, portfolios_id, stock_id, quantity, average_cost)
+                      VALUES (1, 1, 1, 10, 100.00), (2, 1, 2, 30, 120.00), (3, 2, 2, 5, 90.00), (4, 1, 3, 1, 50.00)""")
+    cursor.execute("""INSERT INTO stockstransactions (stocksportfolios_id, transaction_type, quantity, price)
+                      VALUES (1, 'buy', 10, 100.00), (2, 'buy', 30, 120.00), (3, 'buy', 5, 90.00)""")
+    scratch_db.commit()
+
+    shutil.copy(os.path.join(MIGRATIONS_DIR, "0003_hot_query_indexes.sql"), tmp_path)
+    assert apply_migrations(scratch_db, str(tmp_path)) == [3]
+
+    cursor.execute("SELECT id, symbol FROM stocks ORDER BY id")
+    assert cursor.fetchall() == [(1, "AAPL"), (3, "MSFT")]
+    cursor.execute("SELECT id, portfolios_id, stock_id, quantity, average_cost FROM stocksportfolios ORDER BY id")
+    assert cursor.fetchall() == [(1, 1, 1, 40, Decimal("115.00")), (3, 2, 1, 5, Decimal("90.00")),
+                                 (4, 1, 3, 1, Decimal("50.00"))]
+    cursor.execute("SELECT stocksportfolios_id FROM stockstransactions ORDER BY id")
+    assert cursor.fetchall() == [(1,), (1,), (3,)]
+    cursor.close()
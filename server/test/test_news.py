@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from utils import news
+from utils.quote_cache import QuoteCache
+
+
+class FakeProvider:
+    def __init__(self, failures):
+        self.failures = failures
+        self.fetches = 0
+
+    def article_html(self, url):
+        self.fetches += 1
+        if self.fetches <= self.failures:
+            raise TimeoutError("read timed out")
+        return '<html><head><meta property="og:image" content="/img/lead.jpg"></head></html>'
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    monkeypatch.setattr(news, "QUOTE_CACHE", QuoteCache(max_entries=10, ttls={"article_image": 3600}))
+    monkeypatch.setattr(news, "_snapshots", {})
+    monkeypatch.setattr(news, "_rebuilding", set())
+
+
+def test_failed_image_fetch_is_retried_not_cached(isolated, monkeypatch):
+    provider = FakeProvider(failures=1)
+    monkeypatch.setattr(news, "get_provider", lambda: provider)
+
+    with pytest.raises(TimeoutError):
+        news.get_article_image("https://news.example/story")
+    assert news.get_article_image("https://news.example/story") == "https://news.example/img/lead.jpg"
+    assert news.get_article_image("https://news.example/story") == "https://news.example/img/lead.jpg"
+    assert provider.fetches == 2
+
+
+def test_stale_snapshot_is_served_while_one_rebuild_runs(isolated, monkeypatch):
+    release = threading.Event()
+    builds = []
+
+    def slow_build(symbols):
+        builds.append(symbols)
+        release.wait(5)
+        news._snapshots[symbols] = (["fresh"], True, time.monotonic())
+        return ["fresh"]
+
+    monkeypatch.setattr(news, "fetch_yahoo_news", slow_build)
+    news._snapshots["SYM"] = (["old"], True, time.monotonic() - news.CONFIG.NEWS_REFRESH_SECONDS - 1)
+
+    assert [news.get_news_snapshot("SYM") for _ in range(5)] == [["old"]] * 5
+    assert builds == ["SYM"]
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while news._rebuilding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert news.get_news_snapshot("SYM") == ["fresh"]
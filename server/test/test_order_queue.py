@@ -0,0 +1,141 @@
+from decimal import Decimal
+
+import pytest
+from mysql.connector.errors import DatabaseError
+
+import queries
+from utils import order_queue, trade_engine
+from utils.order_queue import OrderQueue
+from utils.trade_engine import StockIdCache
+
+
+class Account:
+    """One account (user 1) holding 10 AAPL, behind a fake connection; the balance and holding follow the writes"""
+
+    def __init__(self):
+        self.balance = Decimal("100.00")
+        self.shares = 10
+        self.locks = 0
+        self.fills = []
+        self.pending = []
+        self.next_id = 0
+        self.commits = 0
+        self.fail_commit = None   # "lost" (COMMIT raises, nothing applied) or "applied" (applied, then raises)
+        self._committed = (self.balance, self.shares)
+
+    def respond(self, cursor, sql, params):
+        if sql == queries.TRADE_ACCOUNT_FOR_UPDATE:
+            self.locks += 1
+            return [{"account_id": 3, "balance": self.balance, "portfolio_id": 5,
+                     "holding_id": 11, "quantity": self.shares, "average_cost": Decimal("50.00")}]
+        if sql == queries.UPDATE_HOLDING:
+            self.shares = params[0]
+        elif sql == queries.UPDATE_BALANCE:
+            self.balance = params[0]
+        elif sql == queries.INSERT_TRANSACTION:
+            self.next_id += 1
+            cursor.lastrowid = self.next_id
+            self.pending.append(params)
+        elif sql == queries.TRANSACTION_EXISTS:
+            return [{"id": params[0]}] if params[0] <= len(self.fills) else []
+        elif sql == "COMMIT":
+            self._commit()
+        elif sql == "ROLLBACK":
+            self.pending = []
+            self.balance, self.shares = self._committed
+        return []
+
+    def _commit(self):
+        failure, self.fail_commit = self.fail_commit, None
+        if failure == "lost":
+            self.respond(None, "ROLLBACK", ())
+            raise DatabaseError(msg="Lost connection to MySQL server during query")
+        self.commits += 1
+        self.fills.extend(self.pending)
+        self.pending = []
+        self._committed = (self.balance, self.shares)
+        if failure == "applied":
+            raise DatabaseError(msg="Lost connection to MySQL server during query")
+
+
+@pytest.fixture
+def account(monkeypatch, fake_connection):
+    account = Account()
+    conn = fake_connection(account.respond)
+    stock_ids = StockIdCache()
+    stock_ids.put("AAPL", 7)
+    monkeypatch.setattr(trade_engine, "STOCK_IDS", stock_ids)
+    monkeypatch.setattr(order_queue, "init_db", lambda: conn)
+    return account
+
+
+def test_batch_is_filled_in_order_with_one_commit(account):
+    orders = OrderQueue(workers=1, batch_size=10, batch_wait_ms=0, max_finished=100)
+    batch = [order_queue.Order(1, "AAPL", *order) for order in [
+        ("sell", Decimal(4), Decimal("60.00")),    # +240 cash
+        ("buy", Decimal(5), Decimal("60.00")),     # -300, only affordable after the sell
+        ("sell", Decimal(20), Decimal("60.00")),   # more than held: rejected, batch goes on
+        ("sell", Decimal(1), Decimal("70.00")),
+    ]]
+    orders.process(batch)
+
+    assert [order.status for order in batch] == ["filled", "filled", "rejected", "filled"]
+    assert account.commits == 1
+    assert len(account.fills) == 3
+    assert account.balance == Decimal("110.00")
+    assert account.shares == 10
+    assert "Insufficient shares" in batch[2].to_dict()["message"]
+    assert orders.stats()["avgBatchSize"] == 4.0
+
+
+def test_submitted_orders_can_be_awaited(account):
+    orders = OrderQueue(workers=2, batch_size=10, batch_wait_ms=1, max_finished=100)
+    order = orders.submit("1", "aapl", "sell", "2", "55.50")
+    assert order.symbol == "AAPL"
+
+    finished = orders.wait(order.id, timeout=5)
+    assert finished.status == "filled"
+    assert finished.to_dict()["message"] == "Successfully sold 2 shares of AAPL for $111.00"
+    assert orders.wait("unknown", timeout=0) is None
+
+    with pytest.raises(ValueError):
+        orders.submit(1, "AAPL", "sell", "-1", "10")
+
+
+def test_commit_that_went_through_is_not_replayed(account):
+    orders = OrderQueue(workers=1, batch_size=10, batch_wait_ms=0, max_finished=100)
+    batch = [order_queue.Order(1, "AAPL", "sell", Decimal(2), Decimal("60.00")) for _ in range(2)]
+    account.fail_commit = "applied"
+    orders.process(batch)
+
+    assert [order.status for order in batch] == ["filled", "filled"]
+    assert len(account.fills) == 2
+    assert account.shares == 6
+    assert orders.stats()["fallbacks"] == 0
+
+
+def test_commit_that_was_lost_is_filled_order_by_order(account):
+    orders = OrderQueue(workers=1, batch_size=10, batch_wait_ms=0, max_finished=100)
+    batch = [order_queue.Order(1, "AAPL", "sell", Decimal(2), Decimal("60.00")) for _ in range(2)]
+    account.fail_commit = "lost"
+    orders.process(batch)
+
+    assert [order.status for order in batch] == ["filled", "filled"]
+    assert len(account.fills) == 2
+    assert account.shares == 6
+    assert orders.stats()["fallbacks"] == 1
+
+
+def test_batch_fails_when_the_commit_cannot_be_checked(account, monkeypatch):
+    orders = OrderQueue(workers=1, batch_size=10, batch_wait_ms=0, max_finished=100)
+    batch = [order_queue.Order(1, "AAPL", "sell", Decimal(2), Decimal("60.00")) for _ in range(2)]
+    account.fail_commit = "applied"
+
+    def unreachable(transaction_id):
+        raise DatabaseError(msg="Can't connect to MySQL server")
+
+    monkeypatch.setattr(orders, "_transaction_exists", unreachable)
+    orders.process(batch)
+
+    assert [order.status for order in batch] == ["failed", "failed"]
+    assert len(account.fills) == 2
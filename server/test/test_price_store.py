@@ -0,0 +1,56 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from utils.price_store import PriceStore
+
+
+def make_bars(start, closes):
+    index = pd.date_range(start, periods=len(closes), freq="D")
+    return pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes,
+                         "Volume": [1000.0] * len(closes)}, index=index)
+
+
+def test_offline_store_serves_written_bars(tmp_path):
+    store = PriceStore(str(tmp_path), offline=True, fetch=None)
+    store.write("^GSPC", make_bars("2025-01-01", [1.0, 2.0, 3.0, 4.0]))
+
+    closes = store.read_closes("^GSPC", date(2025, 1, 2), date(2025, 1, 4))
+
+    assert list(closes) == [2.0, 3.0]
+    assert list(closes.index.date) == [date(2025, 1, 2), date(2025, 1, 3)]
+    assert not closes.values.flags.owndata  # a view of the memory-mapped file
+    assert store.get_closes(["^GSPC", "NONE"], date(2025, 1, 1), date(2025, 2, 1))["NONE"].isna().all()
+
+
+def test_update_only_fetches_missing_tail(tmp_path):
+    requests = []
+
+    def fetch(symbols, start, end):
+        requests.append((tuple(symbols), start))
+        full = make_bars("2025-01-01", [10.0, 11.0, 12.0, 13.0, 14.0])
+        return {symbol: full[full.index >= pd.Timestamp(start)] for symbol in symbols}
+
+    store = PriceStore(str(tmp_path), fetch=fetch, refresh_seconds=0)
+    store.write("AAPL", make_bars("2025-01-01", [10.0, 11.0, 12.5]))  # last bar stored intraday
+    store.write("MSFT", make_bars("2025-01-01", [10.0, 11.0, 12.0]))
+
+    store.update(["AAPL", "MSFT"], end=date(2025, 1, 6))
+
+    # Both symbols share the same tail start, so they are fetched in one bulk request
+    assert requests == [(("AAPL", "MSFT"), date(2025, 1, 2))]
+    np.testing.assert_array_equal(store.read_closes("AAPL").values, [10.0, 11.0, 12.0, 13.0, 14.0])
+
+
+def test_changed_adjustment_reloads_full_history(tmp_path):
+    def fetch(symbols, start, end):
+        full = make_bars("2025-01-01", [5.0, 5.5, 6.0, 6.5])  # history halved by a split
+        return {symbol: full[full.index >= pd.Timestamp(start)] for symbol in symbols}
+
+    store = PriceStore(str(tmp_path), fetch=fetch, refresh_seconds=0)
+    store.write("NVDA", make_bars("2025-01-01", [10.0, 11.0, 12.0]))
+
+    store.update(["NVDA"], end=date(2025, 1, 5))
+
+    np.testing.assert_array_equal(store.read_closes("NVDA").values, [5.0, 5.5, 6.0, 6.5])
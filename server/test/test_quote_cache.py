@@ -0,0 +1,75 @@
+import threading
+import time
+
+from utils.quote_cache import QuoteCache
+
+
+def test_hit_after_miss():
+    cache = QuoteCache(max_entries=10, ttls={"info": 60})
+    calls = []
+    loader = lambda: calls.append(1) or {"sector": "Technology"}
+
+    assert cache.get("info", "AAPL", loader) == {"sector": "Technology"}
+    assert cache.get("info", "AAPL", loader) == {"sector": "Technology"}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_per_kind():
+    cache = QuoteCache(max_entries=10, ttls={"last_price": 0, "info": 60})
+    cache.put("last_price", "AAPL", 1.0)
+    cache.put("info", "AAPL", {})
+
+    assert cache.get("last_price", "AAPL", lambda: 2.0) == 2.0
+    assert cache.get("info", "AAPL", lambda: {"new": True}) == {}
+
+
+def test_lru_eviction():
+    cache = QuoteCache(max_entries=2, ttls={})
+    cache.put("info", "A", 1)
+    cache.put("info", "B", 2)
+    cache.get("info", "A", lambda: None)  # touch A so B is the oldest
+    cache.put("info", "C", 3)
+
+    assert cache.get("info", "B", lambda: "reloaded") == "reloaded"
+    assert cache.stats()["evictions"] == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = QuoteCache(max_entries=10, ttls={"history_7d": 60})
+    calls = []
+    release = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(2)
+        return "bars"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("history_7d", "MSFT", slow_loader)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == ["bars"] * 8
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_loader_errors_are_not_cached():
+    cache = QuoteCache(max_entries=10, ttls={"info": 60})
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    try:
+        cache.get("info", "X", failing)
+    except RuntimeError:
+        pass
+    assert cache.get("info", "X", lambda: "ok") == "ok"
+    assert cache.stats()["loadErrors"] == 1
@@ -0,0 +1,55 @@
+import threading
+
+from utils.quote_stream import QuoteFeed, stream_quotes
+
+
+def test_publish_sends_only_changed_subscribed_symbols():
+    feed = QuoteFeed()
+    _, updates = feed.subscribe(["AAPL", "MSFT"])
+
+    feed.publish({"AAPL": {"price": 1.0}, "MSFT": {"price": 2.0}, "TSLA": {"price": 3.0}})
+    assert updates.get_nowait() == {"AAPL": {"price": 1.0}, "MSFT": {"price": 2.0}}
+
+    feed.publish({"AAPL": {"price": 1.0}, "MSFT": {"price": 2.5}})
+    assert updates.get_nowait() == {"MSFT": {"price": 2.5}}
+
+    feed.publish({"AAPL": {"price": 1.0}})
+    assert updates.empty()
+
+
+def test_slow_subscriber_drops_instead_of_blocking():
+    feed = QuoteFeed(max_pending=1)
+    feed.subscribe(["AAPL"])
+    feed.publish({"AAPL": {"price": 1.0}})
+    feed.publish({"AAPL": {"price": 2.0}})
+    assert feed.stats()["dropped"] == 1
+
+
+def test_stream_starts_with_snapshot_and_unsubscribes_on_close():
+    feed = QuoteFeed()
+    feed.publish({"AAPL": {"price": 1.0}})
+    stream = stream_quotes(feed, ["AAPL"])
+
+    assert next(stream) == 'event: quotes\ndata: {"AAPL": {"price": 1.0}}\n\n'
+    assert feed.subscribed_symbols() == {"AAPL"}
+    stream.close()
+    assert feed.subscribed_symbols() == set()
+
+
+def test_counters_are_exact_under_concurrent_publishers():
+    feed = QuoteFeed(max_pending=1)
+    feed.subscribe([f"S{i}" for i in range(8)])
+
+    def publish(i):
+        for n in range(200):
+            feed.publish({f"S{i}": {"price": float(n)}})
+
+    threads = [threading.Thread(target=publish, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = feed.stats()
+    assert stats["published"] == 8 * 200
+    assert stats["dropped"] == 8 * 200 - 1  # the queue holds one delta
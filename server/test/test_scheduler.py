@@ -0,0 +1,59 @@
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from config import CONFIG
+from utils.price_refresher import MARKET_TZ, is_market_open, refresh_interval
+from utils.scheduler import PeriodicJob
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2025, 1, 4, 12, 0, tzinfo=MARKET_TZ), False),   # Saturday
+    (datetime(2025, 1, 6, 9, 29, tzinfo=MARKET_TZ), False),   # Monday before the open
+    (datetime(2025, 1, 6, 9, 30, tzinfo=MARKET_TZ), True),
+    (datetime(2025, 1, 6, 15, 59, tzinfo=MARKET_TZ), True),
+    (datetime(2025, 1, 6, 16, 0, tzinfo=MARKET_TZ), False),   # the close itself
+    (datetime(2025, 1, 6, 15, 0, tzinfo=ZoneInfo("UTC")), True),  # 10:00 in New York
+])
+def test_market_hours(now, expected):
+    assert is_market_open(now) is expected
+
+
+def test_refresh_interval_follows_the_session():
+    assert refresh_interval(datetime(2025, 1, 6, 11, 0, tzinfo=MARKET_TZ)) == CONFIG.PRICE_REFRESH_OPEN_SECONDS
+    assert refresh_interval(datetime(2025, 1, 6, 20, 0, tzinfo=MARKET_TZ)) == CONFIG.PRICE_REFRESH_CLOSED_SECONDS
+
+
+def test_failing_job_is_counted_and_keeps_running():
+    calls = []
+    ran_once, ran_twice = threading.Event(), threading.Event()
+
+    def fail():
+        calls.append(1)
+        (ran_twice if len(calls) >= 2 else ran_once).set()
+        raise RuntimeError("provider down")
+
+    job = PeriodicJob("failing", fail, interval=60)
+    assert not job.is_running()
+    job.start()
+    try:
+        assert job.is_running()
+        assert ran_once.wait(5)  # the first run happens on start, the second on demand
+        job.trigger()
+        assert ran_twice.wait(5)
+    finally:
+        job.stop(timeout=5)
+
+    stats = job.stats()
+    assert stats["failures"] == stats["runs"] >= 2
+    assert stats["lastError"] == "provider down"
+    assert not stats["running"]
+
+
+def test_interval_may_be_computed_per_run():
+    job = PeriodicJob("dynamic", lambda: None, interval=lambda: 42, run_immediately=False)
+    assert job.next_interval() == 42
+    job.run_once()
+    assert job.stats()["runs"] == 1 and job.stats()["lastError"] is None
@@ -0,0 +1,71 @@
+from datetime import date, datetime
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+import queries
+from utils.snapshots import compute_daily_snapshots, last_closed_day, load_balances, market_today, roll_forward
+from utils.price_refresher import MARKET_TZ
+
+
+def make_ledger():
+    return pd.DataFrame([
+        {"symbol": "AAPL", "transaction_type": "buy", "quantity": 10, "price": Decimal("100.00"),
+         "transaction_date": datetime(2025, 1, 1, 10, 0)},
+        {"symbol": "AAPL", "transaction_type": "sell", "quantity": 4, "price": Decimal("120.00"),
+         "transaction_date": datetime(2025, 1, 6, 15, 30)},
+        {"symbol": "MSFT", "transaction_type": "buy", "quantity": 1, "price": Decimal("50.00"),
+         "transaction_date": datetime(2025, 1, 9, 9, 45)},  # after the range, still moves cash
+    ])
+
+
+# Friday and Monday closes only; the weekend carries Friday's close
+CLOSES = pd.DataFrame({"AAPL": [110.0, 120.0]}, index=pd.to_datetime(["2025-01-03", "2025-01-06"]))
+
+
+def test_daily_snapshots_from_trades_before_and_inside_the_range():
+    ledger = make_ledger()
+    closes = CLOSES
+
+    series = compute_daily_snapshots(ledger, Decimal("1000.00"), closes, date(2025, 1, 4), date(2025, 1, 7))
+
+    assert list(series.index.date) == [date(2025, 1, d) for d in (4, 5, 6, 7)]
+    assert list(series["market_value"]) == [1100.0, 1100.0, 720.0, 720.0]
+    assert list(series["cost_basis"]) == [1000.0, 1000.0, 520.0, 520.0]
+    # Today's 1000 plus the MSFT buy made after the range
+    assert list(series["cash_balance"]) == [570.0, 570.0, 1050.0, 1050.0]
+
+
+def test_user_without_trades_keeps_their_balance():
+    empty = pd.DataFrame(columns=["symbol", "transaction_type", "quantity", "price", "transaction_date"])
+    series = compute_daily_snapshots(empty, 20000, pd.DataFrame(), date(2025, 1, 1), date(2025, 1, 3))
+    assert list(series["cash_balance"]) == [20000.0] * 3
+    assert (series["market_value"] == 0).all()
+
+
+def test_snapshot_day_rolls_over_after_the_close():
+    assert last_closed_day(datetime(2025, 3, 3, 15, 0, tzinfo=MARKET_TZ)) == date(2025, 3, 2)
+    assert last_closed_day(datetime(2025, 3, 3, 16, 30, tzinfo=MARKET_TZ)) == date(2025, 3, 3)
+
+
+def test_rolling_forward_matches_replaying_the_whole_ledger():
+    ledger = make_ledger()
+    trades = ledger[ledger["transaction_date"] >= datetime(2025, 1, 6)]
+    # Today's holdings: every trade applied, including the MSFT buy after the range
+    series = roll_forward(trades, {"AAPL": 6, "MSFT": 1}, Decimal("1000.00"), Decimal("1000.00"), CLOSES,
+                          date(2025, 1, 6), date(2025, 1, 7))
+    full = compute_daily_snapshots(ledger, Decimal("1000.00"), CLOSES, date(2025, 1, 6), date(2025, 1, 7))
+    assert series.equals(full)
+
+
+def test_balances_of_some_users_are_filtered_in_sql(fake_connection):
+    conn = fake_connection(rows=[{"user_id": 7, "balance": Decimal("5.00")}])
+    assert load_balances(conn.cursor(dictionary=True), [7, 8]) == {7: Decimal("5.00")}
+    assert conn.executed == [(queries.ACCOUNT_BALANCES + " AND user_id IN (%s, %s)", (7, 8))]
+
+
+def test_snapshot_days_use_the_market_clock():
+    late_evening_in_new_york = datetime(2025, 3, 4, 2, 0, tzinfo=ZoneInfo("UTC"))
+    assert market_today(late_evening_in_new_york) == date(2025, 3, 3)
+    assert last_closed_day(late_evening_in_new_york) == date(2025, 3, 3)
@@ -0,0 +1,58 @@
+from config import CONFIG
+from utils import stock_metadata
+from utils.stock_metadata import UNKNOWN, backfill_missing_metadata, refresh_symbols
+
+
+class FakeProvider:
+    INFO = {
+        "AAPL": {"longName": "Apple Inc.", "sector": "Technology", "industry": "Consumer Electronics"},
+        "NEWCO": {"shortName": "NewCo"},  # no sector or industry yet
+    }
+
+    def ticker_info(self, symbol):
+        if symbol not in self.INFO:
+            raise ConnectionError(f"{symbol}: upstream error")
+        return self.INFO[symbol]
+
+
+def batches(conn):
+    return [(sql, rows) for sql, rows in conn.executed if sql.lstrip().startswith("UPDATE")]
+
+
+def test_fetched_symbols_are_stored_in_one_batch_and_failures_skipped(monkeypatch, fake_connection):
+    conn = fake_connection()
+    monkeypatch.setattr(stock_metadata, "init_db", lambda: conn)
+    monkeypatch.setattr(stock_metadata, "get_provider", lambda: FakeProvider())
+
+    assert refresh_symbols(["AAPL", "NEWCO", "BROKEN"]) == 2
+
+    assert conn.commits == 1
+    [(sql, rows)] = batches(conn)
+    assert "UPDATE stocks SET company_name = %s" in sql and "metadata_checked_at = NOW()" in sql
+    assert sorted(rows) == [("Apple Inc.", "Technology", "Consumer Electronics", "AAPL"),
+                            ("NewCo", UNKNOWN, UNKNOWN, "NEWCO")]
+
+
+def test_nothing_is_written_when_every_fetch_fails(monkeypatch, fake_connection):
+    conn = fake_connection()
+    monkeypatch.setattr(stock_metadata, "init_db", lambda: conn)
+    monkeypatch.setattr(stock_metadata, "get_provider", lambda: FakeProvider())
+
+    assert refresh_symbols(["BROKEN", "GONE"]) == 0
+    assert refresh_symbols([]) == 0
+    assert conn.executed == []
+
+
+def test_backfill_skips_rows_checked_within_the_ttl(monkeypatch, fake_connection):
+    conn = fake_connection(rows=[("NEWCO",)])
+    monkeypatch.setattr(stock_metadata, "init_db", lambda: conn)
+    monkeypatch.setattr(stock_metadata, "get_provider", lambda: FakeProvider())
+
+    assert backfill_missing_metadata() == 1
+
+    (sql, params), _ = conn.executed
+    assert "metadata_checked_at IS NULL OR metadata_checked_at < NOW() - INTERVAL %s SECOND" in sql
+    assert params == (CONFIG.METADATA_TTL_SECONDS,)
+    # Still 'Unknown' upstream, but stamped as checked so the next backfill skips it
+    [(sql, rows)] = batches(conn)
+    assert "metadata_checked_at = NOW()" in sql and rows == [("NewCo", UNKNOWN, UNKNOWN, "NEWCO")]
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from config import CONFIG
+from utils import symbol_index
+from utils.quote_cache import QuoteCache
+from utils.symbol_index import SymbolIndex, search_symbols
+
+
+def make_index():
+    index = SymbolIndex()
+    index.add_many([
+        {"symbol": "AAPL", "name": "Apple Inc", "type": "Stock"},
+        {"symbol": "AAL", "name": "American Airlines Group Inc"},
+        {"symbol": "AMZN", "name": "Amazon.com Inc"},
+        {"symbol": "AMD", "name": "Advanced Micro Devices Inc"},
+        {"symbol": "MSFT", "name": "Microsoft Corp"},
+        {"symbol": "BAC", "name": "Bank of America Corp"},
+    ])
+    return index
+
+
+def test_symbol_prefix_ranks_shorter_symbols_first():
+    results = make_index().search("am")
+
+    assert [r["symbol"] for r in results][:2] == ["AMD", "AMZN"]
+    assert "AAL" in [r["symbol"] for r in results]  # "American" matches the company name
+
+
+def test_every_word_must_match_a_name_token():
+    assert [r["symbol"] for r in make_index().search("bank amer")] == ["BAC"]
+    assert make_index().search("bank micro") == []
+
+
+def test_result_shape_and_replace():
+    index = make_index()
+    index.add_many([{"symbol": "aapl", "name": "Renamed"}], replace=False)
+
+    assert index.search("AAPL")[0] == {"symbol": "AAPL", "name": "Apple Inc", "type": "Stock",
+                                       "region": "United States", "currency": "USD"}
+    assert len(index) == 6
+
+
+class FakeProvider:
+    def __init__(self, listing="symbol,name,exchange,assetType,ipoDate,delistingDate,status\n"
+                               "ZBRA,Zebra Technologies Corp,NASDAQ,Stock,,null,Active\n"):
+        self.listing_text = listing
+        self.searches = 0
+
+    def search(self, query):
+        self.searches += 1
+        if self.searches == 1:
+            raise RuntimeError("Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day.")
+        return [{"symbol": "QQQ", "name": "Invesco QQQ Trust"}]
+
+    def listing(self):
+        return self.listing_text
+
+
+class Immediate:
+    def submit(self, fn):
+        fn()
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    """An unbuilt global index over a two-row seed listing, with fake upstreams"""
+    seed = tmp_path / "listings.csv"
+    seed.write_text("symbol,name,exchange,assetType,ipoDate,delistingDate,status\n"
+                    "AAPL,Apple Inc,NASDAQ,Stock,,null,Active\n")
+    monkeypatch.setattr(CONFIG, "SYMBOL_LISTING_PATH", str(seed))
+    monkeypatch.setattr(CONFIG, "SYMBOL_FULL_LISTING_PATH", str(tmp_path / "listings_full.csv"))
+    monkeypatch.setattr(symbol_index, "SYMBOL_INDEX", SymbolIndex())
+    monkeypatch.setattr(symbol_index, "QUOTE_CACHE", QuoteCache(max_entries=10, ttls={"symbol_search": 3600}))
+    monkeypatch.setattr(symbol_index, "BACKGROUND_POOL", Immediate())
+    monkeypatch.setattr(symbol_index, "load_stocks_table", lambda: [])
+    provider = FakeProvider()
+    monkeypatch.setattr(symbol_index, "get_provider", lambda: provider)
+    return provider
+
+
+def test_rate_limited_search_is_not_cached(index):
+    assert search_symbols("qqq") == []
+    assert [r["symbol"] for r in search_symbols("qqq")] == ["QQQ"]
+    assert index.searches == 2
+
+
+def test_full_listing_is_downloaded_and_loaded_on_first_build(index):
+    assert [r["symbol"] for r in search_symbols("zbra")] == ["ZBRA"]
+    assert not symbol_index.SYMBOL_INDEX.partial
+    assert index.searches == 0
+
+
+def test_a_rate_limit_message_never_replaces_the_listing(index, tmp_path):
+    index.listing_text = '{"Information": "rate limit"}'
+    with pytest.raises(RuntimeError):
+        symbol_index.download_listing(str(tmp_path / "listings_full.csv"))
+    assert not (tmp_path / "listings_full.csv").exists()
+
+
+def test_concurrent_first_searches_build_and_download_once(index, monkeypatch):
+    submitted = []
+    loads = []
+
+    class Deferred:
+        def submit(self, fn):
+            submitted.append(fn)
+
+    def slow_stocks_table():
+        loads.append(1)
+        time.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(symbol_index, "_downloading", False)
+    monkeypatch.setattr(symbol_index, "BACKGROUND_POOL", Deferred())
+    monkeypatch.setattr(symbol_index, "load_stocks_table", slow_stocks_table)
+    threads = [threading.Thread(target=search_symbols, args=("aapl",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(submitted) == 1
+    symbol_index._download_in_background()
+    assert len(submitted) == 1  # still downloading
+    submitted[0]()
+    symbol_index._download_in_background()
+    assert len(submitted) == 2
@@ -0,0 +1,70 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from utils import snapshots
+from utils.timeline_cache import TimelineCache
+
+
+def timeline_db(fake_connection):
+    """Answers the two timeline queries from conn.latest_id and conn.first_date"""
+
+    def respond(cursor, sql, params):
+        if "MAX(t.id)" in sql:
+            return [{"latest_id": conn.latest_id}]
+        return [{"first_date": conn.first_date}]
+
+    conn = fake_connection(respond)
+    conn.latest_id = None
+    conn.first_date = None
+    return conn
+
+
+@pytest.fixture
+def store(monkeypatch, fake_connection):
+    """Snapshot table stand-in: one row per day, value = day of month (+100 once recomputed)"""
+    calls = {"read": [], "backfill": []}
+    offset = {"value": 0}
+
+    def read_snapshots(cursor, user_id, start, end):
+        calls["read"].append((start, end))
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return pd.DataFrame({"market_value": [d.day + offset["value"] for d in days],
+                             "cost_basis": 0.0, "cash_balance": 0.0}, index=days, dtype=float)
+
+    def backfill_snapshots(start, end, user_ids=None):
+        calls["backfill"].append((start, end))
+        offset["value"] = 100
+
+    monkeypatch.setattr(snapshots, "read_snapshots", read_snapshots)
+    monkeypatch.setattr(snapshots, "backfill_snapshots", backfill_snapshots)
+    monkeypatch.setattr(snapshots, "TIMELINES", TimelineCache(max_users=10))
+    monkeypatch.setattr(snapshots, "init_db", lambda: timeline_db(fake_connection))
+    return calls
+
+
+def test_timeline_is_extended_then_recomputed_from_the_trade_date(store, fake_connection):
+    conn = timeline_db(fake_connection)
+    cursor = conn.cursor(dictionary=True)
+    conn.latest_id = 7
+    start = date(2025, 1, 1)
+
+    first = snapshots.past_series(cursor, 1, start, date(2025, 1, 10))
+    assert len(first) == 10 and store["read"] == [(start, date(2025, 1, 10))]
+
+    # Same latest transaction, one day later: only the new day is read
+    store["read"].clear()
+    extended = snapshots.past_series(cursor, 1, start, date(2025, 1, 11))
+    assert store["read"] == [(date(2025, 1, 11), date(2025, 1, 11))]
+    assert len(extended) == 11
+
+    # A backdated trade on the 5th: days before it are kept, the rest recomputed
+    store["read"].clear()
+    conn.latest_id = 8
+    conn.first_date = datetime(2025, 1, 5, 14, 0)
+    recomputed = snapshots.past_series(cursor, 1, start, date(2025, 1, 11))
+    assert store["backfill"] == [(date(2025, 1, 5), date(2025, 1, 11))]
+    assert list(recomputed["market_value"][:4]) == [1, 2, 3, 4]
+    assert list(recomputed["market_value"][4:6]) == [105, 106]
+    assert snapshots.TIMELINES.stats() == {"users": 1, "hit": 0, "extend": 1, "recompute": 1, "full": 1}
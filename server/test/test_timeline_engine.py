@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils.timeline_engine import Trades, compute_timeline, forward_fill, price_matrix
+
+
+def test_forward_fill_carries_each_column_down():
+    matrix = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [3.0, 4.0]])
+    filled = forward_fill(matrix)
+    assert np.isnan(filled[0, 0])
+    assert filled[1:, 0].tolist() == [2.0, 2.0, 3.0]
+    assert filled[:, 1].tolist() == [1.0, 1.0, 1.0, 4.0]
+
+
+def test_prices_before_the_first_close_and_for_unknown_symbols_are_zero():
+    closes = pd.DataFrame({"AAPL": [10.0, 11.0]}, index=pd.to_datetime(["2025-01-02", "2025-01-03"]))
+    prices = price_matrix(closes, ["AAPL", "NOPE"], pd.date_range("2025-01-01", "2025-01-05"))
+    assert prices[:, 0].tolist() == [0.0, 10.0, 11.0, 11.0, 11.0]
+    assert prices[:, 1].tolist() == [0.0] * 5
+
+
+def test_trades_on_the_same_day_and_symbol_accumulate():
+    trades = Trades(day=np.array([0, 0, 2]), code=np.array([0, 0, 1]), symbols=["A", "B"],
+                    signed_qty=np.array([2.0, 3.0, -1.0]), amount=np.array([20.0, 30.0, -5.0]))
+    prices = np.array([[10.0, 5.0], [12.0, 5.0], [12.0, 5.0]])
+    timeline = compute_timeline(trades, prices, balance=100)
+    assert timeline["positions"].tolist() == [[5.0, 0.0], [5.0, 0.0], [5.0, -1.0]]
+    assert timeline["market_value"].tolist() == [50.0, 60.0, 55.0]
+    assert timeline["cost_basis"].tolist() == [50.0, 50.0, 45.0]
+    assert timeline["cash_balance"].tolist() == [95.0, 95.0, 100.0]
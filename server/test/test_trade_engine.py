@@ -0,0 +1,73 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import queries
+from utils import trade_engine
+from utils.trade_engine import StockIdCache, TradeRejected, apply_fill, place_trade
+
+
+@pytest.fixture(autouse=True)
+def stock_ids(monkeypatch):
+    monkeypatch.setattr(trade_engine, "STOCK_IDS", StockIdCache())
+
+
+def account(balance="1000.00", holding_id=None, quantity=None, average_cost=None):
+    return {"account_id": 3, "balance": Decimal(balance), "portfolio_id": 5,
+            "holding_id": holding_id, "quantity": quantity, "average_cost": average_cost}
+
+
+def trade_db(fake_connection, account_row):
+    """A connection to one account row; the last balance written lands in conn.balance"""
+
+    def respond(cursor, sql, params):
+        if sql == queries.STOCK_ID_BY_SYMBOL:
+            return [{"id": 7}]
+        if sql == queries.TRADE_ACCOUNT_FOR_UPDATE:
+            return [account_row]
+        if sql in (queries.INSERT_HOLDING, queries.INSERT_TRANSACTION):
+            cursor.lastrowid = 99
+        elif sql == queries.UPDATE_BALANCE:
+            conn.balance = params[0]
+        return []
+
+    conn = fake_connection(respond)
+    conn.balance = None
+    return conn
+
+
+def test_buy_locks_the_account_first_and_commits_once(fake_connection):
+    conn = trade_db(fake_connection, account(holding_id=11, quantity=10, average_cost=Decimal("50.00")))
+    fill = place_trade(conn, 1, "aapl", "buy", 10, Decimal("60.00"), datetime(2025, 1, 2))
+
+    writes = [sql for sql in conn.log if sql not in ("ROLLBACK", queries.STOCK_ID_BY_SYMBOL)]
+    assert writes == [queries.TRADE_ACCOUNT_FOR_UPDATE, queries.UPDATE_HOLDING, queries.UPDATE_BALANCE,
+                      queries.INSERT_TRANSACTION, "COMMIT"]
+    assert conn.balance == Decimal("400.00")
+    assert fill["average_cost"] == Decimal("55.00")
+    assert fill["remaining_shares"] == 20
+
+
+def test_rejected_trade_writes_nothing(fake_connection):
+    conn = trade_db(fake_connection, account(balance="100.00"))
+    with pytest.raises(TradeRejected):
+        place_trade(conn, 1, "AAPL", "buy", 10, Decimal("60.00"))
+    assert "COMMIT" not in conn.log
+    assert queries.INSERT_TRANSACTION not in conn.log
+    assert conn.log[-1] == "ROLLBACK"
+
+
+def test_symbol_ids_come_from_the_cache_after_the_first_trade(fake_connection):
+    conn = trade_db(fake_connection, account(holding_id=11, quantity=10, average_cost=Decimal("50.00")))
+    place_trade(conn, 1, "AAPL", "sell", 2, Decimal("60.00"))
+    place_trade(conn, 1, "AAPL", "sell", 2, Decimal("60.00"))
+    assert conn.log.count(queries.STOCK_ID_BY_SYMBOL) == 1
+    assert trade_engine.STOCK_IDS.stats()["hits"] == 1
+
+
+def test_fills():
+    assert apply_fill("sell", Decimal(4), Decimal("20"), Decimal("0"), Decimal(4), Decimal("10.00")) == \
+        (Decimal("80"), Decimal(0), Decimal("10.00"))
+    with pytest.raises(TradeRejected):
+        apply_fill("sell", Decimal(5), Decimal("20"), Decimal("0"), Decimal(4), Decimal("10.00"))
@@ -0,0 +1,111 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+import queries
+from utils import trade_import
+from utils.snapshots import last_closed_day
+from utils.trade_engine import StockIdCache
+from utils.trade_import import ImportRejected, compute_positions, import_fills, parse_fills, read_fills
+
+CSV = """Symbol,Side,Qty,Price,Date
+aapl,buy,10,100.00,2025-01-02 10:00
+MSFT,buy,5,200,2025-01-02 11:00
+AAPL,sell,4,120.50,2025-01-03
+AAPL,buy,2,110,2025-01-01
+"""
+
+
+def import_db(fake_connection):
+    """An account with $5000 and an empty portfolio; holdings appear once they are upserted"""
+
+    def respond(cursor, sql, params):
+        if sql == queries.IMPORT_ACCOUNT_FOR_UPDATE:
+            return [{"account_id": 3, "balance": Decimal("5000.00"), "portfolio_id": 5}]
+        if sql == queries.PORTFOLIO_HOLDINGS_FOR_UPDATE:
+            return [{"id": 40 + i, "symbol": symbol, "quantity": 0, "average_cost": 0}
+                    for i, symbol in enumerate(conn.holdings)]
+        if sql.startswith("SELECT id, symbol FROM stocks"):
+            return [{"id": i, "symbol": symbol} for i, symbol in enumerate(params)]
+        if sql == queries.UPDATE_BALANCE:
+            conn.balance = params[0]
+        elif sql == queries.UPSERT_HOLDING:
+            conn.holdings = ["AAPL", "MSFT"]
+        return []
+
+    conn = fake_connection(respond)
+    conn.holdings = []
+    conn.balance = None
+    return conn
+
+
+def test_csv_fills_are_validated_and_sorted_by_time():
+    fills = parse_fills(read_fills(CSV, "csv"))
+    assert list(fills["symbol"]) == ["AAPL", "AAPL", "MSFT", "AAPL"]
+    assert list(fills["row"]) == [4, 1, 2, 3]
+
+    with pytest.raises(ImportRejected) as rejected:
+        parse_fills(read_fills([{"symbol": "AAPL", "action": "hold", "quantity": 1.5, "price": 10,
+                                 "timestamp": "yesterday-ish"}], "json"))
+    assert rejected.value.errors == ["row 1: action must be buy or sell",
+                                     "row 1: quantity must be a positive whole number",
+                                     "row 1: timestamp is not a date"]
+
+
+def test_json_fills_without_a_symbol_are_rejected():
+    fills = [
+        {"action": "buy", "quantity": 1, "price": 10, "timestamp": "2025-01-02"},
+        {"symbol": None, "action": "buy", "quantity": 1, "price": 10, "timestamp": "2025-01-02"},
+        {"symbol": "AAPL", "action": None, "quantity": 1, "price": 10, "timestamp": None},
+    ]
+    with pytest.raises(ImportRejected) as rejected:
+        parse_fills(read_fills(fills, "json"))
+    assert rejected.value.errors == ["row 1: symbol is missing or too long", "row 2: symbol is missing or too long",
+                                     "row 3: action must be buy or sell", "row 3: timestamp is not a date"]
+
+
+def test_positions_and_average_costs_in_one_pass():
+    fills = parse_fills(read_fills(CSV, "csv"))
+    balance, positions = compute_positions(fills, Decimal("5000"), {})
+    assert positions["AAPL"] == (Decimal(8), Decimal("101.67"))
+    assert positions["MSFT"] == (Decimal(5), Decimal("200.00"))
+    assert balance == Decimal("5000") - 220 - 1000 - 1000 + Decimal("482.00")
+
+    with pytest.raises(ImportRejected) as rejected:
+        compute_positions(fills[fills["row"] != 1], Decimal("5000"), {})
+    assert rejected.value.errors[0].startswith("row 3: AAPL: Insufficient shares")
+
+
+def test_import_writes_everything_in_batches_and_one_commit(monkeypatch, fake_connection):
+    stock_ids = StockIdCache()
+    monkeypatch.setattr(trade_import, "STOCK_IDS", stock_ids)
+    backfills = []
+    monkeypatch.setattr(trade_import, "backfill_snapshots", lambda *args: backfills.append(args) or 0)
+    conn = import_db(fake_connection)
+    summary = import_fills(1, parse_fills(read_fills(CSV, "csv")), conn)
+
+    assert summary["imported"] == 4
+    assert conn.log.count("COMMIT") == 1 and conn.log[-1] == "COMMIT"
+    assert conn.log.count(queries.INSERT_TRANSACTION) == 1
+    assert conn.balance == summary["balance"]
+    assert stock_ids.stats()["symbols"] == 2
+    # History is rewritten from the earliest (backdated) fill, after the commit
+    assert backfills == [(date(2025, 1, 1), last_closed_day(), [1])]
+
+
+def test_hundred_thousand_fills_are_prepared_in_seconds():
+    n = 100_000
+    frame = pd.DataFrame({
+        "symbol": ["AAPL", "MSFT", "NVDA", "AMZN"] * (n // 4),
+        "action": "buy",
+        "quantity": "1",
+        "price": "10.25",
+        "timestamp": pd.date_range("2020-01-01", periods=n, freq="min").astype(str),
+    })
+    started = time.perf_counter()
+    balance, positions = compute_positions(parse_fills(frame), Decimal(10 ** 7), {})
+    assert time.perf_counter() - started < 10
+    assert positions["AAPL"] == (Decimal(n // 4), Decimal("10.25"))
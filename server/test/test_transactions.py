@@ -0,0 +1,65 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+import routes
+from utils.transactions import decode_cursor, encode_cursor, split_page, transactions_query
+
+
+def transaction(i):
+    return {"transaction_id": i, "transaction_type": "buy", "quantity": 1, "price": Decimal("10.50"),
+            "transaction_date": datetime(2025, 1, 1, 10, i), "symbol": "AAPL"}
+
+
+@pytest.fixture
+def client(monkeypatch, fake_connection):
+    rows = [transaction(i) for i in (5, 4, 3, 2, 1)]
+    conn = fake_connection(lambda cursor, sql, params: rows[:params[-1]] if "LIMIT" in sql else rows)
+    monkeypatch.setattr(routes, "init_read_db", lambda user_id=None: conn)
+    app = Flask(__name__)
+    app.register_blueprint(routes.portfolio_bp)
+    client = app.test_client()
+    client.conn = conn
+    return client
+
+
+def test_keyset_query_with_filters():
+    after = (datetime(2025, 1, 2, 9, 30), 42)
+    sql, params = transactions_query(1, symbol="AAPL", transaction_type="sell", start=date(2025, 1, 1),
+                                     end=date(2025, 1, 31), after=after, limit=51)
+    assert sql.endswith("ORDER BY st.transaction_date DESC, st.id DESC LIMIT %s")
+    assert params == (1, "AAPL", "sell", date(2025, 1, 1), date(2025, 2, 1), after[0], after[0], 42, 51)
+    assert decode_cursor(encode_cursor({"transaction_date": after[0], "transaction_id": 42})) == after
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+
+def test_last_page_has_no_cursor():
+    rows = [transaction(i) for i in (3, 2, 1)]
+    assert split_page(rows, 3) == (rows, None)
+    page, cursor = split_page(rows, 2)
+    assert page == rows[:2] and decode_cursor(cursor) == (rows[1]["transaction_date"], 2)
+
+
+def test_full_history_is_streamed_as_the_same_json_array(client):
+    response = client.get("/transactions?user_id=1")
+    assert response.is_streamed
+    rows = json.loads(response.get_data(as_text=True))
+    assert [row["transaction_id"] for row in rows] == [5, 4, 3, 2, 1]
+    assert all(cursor.closed for cursor in client.conn.cursors)
+
+
+def test_one_page_with_the_next_cursor(client):
+    page = client.get("/transactions?user_id=1&limit=2&symbol=aapl").get_json()
+    assert [row["transaction_id"] for row in page["transactions"]] == [5, 4]
+    assert decode_cursor(page["next_cursor"])[1] == 4
+    assert client.conn.executed[-1][1] == ("1", "AAPL", 3)
+    assert client.get("/transactions?user_id=1&type=hold").status_code == 400
+
+
+def test_ndjson_has_one_row_per_line(client):
+    lines = client.get("/transactions?user_id=1&format=ndjson").get_data(as_text=True).splitlines()
+    assert [json.loads(line)["transaction_id"] for line in lines] == [5, 4, 3, 2, 1]
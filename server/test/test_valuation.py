@@ -0,0 +1,45 @@
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+
+from utils.valuation import holdings_matrix, value_holdings, write_valuations
+
+
+ROWS = [
+    (1, "AAPL", 10, Decimal("100.00")),
+    (1, "MSFT", 2, Decimal("50.00")),
+    (2, "AAPL", 5, Decimal("120.00")),
+    (2, "AAPL", 1, Decimal("90.00")),   # same symbol in a second portfolio
+    (2, "XYZ", 4, Decimal("10.00")),    # no price: carried at cost
+]
+
+
+def test_holdings_are_indexed_by_user_and_symbol_including_cash_only_accounts():
+    holdings = holdings_matrix(ROWS, user_ids=[3, 1, 2])
+    assert holdings.user_ids.tolist() == [1, 2, 3]
+    assert holdings.symbols == ["AAPL", "MSFT", "XYZ"]
+    assert holdings.row.tolist() == [0, 0, 1, 1, 1]
+    assert holdings.col.tolist() == [0, 1, 0, 0, 2]
+
+
+def test_every_user_and_symbol_is_valued_in_one_pass(fake_connection):
+    holdings = holdings_matrix(ROWS, user_ids=[1, 2, 3])
+    users, symbols = value_holdings(holdings, np.array([110.0, 60.0, np.nan]), cash=[1000, 500, 250])
+
+    assert users["market_value"].tolist() == [1220.0, 700.0, 0.0]
+    assert users["cost_basis"].tolist() == [1100.0, 730.0, 0.0]
+    assert users["positions"].tolist() == [2, 2, 0]
+    assert round(users["return_pct"][0], 4) == 10.9091
+    assert np.isnan(users["return_pct"][2])
+    assert symbols["quantity"].tolist() == [16.0, 2.0, 4.0]
+    assert symbols["market_value"].tolist() == [1760.0, 120.0, 40.0]
+    assert symbols["holders"].tolist() == [2, 1, 1]
+
+    conn = fake_connection()
+    valued_at = datetime(2025, 1, 2, 16, 30)
+    assert write_valuations(conn.cursor(), valued_at, holdings, users, symbols) == (3, 3)
+    (_, user_rows), (_, symbol_rows), *deletes = conn.executed
+    assert user_rows[2] == (3, valued_at, 0.0, 0.0, 250.0, 0.0, None, 0)
+    assert symbol_rows[2] == ("XYZ", valued_at, 4, None, 40.0, 1)
+    assert len(deletes) == 2  # stale rows of both tables dropped
@@ -0,0 +1,216 @@
+import argparse
+import gzip
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from config import CONFIG
+from db import connect_direct
+from utils.scheduler import PeriodicJob, register_job
+
+MANIFEST = "manifest.json"
+COMPRESS_LEVEL = 6  # gzip's default of 9 costs far more CPU for a few percent of size
+STALE_WORK_DIR_SECONDS = 24 * 3600
+
+# Rows are written in LOAD DATA's default format: tab separated, one row per line,
+# backslash escapes, \N for NULL; a restore hands the file to the server unchanged
+NULL = b"\\N"
+SPECIAL = re.compile(rb"[\\\t\n\r\x00]")
+ESCAPES = {b"\\": b"\\\\", b"\t": b"\\t", b"\n": b"\\n", b"\r": b"\\r", b"\x00": b"\\0"}
+
+
+def encode_row(row):
+    """One line of a table file from a raw cursor row (values as the server sent them)"""
+    fields = []
+    for value in row:
+        if value is None:
+            fields.append(NULL)
+            continue
+        value = bytes(value)
+        if SPECIAL.search(value):
+            value = SPECIAL.sub(lambda match: ESCAPES[match.group()], value)
+        fields.append(value)
+    return b"\t".join(fields) + b"\n"
+
+
+def dump_table(conn, table, path, fetch_rows=CONFIG.BACKUP_FETCH_ROWS):
+    """
+    Stream every row of table into a gzip file, fetch_rows at a time (the result is
+    not buffered client-side, so memory stays flat). Returns (columns, row count).
+    """
+    cursor = conn.cursor(raw=True)
+    rows = 0
+    try:
+        cursor.execute(f"SELECT * FROM `{table}`")
+        columns = [column[0] for column in cursor.description]
+        with gzip.open(path, "wb", compresslevel=COMPRESS_LEVEL) as out:
+            while True:
+                batch = cursor.fetchmany(fetch_rows)
+                if not batch:
+                    break
+                out.write(b"".join(encode_row(row) for row in batch))
+                rows += len(batch)
+    finally:
+        cursor.close()
+    return columns, rows
+
+
+def create_backup(directory=CONFIG.BACKUP_DIR):
+    """
+    Dump every table from one consistent snapshot (a REPEATABLE READ transaction, so
+    the API keeps writing meanwhile) into directory/<timestamp>/: a gzip file per
+    table plus manifest.json with each table's CREATE statement, columns and row
+    count. The backup is written under a temporary name and only renamed once
+    complete. Returns its path.
+    """
+    name = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    os.makedirs(directory, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f".{name}-", dir=directory)
+    try:
+        conn = connect_direct()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            cursor.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
+            tables = [row[0] for row in cursor.fetchall()]
+            manifest = {"created_at": datetime.now().isoformat(), "database": CONFIG.DB_NAME, "tables": []}
+            for table in tables:
+                cursor.execute(f"SHOW CREATE TABLE `{table}`")
+                create_sql = cursor.fetchone()[1]
+                columns, rows = dump_table(conn, table, os.path.join(work_dir, f"{table}.tsv.gz"))
+                manifest["tables"].append({"name": table, "create": create_sql, "columns": columns, "rows": rows})
+            cursor.close()
+            conn.rollback()
+        finally:
+            conn.close()
+
+        with open(os.path.join(work_dir, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        path = os.path.join(directory, name)
+        os.rename(work_dir, path)
+        return path
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+
+def list_backups(directory=CONFIG.BACKUP_DIR):
+    """Names of the complete backups in directory, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted((name for name in os.listdir(directory)
+                   if not name.startswith(".") and os.path.isfile(os.path.join(directory, name, MANIFEST))),
+                  reverse=True)
+
+
+def rotate_backups(directory=CONFIG.BACKUP_DIR, keep=CONFIG.BACKUP_KEEP):
+    """Delete all but the newest `keep` backups, and work directories left by crashed runs"""
+    removed = list_backups(directory)[keep:]
+    for name in removed:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(".") and time.time() - os.path.getmtime(path) > STALE_WORK_DIR_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def run_backup():
+    path = create_backup()
+    rotate_backups()
+    print(f"Database backup written to {path}")
+    return path
+
+
+def iter_chunks(lines, size):
+    lines = iter(lines)
+    while True:
+        chunk = list(itertools.islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_table(conn, table, path, scratch_dir, chunk_rows=CONFIG.BACKUP_RESTORE_CHUNK_ROWS):
+    """
+    Bulk-load one table file with LOAD DATA LOCAL INFILE, chunk_rows rows (and one
+    commit) at a time, so neither the client nor the server holds the whole table.
+    Returns the number of rows loaded.
+    """
+    columns = ", ".join(f"`{column}`" for column in table["columns"])
+    sql = f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table['name']}` CHARACTER SET utf8mb4 ({columns})"
+    chunk_path = os.path.join(scratch_dir, f"{table['name']}.tsv")
+    cursor = conn.cursor()
+    loaded = 0
+    try:
+        with gzip.open(path, "rb") as rows:
+            for chunk in iter_chunks(rows, chunk_rows):
+                with open(chunk_path, "wb") as out:
+                    out.writelines(chunk)
+                cursor.execute(sql, (chunk_path,))
+                conn.commit()
+                loaded += len(chunk)
+    finally:
+        cursor.close()
+    return loaded
+
+
+def restore_backup(path, tables=None):
+    """
+    Recreate the backup's tables (all, or only those named in tables) and bulk-load
+    their rows. Existing tables of the same name are dropped first.
+    Returns {table: rows loaded}.
+    """
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    selected = [table for table in manifest["tables"] if tables is None or table["name"] in tables]
+
+    conn = connect_direct(allow_local_infile=True)
+    loaded = {}
+    try:
+        cursor = conn.cursor()
+        # Tables are loaded one by one, in any order, and the rows were valid when dumped
+        cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            for table in selected:
+                cursor.execute(f"DROP TABLE IF EXISTS `{table['name']}`")
+                cursor.execute(table["create"])
+                loaded[table["name"]] = load_table(conn, table, os.path.join(path, f"{table['name']}.tsv.gz"),
+                                                   scratch_dir)
+                if loaded[table["name"]] != table["rows"]:
+                    raise RuntimeError(f"{table['name']}: loaded {loaded[table['name']]} of {table['rows']} rows")
+        cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+        cursor.close()
+    finally:
+        conn.close()
+    return loaded
+
+
+BACKUP_JOB = register_job(PeriodicJob("db-backup", run_backup, CONFIG.BACKUP_INTERVAL_SECONDS,
+                                      run_immediately=False))
+
+
+if __name__ == '__main__':
+    # python -m utils.backup [--restore NAME [--tables T ...]] [--list]   (run from the server directory)
+    parser = argparse.ArgumentParser(description="Back up or restore the database")
+    parser.add_argument("--list", action="store_true", help="list the backups on disk")
+    parser.add_argument("--restore", metavar="NAME", help="backup to restore (a name from --list, or a path)")
+    parser.add_argument("--tables", nargs="+", metavar="TABLE", help="restore only these tables")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(list_backups()))
+    elif args.restore:
+        path = args.restore if os.path.isdir(args.restore) else os.path.join(CONFIG.BACKUP_DIR, args.restore)
+        started = time.perf_counter()
+        for table, rows in restore_backup(path, args.tables).items():
+            print(f"{table}: {rows} rows")
+        print(f"Restored in {time.perf_counter() - started:.1f}s")
+    else:
+        run_backup()
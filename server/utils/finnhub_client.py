@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+from config import CONFIG
+from utils.market_provider import get_provider
+from utils.quote_cache import QUOTE_CACHE
+
+
+class TokenBucket:
+    """Allows `capacity` calls at once, refilled at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self, timeout=None):
+        """Block until a token is available; False if that would take longer than timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+                if deadline is not None and now + wait > deadline:
+                    return False
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+
+class FinnhubUnavailable(Exception):
+    """A Finnhub call that failed or was throttled: its (empty) result must not be cached"""
+
+
+class FinnhubClient:
+    """
+    Finnhub REST client: a token bucket sized to the plan quota and a thread pool
+    for fanning out across symbols. The HTTP calls themselves (one keep-alive
+    connection pool, per-call timeouts) go through the market data provider.
+    Responses are cached in the shared quote cache under the 'finnhub' kind.
+    Calls beyond the burst queue for a token for up to queue_timeout seconds
+    before they are counted as throttled; they run on request threads, so the
+    wait stays short and get() answers with the last known (expired) response
+    instead when there is one.
+    """
+
+    def __init__(self, calls_per_minute, burst, timeout, workers, queue_timeout=3):
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.limiter = TokenBucket(rate=calls_per_minute / 60.0, capacity=burst)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finnhub")
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _cache_key(path, params):
+        return path, tuple(sorted(params.items()))
+
+    def fetch(self, path, **params):
+        """GET base_url/path; FinnhubUnavailable on timeout, quota or HTTP errors"""
+        cache_key = self._cache_key(path, params)
+
+        def load():
+            if not self.limiter.acquire(timeout=self.queue_timeout):
+                self._count("throttled")
+                raise RuntimeError("Finnhub rate limit reached")
+            self._count("calls")
+            try:
+                return get_provider().finnhub(path, params, timeout=self.timeout)
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 429:
+                    self._count("throttled")
+                raise
+
+        try:
+            return QUOTE_CACHE.get("finnhub", cache_key, load)
+        except Exception as e:
+            self._count("errors")
+            raise FinnhubUnavailable(f"Finnhub {path} error for {params.get('symbol')}: {e}") from e
+
+    def get(self, path, default=None, **params):
+        """
+        Like fetch, but when the call fails returning the last known response, or
+        default without one (for display-only data)
+        """
+        try:
+            return self.fetch(path, **params)
+        except FinnhubUnavailable as e:
+            print(e)
+            stale = QUOTE_CACHE.last_known("finnhub", self._cache_key(path, params))
+            return default if stale is None else stale
+
+    def recommendation(self, symbol):
+        return self.get("stock/recommendation", [], symbol=symbol)
+
+    def price_target(self, symbol):
+        return self.get("stock/price-target", {}, symbol=symbol)
+
+    def news_sentiment(self, symbol):
+        return self.get("news-sentiment", {}, symbol=symbol)
+
+    def company_news(self, symbol, days=7):
+        to_date = datetime.now().date()
+        from_date = to_date - timedelta(days=days)
+        return self.get("company-news", [], symbol=symbol,
+                        **{"from": from_date.isoformat(), "to": to_date.isoformat()})
+
+    def profile(self, symbol):
+        return self.get("stock/profile2", {}, symbol=symbol)
+
+    def overviews(self, symbols, with_profile=()):
+        """
+        Recommendation, price target, sentiment and company news for every symbol,
+        with every (symbol, endpoint) call issued concurrently. Symbols listed in
+        with_profile also get their company profile.
+        """
+        calls = {}
+        for symbol in symbols:
+            calls[(symbol, "recommendation")] = self.pool.submit(self.recommendation, symbol)
+            calls[(symbol, "price_target")] = self.pool.submit(self.price_target, symbol)
+            calls[(symbol, "sentiment")] = self.pool.submit(self.news_sentiment, symbol)
+            calls[(symbol, "company_news")] = self.pool.submit(self.company_news, symbol)
+            if symbol in with_profile:
+                calls[(symbol, "profile")] = self.pool.submit(self.profile, symbol)
+
+        results = {symbol: {} for symbol in symbols}
+        for (symbol, name), future in calls.items():
+            results[symbol][name] = future.result()
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "throttled": self.throttled,
+                "rateLimitWaitSeconds": round(self.limiter.waited_seconds, 3),
+            }
+
+
+FINNHUB = FinnhubClient(
+    calls_per_minute=CONFIG.FINNHUB_CALLS_PER_MINUTE,
+    burst=CONFIG.FINNHUB_BURST,
+    timeout=CONFIG.FINNHUB_TIMEOUT_SECONDS,
+    workers=CONFIG.FINNHUB_WORKERS,
+    queue_timeout=CONFIG.FINNHUB_QUEUE_SECONDS,
+)
@@ -0,0 +1,202 @@
+import argparse
+import threading
+import time
+
+from config import CONFIG
+from db import init_db
+from utils.finnhub_client import FINNHUB, FinnhubUnavailable
+from utils.market_data import BACKGROUND_POOL, fetch_concurrently, get_ticker_info
+from utils.market_provider import get_provider
+
+# Generic fallback logos based on common company patterns
+COMMON_LOGOS = {
+    'AAPL': 'https://logo.clearbit.com/apple.com',
+    'GOOGL': 'https://logo.clearbit.com/google.com',
+    'GOOG': 'https://logo.clearbit.com/google.com',
+    'MSFT': 'https://logo.clearbit.com/microsoft.com',
+    'AMZN': 'https://logo.clearbit.com/amazon.com',
+    'TSLA': 'https://logo.clearbit.com/tesla.com',
+    'META': 'https://logo.clearbit.com/meta.com',
+    'NVDA': 'https://logo.clearbit.com/nvidia.com',
+    'NFLX': 'https://logo.clearbit.com/netflix.com',
+    'ADBE': 'https://logo.clearbit.com/adobe.com'
+}
+
+_lock = threading.Lock()
+_logos = {}  # symbol -> (logo_url or None, fetched_at epoch seconds)
+_loaded = False
+_refreshing = set()
+_failed_at = {}  # symbol -> monotonic time of its last failed lookup (kept in memory only)
+
+
+class LogoUnavailable(Exception):
+    """No logo was found, but a source failed: the answer is unknown, not 'no logo'"""
+
+
+def fetch_logo(symbol, domain_fallback=None):
+    """
+    Fetch company logo using multiple sources with fallbacks (network calls).
+    Raises LogoUnavailable when nothing was found and some source failed.
+    """
+    errors = []
+
+    # 1. Try Finnhub company profile (includes logo)
+    try:
+        data = FINNHUB.fetch("stock/profile2", symbol=symbol)
+        if data and data.get("logo") and data["logo"].strip():
+            return data["logo"]
+    except FinnhubUnavailable as e:
+        errors.append(e)
+
+    # 2. Try Yahoo Finance logo (alternative approach)
+    try:
+        info = get_ticker_info(symbol)
+        if info and info.get("logo_url"):
+            return info["logo_url"]
+    except Exception as e:
+        print(f"Yahoo Finance logo fetch error for {symbol}: {e}")
+        errors.append(e)
+
+    # 3. Optional fallback using Clearbit (requires domain)
+    if domain_fallback:
+        try:
+            clearbit_url = f"https://logo.clearbit.com/{domain_fallback}"
+            # Test if the Clearbit logo exists
+            if get_provider().url_exists(clearbit_url):
+                return clearbit_url
+        except Exception as e:
+            print(f"Clearbit logo fetch error for {symbol}: {e}")
+            errors.append(e)
+
+    # 4. Generic fallback, or no logo found
+    if symbol in COMMON_LOGOS:
+        return COMMON_LOGOS[symbol]
+    if errors:
+        raise LogoUnavailable(f"No logo for {symbol}: {errors[0]}")
+    return None
+
+
+def _load():
+    """Read every stored logo into memory once (a failed read is retried on the next call)"""
+    global _loaded
+    if _loaded:
+        return
+    try:
+        conn = init_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT symbol, logo_url, UNIX_TIMESTAMP(fetched_at) FROM stock_logos")
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print(f"Error loading logo cache: {e}")
+        return
+    with _lock:
+        for symbol, logo_url, fetched_at in rows:
+            _logos.setdefault(symbol, (logo_url, float(fetched_at or 0)))
+        _loaded = True
+
+
+def _store(logos):
+    """Upsert {symbol: logo_url or None} in memory and in one batched statement"""
+    now = time.time()
+    with _lock:
+        for symbol, logo_url in logos.items():
+            _logos[symbol] = (logo_url, now)
+    try:
+        conn = init_db()
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO stock_logos (symbol, logo_url, fetched_at) VALUES (%s, %s, NOW())
+            ON DUPLICATE KEY UPDATE logo_url = VALUES(logo_url), fetched_at = NOW()
+        """, list(logos.items()))
+        conn.commit()
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print(f"Error storing logos: {e}")
+
+
+def _is_fresh(logo_url, fetched_at):
+    ttl = CONFIG.LOGO_TTL_SECONDS if logo_url else CONFIG.LOGO_NEGATIVE_TTL_SECONDS
+    return time.time() - fetched_at < ttl
+
+
+def _refresh_in_background(symbol, domain_fallback):
+    with _lock:
+        if symbol in _refreshing:
+            return
+        _refreshing.add(symbol)
+
+    def refresh():
+        try:
+            _store({symbol: fetch_logo(symbol, domain_fallback)})
+        except LogoUnavailable as e:
+            print(e)  # keep serving the stored entry; the next request retries
+        finally:
+            with _lock:
+                _refreshing.discard(symbol)
+
+    BACKGROUND_POOL.submit(refresh)
+
+
+def get_logo(symbol, domain_fallback=None):
+    """
+    Cached logo URL (or None when the symbol has no logo). Expired entries are
+    served as-is while they are refreshed in the background, so only a symbol
+    that was never seen before costs network calls. A lookup that failed is not
+    stored; the symbol is retried after LOGO_RETRY_SECONDS.
+    """
+    _load()
+    with _lock:
+        entry = _logos.get(symbol)
+    if entry is not None:
+        if not _is_fresh(*entry):
+            _refresh_in_background(symbol, domain_fallback)
+        return entry[0]
+
+    with _lock:
+        failed_at = _failed_at.get(symbol)
+    if failed_at is not None and time.monotonic() - failed_at < CONFIG.LOGO_RETRY_SECONDS:
+        return None
+
+    try:
+        logo_url = fetch_logo(symbol, domain_fallback)
+    except LogoUnavailable as e:
+        print(e)
+        with _lock:
+            _failed_at[symbol] = time.monotonic()
+        return None
+    _store({symbol: logo_url})
+    return logo_url
+
+
+def warm_logos(symbols=None, force=False):
+    """Fetch and store logos for symbols (default: every symbol in stocks) in bulk"""
+    _load()
+    if symbols is None:
+        conn = init_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT symbol FROM stocks")
+        symbols = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        conn.close()
+
+    with _lock:
+        todo = [s for s in symbols if force or s not in _logos or not _is_fresh(*_logos[s])]
+    if not todo:
+        return 0
+    logos, stale = fetch_concurrently(fetch_logo, todo, CONFIG.LOGO_WARM_TIMEOUT_SECONDS, "logo",
+                                      pool=BACKGROUND_POOL)
+    _store({symbol: logo for symbol, logo in logos.items() if symbol not in stale})
+    return len(todo) - len(stale)
+
+
+if __name__ == '__main__':
+    # python -m utils.logo_cache [--force] [SYMBOL ...]   (run from the server directory)
+    parser = argparse.ArgumentParser(description="Warm the persistent logo cache")
+    parser.add_argument("symbols", nargs="*", help="symbols to warm (default: every symbol in stocks)")
+    parser.add_argument("--force", action="store_true", help="refetch logos that are still fresh")
+    args = parser.parse_args()
+    count = warm_logos([s.upper() for s in args.symbols] or None, force=args.force)
+    print(f"Warmed {count} logos")
@@ -1,8 +1,198 @@
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from config import CONFIG
+from utils.market_provider import get_provider
+from utils.quote_cache import QUOTE_CACHE
+
+# Shared, bounded pool for per-symbol upstream calls
+MARKET_DATA_POOL = ThreadPoolExecutor(max_workers=CONFIG.MARKET_DATA_WORKERS, thread_name_prefix="market-data")
+# Small separate pool for background warmers, whose long batches must not starve request paths
+BACKGROUND_POOL = ThreadPoolExecutor(max_workers=CONFIG.BACKGROUND_FETCH_WORKERS, thread_name_prefix="background-fetch")
+
 
 def get_current_price(symbol):
-    ticker = yf.Ticker(symbol)
-    hist = ticker.history(period='1d')
-    if hist.empty:
+    price = get_last_price(symbol)
+    if not price:
         raise ValueError(f"No data found for symbol {symbol}")
-    return round(hist['Close'][0], 2)
+    return round(price, 2)
+
+
+def get_ticker_info(symbol):
+    """Cached yfinance .info (slow, full quote summary)"""
+    return QUOTE_CACHE.get("info", symbol, lambda: get_provider().ticker_info(symbol))
+
+
+def get_fast_info(symbol):
+    """Cached subset of yfinance .fast_info as a plain dict"""
+    return QUOTE_CACHE.get("fast_info", symbol, lambda: get_provider().fast_info(symbol))
+
+
+def get_last_price(symbol):
+    """Cached last traded price"""
+    return QUOTE_CACHE.get("last_price", symbol, lambda: get_provider().last_price(symbol))
+
+
+# Bar length of every yfinance interval, in seconds
+INTERVAL_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600,
+    "1d": 86400, "5d": 5 * 86400, "1wk": 7 * 86400, "1mo": 30 * 86400, "3mo": 90 * 86400,
+}
+
+
+def get_history(symbol, period, interval):
+    """
+    Cached ticker.history per (symbol, period, interval). An entry lives for one bar,
+    capped at HISTORY_MAX_TTL_SECONDS because the latest bar keeps changing while it is open.
+    """
+    ttl = min(INTERVAL_SECONDS.get(interval, 60), CONFIG.HISTORY_MAX_TTL_SECONDS)
+    return QUOTE_CACHE.get("history", (symbol.upper(), period, interval),
+                           lambda: get_provider().history(symbol, period, interval), ttl=ttl)
+
+
+def get_recent_history(symbol):
+    """Cached 7-day daily history"""
+    return QUOTE_CACHE.get("history_7d", symbol, lambda: get_provider().history(symbol, "7d", "1d"))
+
+
+# Fixed list shown in the market banner
+MARKET_INDICES = {
+    "NASDAQ": "^IXIC",
+    "S&P 500": "^GSPC",
+    "Dow Jones": "^DJI",
+    "EUR-USD": "EURUSD=X",
+    "Bitcoin": "BTC-USD",
+    "Gold": "GC=F", 
+    "Oil": "CL=F",
+}
+
+
+def download_recent_closes(symbols):
+    """
+    One bulk download of 7-day closes. Every symbol's closes and last price are
+    written to the quote cache. Returns {symbol: closes Series}.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    data = get_provider().download(symbols, period="7d")
+    closes = data["Close"] if not data.empty else pd.DataFrame()
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(symbols[0])
+
+    columns = {}
+    for symbol in symbols:
+        series = closes[symbol].dropna() if symbol in closes else pd.Series(dtype=float)
+        QUOTE_CACHE.put("closes_7d", symbol, series)
+        if not series.empty:
+            QUOTE_CACHE.put("last_price", symbol, float(series.iloc[-1]))
+        columns[symbol] = series
+    return columns
+
+
+def get_recent_closes(symbols):
+    """
+    7-day daily closes for many symbols as one DataFrame (one column per symbol).
+    Symbols that are not cached are fetched together in a single bulk download.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    ttl = QUOTE_CACHE.ttl_for("closes_7d")
+    columns = {}
+    missing = []
+    for symbol in symbols:
+        cached = QUOTE_CACHE.peek("closes_7d", symbol, ttl)
+        if cached is not None:
+            columns[symbol] = cached
+        else:
+            missing.append(symbol)
+
+    if missing:
+        try:
+            columns.update(download_recent_closes(missing))
+        except Exception as e:
+            print(f"Error downloading recent closes for {missing}: {e}")
+            for symbol in missing:
+                last_known = QUOTE_CACHE.last_known("closes_7d", symbol)
+                if last_known is not None:
+                    columns[symbol] = last_known
+
+    if not columns:
+        return pd.DataFrame(columns=symbols, dtype=float)
+    return pd.DataFrame(columns).reindex(columns=symbols).sort_index()
+
+
+def get_last_known_closes(symbols):
+    """Whatever 7-day closes are cached for symbols, however old, without any network call"""
+    columns = {}
+    for symbol in symbols:
+        last_known = QUOTE_CACHE.last_known("closes_7d", symbol)
+        if last_known is not None:
+            columns[symbol] = last_known
+    if not columns:
+        return pd.DataFrame(columns=symbols, dtype=float)
+    return pd.DataFrame(columns).reindex(columns=symbols).sort_index()
+
+
+def fetch_concurrently(fetch, symbols, timeout, kind, pool=MARKET_DATA_POOL):
+    """
+    Run fetch(symbol) for every symbol on pool and wait at most timeout seconds.
+    Successful results are cached under kind. Symbols that fail or miss the deadline get
+    their last-known cached result (or None) and are returned in the stale set.
+    """
+    def remember(symbol, future):
+        if not future.cancelled() and future.exception() is None:
+            QUOTE_CACHE.put(kind, symbol, future.result())
+
+    futures = {}
+    for symbol in dict.fromkeys(symbols):
+        future = pool.submit(fetch, symbol)
+        # Late results still land in the cache for the next request
+        future.add_done_callback(lambda f, symbol=symbol: remember(symbol, f))
+        futures[symbol] = future
+
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    results = {}
+    stale = set()
+    for symbol, future in futures.items():
+        if future in done and future.exception() is None:
+            results[symbol] = future.result()
+        else:
+            if future in done:
+                print(f"Error fetching {kind} for {symbol}: {future.exception()}")
+            results[symbol] = QUOTE_CACHE.last_known(kind, symbol)
+            stale.add(symbol)
+    return results, stale
+
+
+def compute_wallet_frame(holdings, closes):
+    """
+    Price every holding at once from a closes frame (see get_recent_closes).
+    holdings is a list of dicts with symbol, quantity and avg_cost.
+    """
+    df = pd.DataFrame(holdings, columns=["symbol", "quantity", "avg_cost"])
+    df["quantity"] = df["quantity"].astype(float)
+    df["avg_cost"] = df["avg_cost"].fillna(0).astype(float)
+
+    closes = closes.reindex(columns=df["symbol"]).astype(float)
+    valid = closes.notna()
+    # 1 on the latest bar of each symbol, 2 on the bar before it, ...
+    bars_from_end = valid[::-1].cumsum()[::-1].where(valid)
+
+    current = closes.ffill().iloc[-1] if len(closes) else pd.Series(np.nan, index=closes.columns)
+    first = closes.bfill().iloc[0] if len(closes) else current
+    previous = closes.where(bars_from_end == 2).ffill().iloc[-1] if len(closes) else current
+
+    current = current.fillna(0.0).to_numpy()
+    price_24h = np.where(np.isnan(previous.to_numpy()), current, previous.to_numpy())
+    price_7d = np.where(np.isnan(first.to_numpy()), current, first.to_numpy())
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["currentPrice"] = current
+        df["change24h"] = np.where(price_24h > 0, (current - price_24h) / price_24h * 100, 0.0)
+        df["change7d"] = np.where(price_7d > 0, (current - price_7d) / price_7d * 100, 0.0)
+        df["marketValue"] = df["quantity"] * current
+        total_cost = df["quantity"] * df["avg_cost"]
+        df["gainLoss"] = df["marketValue"] - total_cost
+        df["gainLossPercent"] = np.where(total_cost > 0, df["gainLoss"] / total_cost * 100, 0.0)
+
+    return df
@@ -0,0 +1,393 @@
+import argparse
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+
+import requests
+import yfinance as yf
+from requests.adapters import HTTPAdapter
+
+from config import CONFIG
+
+YAHOO_RSS_URL = "https://feeds.finance.yahoo.com/rss/2.0/headline"
+
+# Set headers to mimic a real browser
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# RSS response; status is 304 when the feed has not changed since etag/modified
+FeedResponse = namedtuple("FeedResponse", ["status", "content", "etag", "modified"])
+
+
+class ReplayMiss(LookupError):
+    """The replay provider has no recording for a call"""
+
+
+class MarketDataProvider:
+    """
+    Every call the app makes to upstream market-data services. Caching, deadlines
+    and rate limiting stay in the callers (market_data, finnhub_client, news, ...);
+    a provider only answers one request.
+    """
+
+    name = "base"
+
+    def ticker_info(self, symbol):
+        """Full quote summary dict (yfinance .info)"""
+        raise NotImplementedError
+
+    def fast_info(self, symbol):
+        """{last_price, previous_close, market_cap, volume}"""
+        raise NotImplementedError
+
+    def last_price(self, symbol):
+        raise NotImplementedError
+
+    def history(self, symbol, period, interval):
+        """OHLCV DataFrame for one symbol"""
+        raise NotImplementedError
+
+    def download(self, symbols, **kwargs):
+        """Bulk OHLCV frame for many symbols (yf.download arguments: period or start/end, group_by)"""
+        raise NotImplementedError
+
+    def search(self, query):
+        """Symbol search results: [{symbol, name, type, region, currency}]"""
+        raise NotImplementedError
+
+    def listing(self):
+        """Full LISTING_STATUS csv text"""
+        raise NotImplementedError
+
+    def news_feed(self, symbols, etag=None, modified=None):
+        """FeedResponse for the Yahoo RSS headline feed of symbols (conditional GET)"""
+        raise NotImplementedError
+
+    def article_html(self, url):
+        """Raw article page, for image extraction"""
+        raise NotImplementedError
+
+    def finnhub(self, path, params, timeout=None):
+        """Finnhub JSON for base_url/path (timeout in seconds, default FINNHUB_TIMEOUT_SECONDS)"""
+        raise NotImplementedError
+
+    def url_exists(self, url):
+        """HEAD url answers 200 (Clearbit logo check)"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {"provider": self.name}
+
+
+class LiveProvider(MarketDataProvider):
+    """yfinance, Alpha Vantage, Yahoo RSS, Finnhub and Clearbit over the network"""
+
+    name = "live"
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        # One keep-alive pool for Finnhub, sized for its fan-out workers
+        self.finnhub_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CONFIG.FINNHUB_WORKERS)
+        self.finnhub_session.mount("https://", adapter)
+        self.finnhub_session.mount("http://", adapter)
+
+    def ticker_info(self, symbol):
+        return yf.Ticker(symbol).info or {}
+
+    def fast_info(self, symbol):
+        fast_info = yf.Ticker(symbol).fast_info
+        return {
+            "last_price": fast_info.get("last_price", 0),
+            "previous_close": fast_info.get("previous_close", 0),
+            "market_cap": fast_info.get("market_cap", 0),
+            "volume": fast_info.get("last_volume", 0),
+        }
+
+    def last_price(self, symbol):
+        price = yf.Ticker(symbol).fast_info["last_price"]
+        return float(price) if price else 0.0
+
+    def history(self, symbol, period, interval):
+        return yf.Ticker(symbol).history(period=period, interval=interval)
+
+    def download(self, symbols, **kwargs):
+        return yf.download(list(symbols), auto_adjust=True, progress=False, threads=True, **kwargs)
+
+    def search(self, query):
+        params = {
+            'function': 'SYMBOL_SEARCH',
+            'keywords': query,
+            'apikey': CONFIG.ALPHA_VANTAGE_API_KEY
+        }
+        response = requests.get(CONFIG.ALPHA_VANTAGE_BASE_URL, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        if 'bestMatches' not in data:
+            # Rate limits and bad keys answer 200 with a Note/Information message instead of results
+            raise RuntimeError(data.get('Note') or data.get('Information') or data.get('Error Message')
+                               or "Alpha Vantage returned no bestMatches")
+        results = []
+        for match in data.get('bestMatches', [])[:10]:  # Limit to 10 results
+            results.append({
+                'symbol': match.get('1. symbol', ''),
+                'name': match.get('2. name', ''),
+                'type': match.get('3. type', ''),
+                'region': match.get('4. region', ''),
+                'currency': match.get('8. currency', '')
+            })
+        return results
+
+    def listing(self):
+        response = requests.get(CONFIG.ALPHA_VANTAGE_BASE_URL,
+                                params={'function': 'LISTING_STATUS', 'apikey': CONFIG.ALPHA_VANTAGE_API_KEY},
+                                timeout=60)
+        response.raise_for_status()
+        return response.text
+
+    def news_feed(self, symbols, etag=None, modified=None):
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+        response = self.session.get(YAHOO_RSS_URL, params={"s": symbols, "region": "US", "lang": "en-US"},
+                                    headers=headers, timeout=CONFIG.NEWS_ARTICLE_TIMEOUT_SECONDS)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return FeedResponse(response.status_code, response.content,
+                            response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    def article_html(self, url):
+        response = self.session.get(url, timeout=CONFIG.NEWS_ARTICLE_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.content
+
+    def finnhub(self, path, params, timeout=None):
+        response = self.finnhub_session.get(f"{CONFIG.FINNHUB_BASE_URL}/{path}",
+                                            params={**params, "token": CONFIG.FINNHUB_API_TOKEN},
+                                            timeout=timeout or CONFIG.FINNHUB_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()
+
+    def url_exists(self, url):
+        return requests.head(url, timeout=3).status_code == 200
+
+
+# Provider methods whose answers are recorded and replayed
+RECORDED_METHODS = ["ticker_info", "fast_info", "last_price", "history", "download", "search",
+                    "listing", "news_feed", "article_html", "finnhub", "url_exists"]
+
+
+def _call_key(method, args, kwargs):
+    """Stable key for one call; download() symbol order does not matter"""
+    if method == "download":
+        args = (tuple(sorted(args[0])),) + tuple(args[1:])
+    if method == "finnhub":
+        # The timeout does not change the answer
+        args, kwargs = (args[0], tuple(sorted(args[1].items()))), {}
+    if method == "news_feed":
+        # One recording per feed; replay answers conditional requests itself
+        args, kwargs = args[:1], {}
+    return repr((method, args, tuple(sorted(kwargs.items()))))
+
+
+class ReplayStore:
+    """Recorded provider responses, one pickle per call under root/<method>/<sha1 of call>.pkl"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, method, key):
+        return os.path.join(self.root, method, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def load(self, method, key):
+        path = self._path(method, key)
+        if not os.path.exists(path):
+            raise ReplayMiss(f"No recording for {key}")
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def save(self, method, key, value):
+        path = self._path(method, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        if not os.path.isdir(self.root):
+            return 0
+        return sum(len(files) for _, _, files in os.walk(self.root))
+
+
+class RecordingProvider(MarketDataProvider):
+    """Passes every call to another provider and records its answer for replay"""
+
+    name = "record"
+
+    def __init__(self, inner, store):
+        self.inner = inner
+        self.store = store
+
+    def __getattribute__(self, attr):
+        if attr in RECORDED_METHODS:
+            inner = object.__getattribute__(self, "inner")
+            store = object.__getattribute__(self, "store")
+
+            def record(*args, **kwargs):
+                value = getattr(inner, attr)(*args, **kwargs)
+                if not (attr == "news_feed" and value.status == 304):
+                    store.save(attr, _call_key(attr, args, kwargs), value)
+                return value
+            return record
+        return object.__getattribute__(self, attr)
+
+
+def parse_latency(spec):
+    """'150' or 'download=800,history=300,default=100' -> {method: milliseconds}"""
+    latency = {}
+    for part in str(spec or "0").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        method, _, value = part.rpartition("=")
+        latency[method or "default"] = float(value)
+    return latency
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded responses with no network access. Each call sleeps for its
+    method's latency plus a jitter derived from the call itself, so a benchmark
+    run is reproducible call for call. Calls with no recording raise ReplayMiss
+    (slowly too, like a failing upstream).
+    """
+
+    name = "replay"
+
+    def __init__(self, store, latency_ms=None, jitter_ms=0):
+        self.store = store
+        self.latency_ms = latency_ms or {}
+        self.jitter_ms = jitter_ms
+        self.calls = 0
+        self.misses = 0
+
+    def delay_for(self, method, key):
+        delay = self.latency_ms.get(method, self.latency_ms.get("default", 0))
+        if self.jitter_ms:
+            digest = int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:8], 16)
+            delay += digest % (int(self.jitter_ms) + 1)
+        return delay / 1000.0
+
+    def _replay(self, method, *args, **kwargs):
+        key = _call_key(method, args, kwargs)
+        self.calls += 1
+        delay = self.delay_for(method, key)
+        if delay:
+            time.sleep(delay)
+        try:
+            return self.store.load(method, key)
+        except ReplayMiss:
+            self.misses += 1
+            raise
+
+    def ticker_info(self, symbol):
+        return self._replay("ticker_info", symbol)
+
+    def fast_info(self, symbol):
+        return self._replay("fast_info", symbol)
+
+    def last_price(self, symbol):
+        return self._replay("last_price", symbol)
+
+    def history(self, symbol, period, interval):
+        return self._replay("history", symbol, period, interval)
+
+    def download(self, symbols, **kwargs):
+        return self._replay("download", symbols, **kwargs)
+
+    def search(self, query):
+        return self._replay("search", query)
+
+    def listing(self):
+        return self._replay("listing")
+
+    def news_feed(self, symbols, etag=None, modified=None):
+        response = self._replay("news_feed", symbols)
+        if etag and etag == response.etag:
+            return response._replace(status=304, content=b"")
+        return response
+
+    def article_html(self, url):
+        return self._replay("article_html", url)
+
+    def finnhub(self, path, params, timeout=None):
+        return self._replay("finnhub", path, params)
+
+    def url_exists(self, url):
+        return self._replay("url_exists", url)
+
+    def stats(self):
+        return {"provider": self.name, "calls": self.calls, "misses": self.misses, "recordings": len(self.store)}
+
+
+def build_provider(name=None):
+    """Provider selected by MARKET_DATA_PROVIDER: live, record or replay"""
+    name = name or CONFIG.MARKET_DATA_PROVIDER
+    store = ReplayStore(CONFIG.MARKET_DATA_REPLAY_DIR)
+    if name == "replay":
+        return ReplayProvider(store, parse_latency(CONFIG.MARKET_DATA_REPLAY_LATENCY_MS),
+                              CONFIG.MARKET_DATA_REPLAY_JITTER_MS)
+    if name == "record":
+        return RecordingProvider(LiveProvider(), store)
+    if name == "live":
+        return LiveProvider()
+    raise ValueError(f"Unknown market data provider: {name}")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = build_provider()
+    return _provider
+
+
+def use_provider(provider):
+    """Swap the process-wide provider (tests, benchmarks); returns the previous one"""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    return previous
+
+
+if __name__ == '__main__':
+    # python -m utils.market_provider --symbols AAPL,MSFT   (run from the server directory)
+    parser = argparse.ArgumentParser(description="Record live market data for the replay provider")
+    parser.add_argument("--symbols", default="AAPL,MSFT,GOOGL,AMZN,NVDA,META,TSLA",
+                        help="comma-separated symbols to record")
+    args = parser.parse_args()
+
+    from utils.market_data import MARKET_INDICES
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    recorder = RecordingProvider(LiveProvider(), ReplayStore(CONFIG.MARKET_DATA_REPLAY_DIR))
+    for symbol in symbols + list(MARKET_INDICES.values()):
+        for method in ("ticker_info", "fast_info", "last_price"):
+            try:
+                getattr(recorder, method)(symbol)
+            except Exception as e:
+                print(f"Could not record {method} for {symbol}: {e}")
+    recorder.download(symbols + list(MARKET_INDICES.values()), period="7d")
+    print(f"{len(recorder.store)} recordings in {CONFIG.MARKET_DATA_REPLAY_DIR}")
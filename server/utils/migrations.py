@@ -0,0 +1,113 @@
+import argparse
+import os
+import re
+import sys
+
+from mysql.connector import errorcode
+from mysql.connector.errors import DatabaseError
+
+from db import init_db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+# Errors that mean a statement's change is already in the schema (a migration that was
+# applied by hand, or interrupted after some of its DDL had auto-committed)
+ALREADY_APPLIED = {
+    errorcode.ER_TABLE_EXISTS_ERROR,
+    errorcode.ER_DUP_FIELDNAME,
+    errorcode.ER_DUP_KEYNAME,
+    errorcode.ER_FK_DUP_NAME,
+}
+
+LOCK_NAME = "bygdb_schema_migrations"
+LOCK_TIMEOUT_SECONDS = 60
+
+
+def split_statements(sql):
+    """Statements of a migration file: '--' comments dropped, split on ';' at the end of a line"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in re.split(r";\s*$", "\n".join(lines), flags=re.M)
+            if statement.strip()]
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """[(version, name, statements)] for every NNNN_name.sql file, in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = re.match(r"^(\d+)_(.+)\.sql$", filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            migrations.append((int(match.group(1)), match.group(2), split_statements(f.read())))
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations(conn=None, directory=MIGRATIONS_DIR):
+    """
+    Apply every migration not yet recorded in schema_migrations, in order. Safe to run
+    on every startup and from several processes at once (a named lock serializes them).
+    Returns the versions applied by this call.
+    """
+    own_conn = conn is None
+    conn = conn or init_db()
+    cursor = conn.cursor()
+    applied = []
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT_SECONDS))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Timed out waiting for another process to finish migrating")
+        try:
+            done = applied_versions(cursor)
+            for version, name, statements in load_migrations(directory):
+                if version in done:
+                    continue
+                for statement in statements:
+                    try:
+                        cursor.execute(statement)
+                    except DatabaseError as e:
+                        if e.errno not in ALREADY_APPLIED:
+                            conn.rollback()
+                            raise RuntimeError(f"Migration {version:04d}_{name} failed: {e}") from e
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+                applied.append(version)
+                print(f"Applied migration {version:04d}_{name}")
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+    return applied
+
+
+if __name__ == '__main__':
+    # python -m utils.migrations [--check-plans]   (run from the server directory)
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="afterwards, fail if a hot query's plan uses a full table scan")
+    args = parser.parse_args()
+    versions = apply_migrations()
+    print(f"{len(versions)} migration(s) applied")
+    if args.check_plans:
+        from utils.query_plans import check_query_plans
+        problems = check_query_plans()
+        for problem in problems:
+            print(problem)
+        sys.exit(1 if problems else 0)
@@ -0,0 +1,211 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urljoin
+
+import feedparser
+from bs4 import BeautifulSoup
+
+from config import CONFIG
+from utils.market_provider import get_provider
+from utils.quote_cache import QUOTE_CACHE
+from utils.scheduler import PeriodicJob, register_job
+
+DEFAULT_NEWS_SYMBOLS = "^GSPC,BTC-USD,EURUSD=X"
+
+_image_pool = ThreadPoolExecutor(max_workers=CONFIG.NEWS_IMAGE_WORKERS, thread_name_prefix="news-images")
+
+_lock = threading.Lock()
+_feeds = {}      # symbols -> {"etag", "modified", "entries"}
+_snapshots = {}  # symbols -> (articles, complete, built_at); complete is False if an image missed the deadline
+_rebuilding = set()
+_first_build_lock = threading.Lock()
+
+
+def extract_image_from_page(article_url):
+    """
+    Extract the main image from the news article page. Fetch errors propagate (so
+    they are not cached); a page that cannot be parsed has no image.
+    """
+    # Fetch the article page with timeout
+    html = get_provider().article_html(article_url)
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Try different methods to find the main image
+        image_url = None
+
+        # Method 1: Look for Open Graph image
+        og_image = soup.find('meta', property='og:image')
+        if og_image and og_image.get('content'):
+            image_url = og_image['content']
+
+        # Method 2: Look for Twitter card image
+        if not image_url:
+            twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
+            if twitter_image and twitter_image.get('content'):
+                image_url = twitter_image['content']
+
+        # Method 3: Look for article images (common patterns)
+        if not image_url:
+            # Look for images in article content
+            article_selectors = [
+                'article img',
+                '.article-content img',
+                '.story-content img',
+                '.post-content img',
+                '.entry-content img',
+                '[data-module="ArticleBody"] img',
+                '.caas-body img'  # Yahoo Finance specific
+            ]
+
+            for selector in article_selectors:
+                img_tag = soup.select_one(selector)
+                if img_tag and img_tag.get('src'):
+                    src = img_tag['src']
+                    # Skip small images, icons, and ads
+                    if not any(skip in src.lower() for skip in ['icon', 'logo', 'avatar', 'ad', 'banner']) and \
+                       not src.endswith('.svg'):
+                        image_url = src
+                        break
+
+        # Method 4: Look for the first significant image in the page
+        if not image_url:
+            all_images = soup.find_all('img')
+            for img in all_images:
+                src = img.get('src', '')
+                if src and not any(skip in src.lower() for skip in ['icon', 'logo', 'avatar', 'ad', 'banner', 'pixel']) and \
+                   not src.endswith('.svg'):
+                    # Try to get image dimensions if available
+                    width = img.get('width')
+                    height = img.get('height')
+                    if width and height:
+                        try:
+                            w, h = int(width), int(height)
+                            if w >= 200 and h >= 150:  # Reasonable size for article image
+                                image_url = src
+                                break
+                        except ValueError:
+                            pass
+                    else:
+                        # If no dimensions, take the first reasonable image
+                        image_url = src
+                        break
+
+        # Convert relative URLs to absolute URLs
+        if image_url and image_url.startswith('/'):
+            image_url = urljoin(article_url, image_url)
+
+        return image_url
+
+    except Exception as e:
+        print(f"Error extracting image from {article_url}: {e}")
+        return None
+
+
+def get_article_image(article_url):
+    """Article image cached by URL (a missing image is cached too, a failed fetch is not)"""
+    return QUOTE_CACHE.get("article_image", article_url, lambda: extract_image_from_page(article_url))
+
+
+def fetch_feed(symbols):
+    """
+    RSS entries for symbols, fetched with If-None-Match/If-Modified-Since.
+    Returns (entries, changed); changed is False when the server answered 304.
+    """
+    with _lock:
+        state = dict(_feeds.get(symbols, {}))
+
+    response = get_provider().news_feed(symbols, state.get("etag"), state.get("modified"))
+    if response.status == 304 and "entries" in state:
+        return state["entries"], False
+
+    entries = feedparser.parse(response.content).entries
+    with _lock:
+        _feeds[symbols] = {
+            "etag": response.etag,
+            "modified": response.modified,
+            "entries": entries,
+        }
+    return entries, True
+
+
+def fetch_yahoo_news(symbols):
+    """Fetch news from Yahoo Finance RSS feed and extract images from article pages"""
+    entries, changed = fetch_feed(symbols)
+    with _lock:
+        snapshot = _snapshots.get(symbols)
+    if not changed and snapshot is not None and snapshot[1]:
+        return snapshot[0]
+
+    entries = entries[:10]
+    # Extract images from the actual article pages concurrently
+    futures = [_image_pool.submit(get_article_image, entry.link) for entry in entries]
+    wait(futures, timeout=CONFIG.NEWS_IMAGE_DEADLINE_SECONDS)
+
+    articles = []
+    for entry, future in zip(entries, futures):
+        article = {
+            "title": entry.title,
+            "link": entry.link,
+            "published": entry.published,
+            "summary": entry.get("summary", ""),
+            "category": "Market News"
+        }
+
+        # Only add image if one was found in time (late ones are cached for the next build)
+        image_url = future.result() if future.done() and future.exception() is None else None
+        if future.done() and future.exception() is not None:
+            print(f"Error fetching article image from {entry.link}: {future.exception()}")
+        if image_url:
+            article["image"] = image_url
+
+        articles.append(article)
+
+    with _lock:
+        # Images that missed the deadline or failed are retried by the next build
+        complete = all(future.done() and future.exception() is None for future in futures)
+        _snapshots[symbols] = (articles, complete, time.monotonic())
+    return articles
+
+
+def _rebuild_in_background(symbols):
+    """Rebuild the snapshot for symbols on its own thread, unless a rebuild is already running"""
+    with _lock:
+        if symbols in _rebuilding:
+            return
+        _rebuilding.add(symbols)
+
+    def rebuild():
+        try:
+            fetch_yahoo_news(symbols)
+        except Exception as e:
+            print(f"Error rebuilding news for {symbols}: {e}")
+        finally:
+            with _lock:
+                _rebuilding.discard(symbols)
+
+    threading.Thread(target=rebuild, name="news-rebuild", daemon=True).start()
+
+
+def get_news_snapshot(symbols=DEFAULT_NEWS_SYMBOLS):
+    """
+    Pre-built news list (kept fresh by the news-refresher job). A snapshot that is
+    too old is still served while one background rebuild replaces it; only the
+    very first request for symbols builds it, once, on the request thread.
+    """
+    with _lock:
+        snapshot = _snapshots.get(symbols)
+    if snapshot is None:
+        with _first_build_lock:
+            with _lock:
+                snapshot = _snapshots.get(symbols)
+            if snapshot is None:
+                return fetch_yahoo_news(symbols)
+    if time.monotonic() - snapshot[2] >= CONFIG.NEWS_REFRESH_SECONDS:
+        _rebuild_in_background(symbols)
+    return snapshot[0]
+
+
+NEWS_REFRESHER = register_job(PeriodicJob("news-refresher", lambda: fetch_yahoo_news(DEFAULT_NEWS_SYMBOLS),
+                                          CONFIG.NEWS_REFRESH_SECONDS))
@@ -0,0 +1,275 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from mysql.connector.errors import DatabaseError
+
+import queries
+from config import CONFIG
+from db import init_db, pin_to_primary
+from utils.trade_engine import TradeRejected, check_order, fill_order, order_stock_id, place_trade
+
+PENDING = "queued"
+
+
+class CommitInDoubt(Exception):
+    """COMMIT of a group failed: the server may or may not have applied it"""
+
+    def __init__(self, outcomes):
+        super().__init__("commit outcome unknown")
+        self.outcomes = outcomes
+
+
+class Order:
+    def __init__(self, user_id, symbol, action, quantity, price):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.symbol = symbol
+        self.action = action
+        self.quantity = quantity
+        self.price = price
+        self.submitted_at = datetime.now()
+        self.completed_at = None
+        self.status = PENDING
+        self.fill = None
+        self.error = None
+
+    def message(self):
+        if self.status != "filled":
+            return self.error
+        if self.action == "buy":
+            return "Stock purchased successfully"
+        return f"Successfully sold {self.quantity} shares of {self.symbol} for ${self.fill['total']:.2f}"
+
+    def to_dict(self):
+        return {
+            "order_id": self.id,
+            "status": self.status,
+            "symbol": self.symbol,
+            "action": self.action,
+            "quantity": self.quantity,
+            "price": self.price,
+            "submitted_at": self.submitted_at.isoformat(),
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "message": self.message(),
+            "fill": self.fill,
+        }
+
+
+class OrderQueue:
+    """
+    /trade hands orders to a small pool of workers instead of filling them on the
+    request thread. Every account is routed to one worker, so an account's orders
+    are filled in submission order. A worker takes whatever is queued (up to
+    batch_size, waiting batch_wait_ms for more) and fills the whole batch in one
+    transaction with one commit; throughput then grows with the batch instead of
+    being bounded by the latency of a commit per order.
+    Orders live in memory only: anything still queued when the process exits is lost.
+    """
+
+    def __init__(self, workers, batch_size, batch_wait_ms, max_finished):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_finished = max_finished
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._orders = OrderedDict()   # id -> Order, oldest first
+        self.counts = {"submitted": 0, "filled": 0, "rejected": 0, "failed": 0, "batches": 0, "fallbacks": 0}
+        self.batched_orders = 0
+        self.largest_batch = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i, orders in enumerate(self._queues):
+                thread = threading.Thread(target=self._run, args=(orders,), name=f"order-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, user_id, symbol, action, quantity, price):
+        """Queue an order and return it right away (ValueError for a malformed order)"""
+        symbol, quantity, price = check_order(symbol, action, quantity, price)
+        order = Order(int(user_id), symbol, action, quantity, price)
+        with self._lock:
+            self._orders[order.id] = order
+            self.counts["submitted"] += 1
+            self._trim()
+        self.start()
+        self._queues[order.user_id % len(self._queues)].put(order)
+        return order
+
+    def get(self, order_id):
+        with self._lock:
+            return self._orders.get(order_id)
+
+    def wait(self, order_id, timeout):
+        """The order once it is finished, or as it is after timeout seconds (None if unknown)"""
+        with self._changed:
+            order = self._orders.get(order_id)
+            if order is not None:
+                self._changed.wait_for(lambda: order.status != PENDING, timeout)
+            return order
+
+    def _trim(self):
+        excess = len(self._orders) - self.max_finished
+        if excess <= 0:
+            return
+        for order_id in [order_id for order_id, order in self._orders.items() if order.status != PENDING][:excess]:
+            del self._orders[order_id]
+
+    def _run(self, orders):
+        while True:
+            batch = [orders.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(orders.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.process(batch)
+            except Exception as e:
+                print(f"Order worker error: {e}")
+                self._finish([(order, "failed", None, "Failed to execute trade") for order in batch
+                              if order.status == PENDING])
+
+    def process(self, batch):
+        conn = init_db()
+        try:
+            try:
+                outcomes = self._group_commit(conn, batch)
+            except CommitInDoubt as e:
+                print(f"Commit of a group of {len(batch)} orders failed: {e.__cause__}")
+                outcomes = self._settle(conn, batch, e.outcomes)
+            except DatabaseError as e:
+                # Something in the batch broke the transaction before COMMIT, so nothing was
+                # written: fill its orders one by one
+                print(f"Group commit of {len(batch)} orders failed, retrying individually: {e}")
+                outcomes = self._fill_each(conn, batch)
+        finally:
+            conn.close()
+        self._finish(outcomes)
+
+    def _fill_each(self, conn, batch):
+        with self._lock:
+            self.counts["fallbacks"] += 1
+        return [self._fill_alone(conn, order) for order in batch]
+
+    def _settle(self, conn, batch, outcomes):
+        """
+        Outcomes of a group whose COMMIT raised. The fills of a group are one transaction,
+        so its last transaction id tells whether all or none of them landed; only when
+        none did are the orders retried, and when that cannot be told the batch fails.
+        """
+        fills = [fill for _, status, fill, _ in outcomes if status == "filled"]
+        if not fills:
+            return outcomes
+        try:
+            committed = self._transaction_exists(fills[-1]["transaction_id"])
+        except Exception as e:
+            print(f"Could not tell whether a group of {len(batch)} orders was committed: {e}")
+            return [(order, "failed", None, "Failed to execute trade") for order in batch]
+        if committed:
+            self._count_batch(batch)
+            return outcomes
+        return self._fill_each(conn, batch)
+
+    @staticmethod
+    def _transaction_exists(transaction_id):
+        # A fresh connection: the one the COMMIT failed on may be gone
+        conn = init_db()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(queries.TRANSACTION_EXISTS, (transaction_id,))
+            return cursor.fetchone() is not None
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _group_commit(self, conn, batch):
+        outcomes = []
+        stock_ids = {}
+        for order in batch:
+            # May call upstream for a new symbol, so it happens before any row is locked
+            try:
+                stock_ids[order.id] = order_stock_id(conn, order.symbol, order.action)
+            except TradeRejected as e:
+                outcomes.append((order, "rejected", None, str(e)))
+            except DatabaseError:
+                raise
+            except Exception as e:
+                print(f"Error resolving {order.symbol} for order {order.id}: {e}")
+                outcomes.append((order, "failed", None, "Failed to execute trade"))
+
+        conn.rollback()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            for order in batch:
+                if order.id not in stock_ids:
+                    continue
+                try:
+                    fill = fill_order(cursor, order.user_id, order.symbol, stock_ids[order.id], order.action,
+                                      order.quantity, order.price, order.submitted_at)
+                    outcomes.append((order, "filled", fill, None))
+                except TradeRejected as e:
+                    outcomes.append((order, "rejected", None, str(e)))
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        try:
+            conn.commit()
+        except DatabaseError as e:
+            raise CommitInDoubt(outcomes) from e
+        self._count_batch(batch)
+        return outcomes
+
+    def _count_batch(self, batch):
+        with self._lock:
+            self.counts["batches"] += 1
+            self.batched_orders += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def _fill_alone(self, conn, order):
+        try:
+            fill = place_trade(conn, order.user_id, order.symbol, order.action, order.quantity, order.price,
+                               order.submitted_at)
+            return order, "filled", fill, None
+        except TradeRejected as e:
+            return order, "rejected", None, str(e)
+        except Exception as e:
+            print(f"Error executing order {order.id}: {e}")
+            return order, "failed", None, "Failed to execute trade"
+
+    def _finish(self, outcomes):
+        with self._changed:
+            for order, status, fill, error in outcomes:
+                if status == "filled":
+                    # Before the order shows as filled, so the client's next read sees the fill
+                    pin_to_primary(order.user_id)
+                order.status, order.fill, order.error = status, fill, error
+                order.completed_at = datetime.now()
+                self.counts[status] += 1
+            self._changed.notify_all()
+
+    def stats(self):
+        with self._lock:
+            batches = self.counts["batches"]
+            return {
+                "queued": sum(orders.qsize() for orders in self._queues),
+                "workers": len(self._threads),
+                **self.counts,
+                "avgBatchSize": round(self.batched_orders / batches, 2) if batches else 0.0,
+                "largestBatch": self.largest_batch,
+            }
+
+
+ORDER_QUEUE = OrderQueue(workers=CONFIG.ORDER_WORKERS, batch_size=CONFIG.ORDER_BATCH_SIZE,
+                         batch_wait_ms=CONFIG.ORDER_BATCH_WAIT_MS, max_finished=CONFIG.ORDER_STATUS_MAX)
@@ -0,0 +1,79 @@
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+
+from config import CONFIG
+from db import init_db
+from utils.market_data import MARKET_INDICES, download_recent_closes, fetch_concurrently
+from utils.market_provider import get_provider
+from utils.quote_stream import QUOTE_FEED
+from utils.scheduler import PeriodicJob, register_job
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+
+def is_market_open(now=None):
+    """Regular US equity session, Mon-Fri 9:30-16:00 New York time (holidays not included)"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def refresh_interval(now=None):
+    if is_market_open(now):
+        return CONFIG.PRICE_REFRESH_OPEN_SECONDS
+    return CONFIG.PRICE_REFRESH_CLOSED_SECONDS
+
+
+def get_held_symbols():
+    """Every symbol somebody currently holds"""
+    conn = init_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT DISTINCT s.symbol
+        FROM stocksportfolios sp
+        JOIN stocks s ON sp.stock_id = s.id
+        WHERE sp.quantity > 0
+    """)
+    symbols = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return symbols
+
+
+def quotes_from_closes(closes):
+    """Streaming quote per symbol from its recent daily closes"""
+    quotes = {}
+    for symbol, series in closes.items():
+        if series.empty:
+            continue
+        price = float(series.iloc[-1])
+        previous_close = float(series.iloc[-2]) if len(series) > 1 else price
+        change = price - previous_close
+        quotes[symbol] = {
+            "price": price,
+            "previousClose": previous_close,
+            "change": change,
+            "changePercent": change / previous_close * 100 if previous_close else 0.0,
+        }
+    return quotes
+
+
+def refresh_quotes():
+    """Write fresh quotes for all held symbols and market indices into the shared quote cache"""
+    try:
+        held = get_held_symbols()
+    except Exception as e:
+        print(f"Could not load held symbols, refreshing indices only: {e}")
+        held = []
+
+    # Streaming clients may watch symbols nobody holds (e.g. the homebroker quote page)
+    symbols = list(dict.fromkeys(held + list(MARKET_INDICES.values()) + sorted(QUOTE_FEED.subscribed_symbols())))
+    closes = download_recent_closes(symbols)
+    QUOTE_FEED.publish(quotes_from_closes(closes))
+    # The banner reads .info for the indices; refresh it on the shared pool
+    fetch_concurrently(lambda symbol: get_provider().ticker_info(symbol), MARKET_INDICES.values(),
+                       CONFIG.PRICE_REFRESH_OPEN_SECONDS, "info")
+
+
+PRICE_REFRESHER = register_job(PeriodicJob("price-refresher", refresh_quotes, refresh_interval))
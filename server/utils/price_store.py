@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+from config import CONFIG
+from utils.market_provider import get_provider
+
+# Row layout of every symbol file: one contiguous row per column, one entry per daily bar
+COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+DATE, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(COLUMNS))
+
+EPOCH = date(1970, 1, 1)
+
+
+def _to_day(value):
+    """date/datetime/Timestamp -> days since epoch"""
+    return (pd.Timestamp(value).date() - EPOCH).days
+
+
+def download_daily_bars(symbols, start, end):
+    """Default fetcher: one bulk download, returns {symbol: OHLCV DataFrame}"""
+    data = get_provider().download(list(symbols), start=start, end=end, group_by="ticker")
+    bars = {}
+    for symbol in symbols:
+        if data.empty:
+            bars[symbol] = pd.DataFrame(columns=COLUMNS[1:])
+        elif isinstance(data.columns, pd.MultiIndex):
+            bars[symbol] = data[symbol].dropna(how="all") if symbol in data.columns.get_level_values(0) \
+                else pd.DataFrame(columns=COLUMNS[1:])
+        else:
+            bars[symbol] = data.dropna(how="all")
+    return bars
+
+
+class PriceStore:
+    """
+    On-disk store of adjusted daily bars, one .npy file per symbol.
+
+    Each file holds a (6, n) float64 array in C order, so every column (date,
+    open, high, low, close, volume) is contiguous and a date range is a plain
+    slice of a memory-mapped file. Only the missing tail is fetched upstream;
+    in offline mode nothing is fetched and the store is read-only apart from
+    explicit write() calls (used to seed tests and benchmarks).
+    """
+
+    def __init__(self, root, offline=False, fetch=download_daily_bars,
+                 refresh_seconds=900, default_lookback_days=366 * 5):
+        self.root = root
+        self.offline = offline
+        self.fetch = fetch
+        self.refresh_seconds = refresh_seconds
+        self.default_lookback_days = default_lookback_days
+        self._lock = threading.Lock()
+        self._checked_at = {}
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, symbol):
+        return os.path.join(self.root, quote(symbol.upper(), safe="") + ".npy")
+
+    def _load(self, symbol):
+        path = self.path_for(symbol)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def last_date(self, symbol):
+        data = self._load(symbol)
+        if data is None or data.shape[1] == 0:
+            return None
+        return EPOCH + timedelta(days=int(data[DATE, -1]))
+
+    def _tail_start(self, symbol):
+        """
+        First date to re-fetch: the bar before the last stored one. The last bar may
+        have been stored intraday; the one before it was final, so comparing it tells
+        us whether the adjusted history changed.
+        """
+        data = self._load(symbol)
+        if data is None or data.shape[1] == 0:
+            return None
+        return EPOCH + timedelta(days=int(data[DATE, max(data.shape[1] - 2, 0)]))
+
+    def read(self, symbol, start=None, end=None):
+        """Bars for start <= date < end as a DataFrame backed by the memory-mapped file"""
+        data = self._load(symbol)
+        if data is None:
+            return pd.DataFrame(columns=COLUMNS[1:], index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+        days = data[DATE]
+        lo = 0 if start is None else int(np.searchsorted(days, _to_day(start), side="left"))
+        hi = len(days) if end is None else int(np.searchsorted(days, _to_day(end), side="left"))
+        index = pd.DatetimeIndex(pd.to_datetime(days[lo:hi].astype("int64"), unit="D"), name="Date")
+        return pd.DataFrame({name: data[i, lo:hi] for i, name in enumerate(COLUMNS) if i != DATE},
+                            index=index, copy=False)
+
+    def read_closes(self, symbol, start=None, end=None):
+        return self.read(symbol, start, end)["Close"].rename(symbol)
+
+    def write(self, symbol, bars):
+        """Merge bars (DataFrame indexed by date with OHLCV columns) into the symbol file"""
+        bars = bars.dropna(subset=["Close"])
+        if bars.empty:
+            return
+        incoming = np.vstack([
+            np.array([_to_day(d) for d in bars.index], dtype="float64"),
+            *[bars[name].to_numpy(dtype="float64") if name in bars else np.full(len(bars), np.nan)
+              for name in COLUMNS[1:]]
+        ])
+
+        existing = self._load(symbol)
+        if existing is not None and existing.shape[1]:
+            # Keep stored bars strictly before the first incoming bar; the tail is replaced
+            keep = int(np.searchsorted(existing[DATE], incoming[DATE, 0], side="left"))
+            merged = np.hstack([np.asarray(existing[:, :keep]), incoming])
+        else:
+            merged = incoming
+        del existing
+
+        path = self.path_for(symbol)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(merged))
+        os.replace(tmp_path, path)
+
+    def update(self, symbols, end=None):
+        """Fetch only the missing tail of every symbol (bulk, grouped by start date)"""
+        if self.offline:
+            return
+        end = end or date.today() + timedelta(days=1)
+        now = time.monotonic()
+
+        by_start = {}
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                checked_at = self._checked_at.get(symbol)
+                if checked_at is not None and now - checked_at < self.refresh_seconds:
+                    continue
+                self._checked_at[symbol] = now
+                tail_start = self._tail_start(symbol)
+                start = tail_start if tail_start else end - timedelta(days=self.default_lookback_days)
+                by_start.setdefault(start, []).append(symbol)
+
+        for start, group in by_start.items():
+            try:
+                fetched = self.fetch(group, start, end)
+            except Exception as e:
+                print(f"Error fetching daily bars for {group}: {e}")
+                with self._lock:
+                    for symbol in group:
+                        self._checked_at.pop(symbol, None)
+                continue
+
+            for symbol, bars in fetched.items():
+                if self._adjustment_changed(symbol, bars):
+                    # A split or dividend rewrote the adjusted history: reload it in full
+                    try:
+                        bars = self.fetch([symbol], end - timedelta(days=self.default_lookback_days), end)[symbol]
+                        self.delete(symbol)
+                    except Exception as e:
+                        print(f"Error reloading daily bars for {symbol}: {e}")
+                        continue
+                self.write(symbol, bars)
+
+    def _adjustment_changed(self, symbol, bars):
+        """True if the overlapping bar's adjusted close no longer matches the stored one"""
+        data = self._load(symbol)
+        if data is None or data.shape[1] == 0 or bars.empty:
+            return False
+        first_day = _to_day(bars.index[0])
+        pos = int(np.searchsorted(data[DATE], first_day))
+        if pos >= data.shape[1] or data[DATE, pos] != first_day:
+            return False
+        stored, fresh = float(data[CLOSE, pos]), float(bars["Close"].iloc[0])
+        return abs(stored - fresh) > 1e-6 * max(abs(stored), 1.0)
+
+    def delete(self, symbol):
+        path = self.path_for(symbol)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_closes(self, symbols, start, end):
+        """Adjusted closes for start <= date < end, one column per symbol, updating the store first"""
+        self.update(symbols)
+        closes = {symbol: self.read_closes(symbol, start, end) for symbol in dict.fromkeys(symbols)}
+        if not closes:
+            return pd.DataFrame(dtype=float)
+        return pd.DataFrame(closes)
+
+
+PRICE_STORE = PriceStore(
+    root=CONFIG.PRICE_STORE_DIR,
+    offline=CONFIG.PRICE_STORE_OFFLINE,
+    refresh_seconds=CONFIG.PRICE_STORE_REFRESH_SECONDS,
+)
@@ -0,0 +1,31 @@
+from db import init_db
+from queries import HOT_QUERIES
+
+
+def full_scans(plan_rows):
+    """Tables an EXPLAIN plan reads with a full table scan (access type ALL)"""
+    return [row["table"] for row in plan_rows
+            if row.get("type") == "ALL" and not str(row.get("table") or "").startswith("<")]
+
+
+def check_query_plans(conn=None, queries=HOT_QUERIES):
+    """
+    EXPLAIN every hot query and return one message per query that full-scans a table
+    (empty when every plan uses an index). Run it against a database with realistic
+    row counts: on near-empty tables MySQL may scan on purpose.
+    """
+    own_conn = conn is None
+    conn = conn or init_db()
+    cursor = conn.cursor(dictionary=True)
+    problems = []
+    try:
+        for name, (sql, params) in queries.items():
+            cursor.execute("EXPLAIN " + sql, params)
+            scanned = full_scans(cursor.fetchall())
+            if scanned:
+                problems.append(f"{name}: full table scan on {', '.join(scanned)}")
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+    return problems
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import CONFIG
+
+
+class _Flight:
+    """A fetch that is currently running; other callers wait on it instead of fetching again."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QuoteCache:
+    """
+    Process-wide TTL cache for market data with single-flight loading.
+
+    Entries are keyed by (kind, key), e.g. ('info', 'AAPL'), and every kind has
+    its own TTL. The cache is bounded and evicts the least recently used entry
+    when full. Concurrent misses for the same entry share one upstream fetch.
+    """
+
+    def __init__(self, max_entries, ttls, default_ttl=60):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (kind, key) -> (value, stored_at)
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.load_errors = 0
+
+    def ttl_for(self, kind):
+        return self.ttls.get(kind, self.default_ttl)
+
+    def get(self, kind, key, loader, ttl=None):
+        """Return the cached value for (kind, key), calling loader() on a miss."""
+        cache_key = (kind, key)
+        ttl = self.ttl_for(kind) if ttl is None else ttl
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and now - entry[1] < ttl:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            flight = self._inflight.get(cache_key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._inflight[cache_key] = flight
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.load_errors += 1
+            raise
+        else:
+            self.put(kind, key, flight.value)
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            flight.event.set()
+
+        return flight.value
+
+    def peek(self, kind, key, ttl=None):
+        """Return a fresh cached value without loading, or None."""
+        cache_key = (kind, key)
+        ttl = self.ttl_for(kind) if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and time.monotonic() - entry[1] < ttl:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def last_known(self, kind, key):
+        """Return the most recent value even if it has expired, or None."""
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            return entry[0] if entry is not None else None
+
+    def put(self, kind, key, value):
+        """Store a value directly, e.g. from a bulk fetch."""
+        cache_key = (kind, key)
+        with self._lock:
+            self._entries[cache_key] = (value, time.monotonic())
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, kind=None, key=None):
+        """Drop one entry, every entry of a kind, or the whole cache."""
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+                return
+            for cache_key in list(self._entries):
+                if cache_key[0] == kind and (key is None or cache_key[1] == key):
+                    del self._entries[cache_key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "loadErrors": self.load_errors,
+                "inflight": len(self._inflight),
+            }
+
+
+QUOTE_CACHE = QuoteCache(
+    max_entries=CONFIG.QUOTE_CACHE_MAX_ENTRIES,
+    ttls={
+        "last_price": CONFIG.QUOTE_TTL_LAST_PRICE,
+        "fast_info": CONFIG.QUOTE_TTL_FAST_INFO,
+        "info": CONFIG.QUOTE_TTL_INFO,
+        "history_7d": CONFIG.QUOTE_TTL_HISTORY_7D,
+        "closes_7d": CONFIG.QUOTE_TTL_HISTORY_7D,
+        "enrichment": CONFIG.QUOTE_TTL_FAST_INFO,
+        "finnhub": CONFIG.FINNHUB_CACHE_TTL_SECONDS,
+        "article_image": CONFIG.NEWS_IMAGE_TTL_SECONDS,
+        "symbol_search": 24 * 3600,
+    },
+)
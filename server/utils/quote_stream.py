@@ -0,0 +1,109 @@
+import json
+import queue
+import threading
+import time
+
+from config import CONFIG
+
+
+class QuoteFeed:
+    """
+    One shared price feed fanned out to any number of streaming clients.
+
+    The price refresher publishes a batch of quotes per cycle; every subscriber
+    only receives the symbols it asked for, and only those whose quote changed.
+    The set of subscribed symbols is folded into the refresher's symbol list, so
+    N connected clients still cost one upstream fetch per cycle.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._latest = {}        # symbol -> quote dict
+        self._subscribers = {}   # id -> (symbols, queue)
+        self._next_id = 0
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, symbols):
+        """Register interest in symbols; returns (subscription id, queue of delta dicts)"""
+        updates = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._next_id += 1
+            subscription_id = self._next_id
+            self._subscribers[subscription_id] = (frozenset(symbols), updates)
+        return subscription_id, updates
+
+    def unsubscribe(self, subscription_id):
+        with self._lock:
+            self._subscribers.pop(subscription_id, None)
+
+    def _symbols_locked(self):
+        return set().union(*(symbols for symbols, _ in self._subscribers.values()))
+
+    def subscribed_symbols(self):
+        with self._lock:
+            return self._symbols_locked()
+
+    def snapshot(self, symbols):
+        with self._lock:
+            return {symbol: self._latest[symbol] for symbol in symbols if symbol in self._latest}
+
+    def publish(self, quotes):
+        """Record quotes ({symbol: quote}) and push the ones that changed to their subscribers"""
+        with self._lock:
+            changed = {symbol: quote for symbol, quote in quotes.items()
+                       if self._latest.get(symbol, {}).get("price") != quote.get("price")}
+            self._latest.update(changed)
+            subscribers = list(self._subscribers.values())
+            if changed:
+                self.published += 1
+        if not changed:
+            return
+
+        dropped = 0
+        for symbols, updates in subscribers:
+            delta = {symbol: changed[symbol] for symbol in symbols if symbol in changed}
+            if not delta:
+                continue
+            try:
+                updates.put_nowait(delta)
+            except queue.Full:
+                # A client that stopped reading only loses deltas, never blocks the feed
+                dropped += 1
+        if dropped:
+            with self._lock:
+                self.dropped += dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "symbols": len(self._symbols_locked()),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_quotes(feed, symbols):
+    """Server-sent events: a snapshot first, then one 'quotes' event per changed batch"""
+    subscription_id, updates = feed.subscribe(symbols)
+    try:
+        yield sse_event("quotes", feed.snapshot(symbols))
+        while True:
+            try:
+                delta = updates.get(timeout=CONFIG.STREAM_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                # Comment line keeps proxies from closing an idle connection
+                yield f": keep-alive {int(time.time())}\n\n"
+                continue
+            yield sse_event("quotes", delta)
+    finally:
+        feed.unsubscribe(subscription_id)
+
+
+QUOTE_FEED = QuoteFeed()
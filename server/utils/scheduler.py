@@ -0,0 +1,88 @@
+import threading
+import time
+
+
+class PeriodicJob:
+    """
+    Runs fn() on a daemon thread every interval seconds.
+    interval may be a number or a callable returning the number of seconds to sleep next.
+    """
+
+    def __init__(self, name, fn, interval, run_immediately=True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.run_immediately = run_immediately
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at = None
+        self.last_duration = None
+        self.last_error = None
+
+    def next_interval(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+    def run_once(self):
+        started = time.monotonic()
+        try:
+            self.fn()
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"Error in background job {self.name}: {e}")
+        finally:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.last_duration = time.monotonic() - started
+
+    def _loop(self):
+        if not self.run_immediately:
+            self._wake.wait(self.next_interval())
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.run_once()
+            self._wake.wait(self.next_interval())
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def trigger(self):
+        """Run the job now instead of waiting for the rest of the interval"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "running": self.is_running(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "lastRunAt": self.last_run_at,
+            "lastDurationSeconds": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "lastError": self.last_error,
+        }
+
+
+# Every job started by the server, by name (see /metrics)
+JOBS = {}
+
+
+def register_job(job):
+    JOBS[job.name] = job
+    return job
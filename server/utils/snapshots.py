@@ -0,0 +1,348 @@
+import argparse
+from datetime import datetime, time as dtime, timedelta
+
+import pandas as pd
+
+import queries
+from db import init_db, init_read_db
+from utils.market_data import compute_wallet_frame, get_recent_closes
+from utils.price_refresher import MARKET_TZ
+from utils.price_store import PRICE_STORE
+from utils.scheduler import PeriodicJob, register_job
+from utils.timeline_cache import TIMELINES
+from utils.timeline_engine import compute_timeline, ledger_arrays, price_matrix
+
+HISTORY_DAYS = 365
+# Snapshots are taken a little after the US close, once the day's bar is final
+SNAPSHOT_TIME = dtime(16, 15)
+INSERT_CHUNK = 1000
+
+SNAPSHOT_COLUMNS = ["market_value", "cost_basis", "cash_balance"]
+
+
+def compute_daily_snapshots(ledger, balance, closes, start, end):
+    """
+    Market value, cost basis (net amount invested) and cash balance at the end of
+    every day in [start, end] for one user, from all of the user's trades, the
+    current cash balance and daily closes (DatetimeIndex x symbol); see
+    utils/timeline_engine.compute_timeline.
+    """
+    days = pd.date_range(start, end)
+    if ledger.empty:
+        return pd.DataFrame({"market_value": 0.0, "cost_basis": 0.0, "cash_balance": float(balance)}, index=days)
+
+    # Trades before start collapse into the opening position; trades after end still move cash
+    trade_days = pd.to_datetime(ledger["transaction_date"]).dt.normalize()
+    full_days = pd.date_range(min(days[0], trade_days.min()), max(days[-1], trade_days.max()))
+    trades = ledger_arrays(ledger, full_days[0])
+    timeline = compute_timeline(trades, price_matrix(closes, trades.symbols, full_days), balance)
+    return pd.DataFrame({column: timeline[column] for column in SNAPSHOT_COLUMNS}, index=full_days).reindex(days)
+
+
+def _in_users(column, user_ids):
+    return f" AND {column} IN ({', '.join(['%s'] * len(user_ids))})"
+
+
+def load_ledger(cursor, user_ids=None, since=None):
+    """Trades of user_ids (default: every user), optionally only those made on or after since"""
+    sql = queries.LEDGER
+    params = ()
+    if user_ids is not None:
+        sql += _in_users("a.user_id", user_ids)
+        params = tuple(user_ids)
+    if since is not None:
+        sql += " AND t.transaction_date >= %s"
+        params += (since,)
+    cursor.execute(sql + " ORDER BY t.transaction_date", params)
+    return pd.DataFrame(cursor.fetchall(),
+                        columns=["user_id", "symbol", "transaction_type", "quantity", "price", "transaction_date"])
+
+
+def load_balances(cursor, user_ids=None):
+    sql = queries.ACCOUNT_BALANCES
+    params = ()
+    if user_ids is not None:
+        sql += _in_users("user_id", user_ids)
+        params = tuple(user_ids)
+    cursor.execute(sql, params)
+    return {row["user_id"]: row["balance"] or 0 for row in cursor.fetchall()}
+
+
+def write_snapshots(cursor, rows):
+    for i in range(0, len(rows), INSERT_CHUNK):
+        cursor.executemany("""
+            INSERT INTO portfolio_daily_snapshots (user_id, snapshot_date, market_value, cost_basis, cash_balance)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE market_value = VALUES(market_value), cost_basis = VALUES(cost_basis),
+                                    cash_balance = VALUES(cash_balance)
+        """, rows[i:i + INSERT_CHUNK])
+
+
+def backfill_snapshots(start, end, user_ids=None):
+    """
+    (Re)write snapshots for every day in [start, end] for user_ids (default: every
+    user) from one ledger query and one price load. Returns the number of rows written.
+    """
+    conn = init_db()
+    cursor = conn.cursor(dictionary=True)
+    ledger = load_ledger(cursor, user_ids)
+    balances = load_balances(cursor, user_ids)
+
+    symbols = sorted(ledger["symbol"].unique())
+    # A week of lead-in so a position held over a weekend or holiday at start has a price
+    closes = PRICE_STORE.get_closes(symbols, start - timedelta(days=7), end + timedelta(days=1)) \
+        if symbols else pd.DataFrame(dtype=float)
+
+    ledgers = dict(tuple(ledger.groupby("user_id")))
+    empty = ledger.iloc[0:0]
+    rows = []
+    for user_id, balance in balances.items():
+        series = compute_daily_snapshots(ledgers.get(user_id, empty), balance, closes, start, end)
+        rows.extend((user_id, day.date(), round(float(mv), 2), round(float(cost), 2), round(float(cash), 2))
+                    for day, mv, cost, cash in series[SNAPSHOT_COLUMNS].itertuples())
+
+    write_snapshots(cursor, rows)
+    conn.commit()
+    # Cached timelines of these users may hold the rows just rewritten
+    TIMELINES.invalidate(user_ids)
+    cursor.close()
+    conn.close()
+    return len(rows)
+
+
+def market_today(now=None):
+    """Today on the exchange's clock, the one every snapshot day is counted on"""
+    return (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ).date()
+
+
+def last_closed_day(now=None):
+    """The latest day whose snapshot can be final (today once the US session is over)"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.date() if now.time() >= SNAPSHOT_TIME else now.date() - timedelta(days=1)
+
+
+def seconds_until_snapshot(now=None):
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    target = datetime.combine(now.date(), SNAPSHOT_TIME, tzinfo=MARKET_TZ)
+    if now >= target:
+        target += timedelta(days=1)
+    return max(60, (target - now).total_seconds())
+
+
+def roll_forward(trades, holdings, balance, previous_cost, closes, start, end):
+    """
+    One user's snapshots for [start, end] without replaying their history: the
+    position at the start of the range is the current holdings ({symbol: quantity})
+    minus every trade made since start, trades is exactly those trades, and the
+    cost basis carries on from previous_cost (the snapshot of the day before start).
+    """
+    net = trades.assign(signed=trades["quantity"].astype(float)
+                        .where(trades["transaction_type"] == "buy", -trades["quantity"].astype(float)))
+    opening = pd.Series(holdings, dtype=float).sub(net.groupby("symbol")["signed"].sum(), fill_value=0)
+    # The opening position enters as free buys on start: it moves neither cost nor cash
+    opening_trades = pd.DataFrame({"symbol": opening.index, "transaction_type": "buy", "quantity": opening.to_numpy(),
+                                   "price": 0.0, "transaction_date": pd.Timestamp(start)})
+    ledger = pd.concat([opening_trades, trades[opening_trades.columns]], ignore_index=True)
+    series = compute_daily_snapshots(ledger, balance, closes, start, end)
+    series["cost_basis"] += float(previous_cost)
+    return series
+
+
+def append_snapshots(start, end):
+    """
+    Write snapshots for [start, end] (normally just the last closed day) from the
+    previous day's snapshots, current holdings and the trades made since start.
+    Users without a snapshot for the day before start are backfilled from their
+    full ledger instead. Returns the number of rows written.
+    """
+    conn = init_db()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(queries.SNAPSHOT_COST_ON, (start - timedelta(days=1),))
+    previous = {row["user_id"]: row["cost_basis"] for row in cursor.fetchall()}
+    balances = load_balances(cursor)
+    new_users = [user_id for user_id in balances if user_id not in previous]
+    rows = []
+    if previous:
+        cursor.execute(queries.ALL_HOLDINGS)
+        holdings = {}
+        for row in cursor.fetchall():
+            holdings.setdefault(row["user_id"], {})[row["symbol"]] = float(row["quantity"])
+        trades = load_ledger(cursor, list(previous), since=start)
+
+        symbols = sorted(set(trades["symbol"]) | {symbol for user_id in previous for symbol in holdings.get(user_id, ())})
+        closes = PRICE_STORE.get_closes(symbols, start - timedelta(days=7), end + timedelta(days=1)) \
+            if symbols else pd.DataFrame(dtype=float)
+
+        by_user = dict(tuple(trades.groupby("user_id")))
+        empty = trades.iloc[0:0]
+        for user_id, previous_cost in previous.items():
+            if user_id not in balances:
+                continue
+            series = roll_forward(by_user.get(user_id, empty), holdings.get(user_id, {}), balances[user_id],
+                                  previous_cost, closes, start, end)
+            rows.extend((user_id, day.date(), round(float(mv), 2), round(float(cost), 2), round(float(cash), 2))
+                        for day, mv, cost, cash in series[SNAPSHOT_COLUMNS].itertuples())
+        write_snapshots(cursor, rows)
+        conn.commit()
+    cursor.close()
+    conn.close()
+
+    if new_users:
+        return len(rows) + backfill_snapshots(start, end, new_users)
+    return len(rows)
+
+
+def take_daily_snapshots():
+    """Append the snapshot rows of every day since the newest one (normally just today)"""
+    last_day = last_closed_day()
+    conn = init_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(snapshot_date) FROM portfolio_daily_snapshots")
+    latest = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+
+    # Days before the first snapshot are an explicit backfill, not the nightly job's business
+    if latest is None:
+        return backfill_snapshots(last_day, last_day)
+    start = latest + timedelta(days=1)
+    if start > last_day:
+        return 0
+    return append_snapshots(start, last_day)
+
+
+def read_snapshots(cursor, user_id, start, end):
+    cursor.execute(queries.SNAPSHOT_RANGE, (user_id, start, end))
+    rows = cursor.fetchall()
+    frame = pd.DataFrame(rows, columns=["snapshot_date"] + SNAPSHOT_COLUMNS)
+    return frame.set_index("snapshot_date").astype(float)
+
+
+def live_snapshot(cursor, user_id, previous):
+    """Today's row from current holdings and live prices; previous is yesterday's snapshot (or None)"""
+    cursor.execute(queries.ACCOUNT_BALANCE, (user_id,))
+    account = cursor.fetchone()
+    cursor.execute(queries.WALLET_HOLDINGS, (user_id,))
+    holdings = cursor.fetchall()
+    cursor.execute(queries.NET_INVESTED_SINCE, (user_id, market_today()))
+    net_today = float(cursor.fetchone()["net_invested"] or 0)
+
+    market_value = previous["market_value"] if previous is not None else 0.0
+    if holdings:
+        closes = get_recent_closes([row["symbol"] for row in holdings])
+        if not closes.empty:
+            market_value = float(compute_wallet_frame(holdings, closes)["marketValue"].sum())
+    else:
+        market_value = 0.0
+
+    return {
+        "market_value": market_value,
+        "cost_basis": (previous["cost_basis"] if previous is not None else 0.0) + net_today,
+        "cash_balance": float(account["balance"] or 0),
+    }
+
+
+def backfill_and_read(user_id, start, end):
+    """(Re)write a user's snapshots for [start, end] and read them back from the primary (replicas may lag)"""
+    backfill_snapshots(start, end, [user_id])
+    conn = init_db()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return read_snapshots(cursor, user_id, start, end)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def read_or_backfill(cursor, user_id, start, end):
+    """Snapshots for [start, end], backfilling the user's range first if any day is missing"""
+    past = read_snapshots(cursor, user_id, start, end)
+    if len(past) < (end - start).days + 1:
+        past = backfill_and_read(user_id, start, end)
+    return past
+
+
+def past_series(cursor, user_id, start, yesterday):
+    """
+    The user's snapshots for [start, yesterday], reusing the cached timeline:
+    unchanged latest transaction -> only days after the cached ones are read;
+    new transactions -> snapshots are recomputed from the earliest new trade's date on.
+    """
+    cursor.execute(queries.LATEST_TRANSACTION_ID, (user_id,))
+    latest_id = cursor.fetchone()["latest_id"]
+
+    cached = TIMELINES.get(user_id)
+    if cached is None or (latest_id or 0) < (cached.latest_id or 0):
+        # Unknown user, or transactions were deleted: nothing to build on
+        past = read_or_backfill(cursor, user_id, start, yesterday)
+        TIMELINES.put(user_id, latest_id, past, "full")
+        return past
+
+    past = cached.frame
+    outcome = "hit"
+    if latest_id != cached.latest_id:
+        cursor.execute(queries.FIRST_TRADE_AFTER, (user_id, cached.latest_id or 0))
+        first_new = cursor.fetchone()["first_date"]
+        recompute_from = max(first_new.date(), start) if first_new else yesterday + timedelta(days=1)
+        if recompute_from <= yesterday:
+            past = pd.concat([past[past.index < recompute_from],
+                              backfill_and_read(user_id, recompute_from, yesterday)])
+        outcome = "recompute"
+
+    last_day = past.index[-1] if len(past) else start - timedelta(days=1)
+    if last_day < yesterday:
+        past = pd.concat([past, read_or_backfill(cursor, user_id, max(last_day + timedelta(days=1), start),
+                                                 yesterday)])
+        outcome = "extend" if outcome == "hit" else outcome
+    past = past[past.index >= start]
+
+    TIMELINES.put(user_id, latest_id, past, outcome)
+    return past
+
+
+def get_daily_series(user_id, days=HISTORY_DAYS):
+    """
+    One row per day for the last `days` days plus today: past days come from the
+    user's cached timeline, topped up from portfolio_daily_snapshots with range
+    scans on a read replica (missing days are backfilled first); today is computed live.
+    None if the user has no account.
+    """
+    user_id = int(user_id)
+    today = market_today()
+    start = today - timedelta(days=days)
+    yesterday = today - timedelta(days=1)
+
+    conn = init_read_db(user_id)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(queries.ACCOUNT_BALANCE, (user_id,))
+        if cursor.fetchone() is None:
+            return None
+
+        with TIMELINES.lock_for(user_id):
+            past = past_series(cursor, user_id, start, yesterday)
+
+        series = past.copy()
+        previous = past.iloc[-1] if len(past) else None
+        series.loc[today] = pd.Series(live_snapshot(cursor, user_id, previous))
+    finally:
+        cursor.close()
+        conn.close()
+    return series
+
+
+SNAPSHOT_JOB = register_job(PeriodicJob("daily-snapshots", take_daily_snapshots, seconds_until_snapshot))
+
+
+if __name__ == '__main__':
+    # python -m utils.snapshots --backfill 365   (run from the server directory)
+    parser = argparse.ArgumentParser(description="Write daily portfolio snapshots")
+    parser.add_argument("--backfill", type=int, metavar="DAYS",
+                        help="rewrite the last DAYS days for every user instead of appending the latest day")
+    args = parser.parse_args()
+    if args.backfill:
+        end = last_closed_day()
+        written = backfill_snapshots(end - timedelta(days=args.backfill), end)
+    else:
+        written = take_daily_snapshots()
+    print(f"{written} snapshot rows written")
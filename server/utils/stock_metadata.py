@@ -0,0 +1,87 @@
+import time
+
+from config import CONFIG
+from db import init_db
+from utils.market_data import BACKGROUND_POOL, fetch_concurrently
+from utils.market_provider import get_provider
+from utils.scheduler import PeriodicJob, register_job
+
+UNKNOWN = "Unknown"
+
+# Full refreshes are counted from process start so a restart does not refetch everything
+_last_full_refresh = time.time()
+
+
+def fetch_metadata(symbol):
+    """company_name/sector/industry from yfinance .info (slow; never call on a request path)"""
+    info = get_provider().ticker_info(symbol)
+    return {
+        "company_name": info.get("longName", info.get("shortName", UNKNOWN)),
+        "sector": info.get("sector", UNKNOWN),
+        "industry": info.get("industry", UNKNOWN),
+    }
+
+
+def _store_metadata(metadata):
+    """Write {symbol: metadata} to the stocks table in one batched statement"""
+    rows = [(m["company_name"], m["sector"], m["industry"], symbol)
+            for symbol, m in metadata.items() if m]
+    if not rows:
+        return 0
+    conn = init_db()
+    cursor = conn.cursor()
+    cursor.executemany("""
+        UPDATE stocks SET company_name = %s, sector = %s, industry = %s, metadata_checked_at = NOW()
+        WHERE symbol = %s
+    """, rows)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return len(rows)
+
+
+def _symbols(where="", params=()):
+    conn = init_db()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT DISTINCT symbol FROM stocks {where}", params)
+    symbols = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return symbols
+
+
+def refresh_symbols(symbols):
+    """Fetch metadata for symbols concurrently and store everything that came back"""
+    if not symbols:
+        return 0
+    metadata, stale = fetch_concurrently(fetch_metadata, symbols, CONFIG.METADATA_FETCH_TIMEOUT_SECONDS, "metadata",
+                                         pool=BACKGROUND_POOL)
+    return _store_metadata({symbol: m for symbol, m in metadata.items() if symbol not in stale})
+
+
+def backfill_missing_metadata():
+    """
+    Fill in stocks rows whose name, sector or industry was never stored. Yahoo has no
+    sector for some symbols (ETFs, funds), so a row fetched within METADATA_TTL_SECONDS
+    is left alone even if it still says 'Unknown'.
+    """
+    missing = _symbols("""
+        WHERE (company_name IS NULL OR sector IS NULL OR industry IS NULL
+               OR company_name = 'Unknown' OR sector = 'Unknown' OR industry = 'Unknown')
+          AND (metadata_checked_at IS NULL OR metadata_checked_at < NOW() - INTERVAL %s SECOND)
+    """, (CONFIG.METADATA_TTL_SECONDS,))
+    return refresh_symbols(missing)
+
+
+def refresh_metadata():
+    """Backfill missing rows every run; refresh every row once per METADATA_TTL_SECONDS"""
+    global _last_full_refresh
+    updated = backfill_missing_metadata()
+    if time.time() - _last_full_refresh >= CONFIG.METADATA_TTL_SECONDS:
+        _last_full_refresh = time.time()
+        updated += refresh_symbols(_symbols())
+    return updated
+
+
+METADATA_REFRESHER = register_job(PeriodicJob("metadata-refresher", refresh_metadata,
+                                              CONFIG.METADATA_REFRESH_SECONDS))
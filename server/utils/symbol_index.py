@@ -0,0 +1,232 @@
+import argparse
+import csv
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from config import CONFIG
+from db import init_db
+from utils.market_data import BACKGROUND_POOL
+from utils.market_provider import get_provider
+from utils.quote_cache import QUOTE_CACHE
+
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+class SymbolIndex:
+    """
+    In-memory symbol/company search. Symbols are kept in a sorted array and
+    company-name tokens in a sorted (token, entry) array, so prefix lookups are
+    a bisect plus a short scan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []        # result dicts, same shape as /search results
+        self._by_symbol = {}      # SYMBOL -> entry position
+        self._symbols = []        # sorted SYMBOLs
+        self._name_tokens = []    # sorted (token, entry position)
+        self.built = False
+        self.partial = True       # only the seed listing is loaded, not the full one
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_many(self, entries, replace=True):
+        """Add entries ({symbol, name, type, region, currency}) and re-sort once"""
+        with self._lock:
+            entries_list = list(self._entries)
+            by_symbol = dict(self._by_symbol)
+            for entry in entries:
+                symbol = (entry.get("symbol") or "").upper()
+                if not symbol:
+                    continue
+                entry = {
+                    "symbol": symbol,
+                    "name": entry.get("name") or "",
+                    "type": entry.get("type") or "Equity",
+                    "region": entry.get("region") or "United States",
+                    "currency": entry.get("currency") or "USD",
+                }
+                if symbol in by_symbol:
+                    if replace:
+                        entries_list[by_symbol[symbol]] = entry
+                else:
+                    by_symbol[symbol] = len(entries_list)
+                    entries_list.append(entry)
+
+            # Build new arrays and swap them in, so searches never see a half-built index
+            self._symbols = sorted(by_symbol)
+            self._name_tokens = sorted(
+                (token, pos) for pos, entry in enumerate(entries_list) for token in set(_tokens(entry["name"]))
+            )
+            self._entries = entries_list
+            self._by_symbol = by_symbol
+
+    def _symbol_prefix(self, prefix):
+        symbols = self._symbols
+        i = bisect_left(symbols, prefix)
+        while i < len(symbols) and symbols[i].startswith(prefix):
+            yield self._by_symbol[symbols[i]]
+            i += 1
+
+    def _token_prefix(self, prefix):
+        tokens = self._name_tokens
+        i = bisect_left(tokens, (prefix, -1))
+        matches = set()
+        while i < len(tokens) and tokens[i][0].startswith(prefix):
+            matches.add(tokens[i][1])
+            i += 1
+        return matches
+
+    def search(self, query, limit=10):
+        """Exact symbol, then symbol prefix (shortest first), then company names matching every query word"""
+        with self._lock:
+            entries = self._entries
+            symbol_query = query.strip().upper()
+            ranked = []
+            seen = set()
+
+            symbol_matches = sorted(self._symbol_prefix(symbol_query), key=lambda pos: len(entries[pos]["symbol"]))
+            for pos in symbol_matches:
+                ranked.append(pos)
+                seen.add(pos)
+
+            words = _tokens(query)
+            if words:
+                name_matches = self._token_prefix(words[0])
+                for word in words[1:]:
+                    name_matches &= self._token_prefix(word)
+                for pos in sorted(name_matches - seen, key=lambda pos: len(entries[pos]["name"])):
+                    ranked.append(pos)
+
+            return [dict(entries[pos]) for pos in ranked[:limit]]
+
+
+def load_listing_file(path):
+    """Rows from an Alpha Vantage LISTING_STATUS csv (symbol,name,exchange,assetType,...)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [{"symbol": row.get("symbol"), "name": row.get("name"), "type": row.get("assetType")}
+                for row in csv.DictReader(f) if (row.get("status") or "Active") == "Active"]
+
+
+def load_stocks_table():
+    conn = init_db()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT symbol, company_name AS name FROM stocks")
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def _listing_age(path):
+    return time.time() - os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def build_index():
+    """
+    (Re)build SYMBOL_INDEX from the listing files and the stocks table. Until the
+    full listing has been downloaded (in the background) the index only knows the
+    seed listing, and most searches still go to Alpha Vantage.
+    """
+    SYMBOL_INDEX.add_many(load_listing_file(CONFIG.SYMBOL_LISTING_PATH))
+    full = load_listing_file(CONFIG.SYMBOL_FULL_LISTING_PATH)
+    SYMBOL_INDEX.add_many(full)
+    SYMBOL_INDEX.partial = not full
+    try:
+        # Symbols we trade but the listing does not know about
+        SYMBOL_INDEX.add_many(load_stocks_table(), replace=False)
+    except Exception as e:
+        print(f"Error loading stocks for symbol index: {e}")
+    SYMBOL_INDEX.built = True
+
+    age = _listing_age(CONFIG.SYMBOL_FULL_LISTING_PATH)
+    if age is None or age > CONFIG.SYMBOL_LISTING_REFRESH_SECONDS:
+        _download_in_background()
+
+
+_build_lock = threading.Lock()
+_download_lock = threading.Lock()
+_downloading = False
+
+
+def _download_in_background():
+    global _downloading
+    with _download_lock:
+        if _downloading:
+            return
+        _downloading = True
+
+    def download():
+        global _downloading
+        try:
+            download_listing(CONFIG.SYMBOL_FULL_LISTING_PATH)
+            SYMBOL_INDEX.add_many(load_listing_file(CONFIG.SYMBOL_FULL_LISTING_PATH))
+            SYMBOL_INDEX.partial = False
+        except Exception as e:
+            print(f"Error downloading the symbol listing: {e}")
+        finally:
+            with _download_lock:
+                _downloading = False
+
+    BACKGROUND_POOL.submit(download)
+
+
+def alpha_vantage_search(query):
+    """Alpha Vantage SYMBOL_SEARCH, cached per query (failures and rate limits are not cached)"""
+    return QUOTE_CACHE.get("symbol_search", query.lower(), lambda: get_provider().search(query))
+
+
+def search_symbols(query, limit=10):
+    """Local index first; Alpha Vantage only when nothing matches locally"""
+    if not SYMBOL_INDEX.built:
+        # Concurrent first searches wait for one build instead of each loading the listings
+        with _build_lock:
+            if not SYMBOL_INDEX.built:
+                build_index()
+    results = SYMBOL_INDEX.search(query, limit)
+    if results:
+        return results
+
+    try:
+        results = alpha_vantage_search(query)
+    except Exception as e:
+        print(f"Alpha Vantage search failed for {query!r}: {e}")
+        return []
+    # Remember what Alpha Vantage found so the next search for it is local
+    SYMBOL_INDEX.add_many(results)
+    return results
+
+
+def download_listing(path):
+    """
+    Save Alpha Vantage's full LISTING_STATUS csv (one API call) as a listing file.
+    The file is only replaced by a real csv, never by a rate-limit message.
+    """
+    listing = get_provider().listing()
+    if not listing.startswith("symbol,"):
+        raise RuntimeError(f"Unexpected LISTING_STATUS answer: {listing[:200]}")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(listing)
+    os.replace(tmp_path, path)
+
+
+SYMBOL_INDEX = SymbolIndex()
+
+
+if __name__ == '__main__':
+    # python -m utils.symbol_index --download   (run from the server directory)
+    parser = argparse.ArgumentParser(description="Manage the local symbol listing used by /search")
+    parser.add_argument("--download", action="store_true", help="download the full Alpha Vantage LISTING_STATUS now")
+    args = parser.parse_args()
+    if args.download:
+        download_listing(CONFIG.SYMBOL_FULL_LISTING_PATH)
+    print(f"{len(load_listing_file(CONFIG.SYMBOL_LISTING_PATH))} symbols in {CONFIG.SYMBOL_LISTING_PATH}")
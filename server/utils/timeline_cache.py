@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+from config import CONFIG
+
+# latest_id is the id of the newest transaction the frame accounts for (None: no trades yet)
+Timeline = namedtuple("Timeline", ["latest_id", "frame"])
+
+
+class TimelineCache:
+    """
+    Per-user daily series (see utils/snapshots.get_daily_series), kept between
+    requests. An entry stays valid for as long as the user's latest transaction id
+    does not change; callers extend or partially recompute it instead of rebuilding.
+    Bounded, least recently used users are evicted first.
+    """
+
+    def __init__(self, max_users):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # user_id -> Timeline
+        self._user_locks = {}
+        self.counts = {"hit": 0, "extend": 0, "recompute": 0, "full": 0}
+
+    def lock_for(self, user_id):
+        """One lock per user, so concurrent requests for a user build the series once"""
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            return entry
+
+    def put(self, user_id, latest_id, frame, outcome):
+        with self._lock:
+            self._entries[user_id] = Timeline(latest_id, frame)
+            self._entries.move_to_end(user_id)
+            self.counts[outcome] += 1
+            while len(self._entries) > self.max_users:
+                evicted, _ = self._entries.popitem(last=False)
+                self._user_locks.pop(evicted, None)
+
+    def invalidate(self, user_ids=None):
+        """Forget some users (default: everyone), e.g. after their snapshots were rewritten"""
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._entries), **self.counts}
+
+
+TIMELINES = TimelineCache(max_users=CONFIG.TIMELINE_CACHE_MAX_USERS)
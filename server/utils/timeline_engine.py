@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# A ledger as parallel arrays, one entry per trade: day = days since the timeline's
+# first day, code = column of the symbol in `symbols`
+Trades = namedtuple("Trades", ["day", "code", "symbols", "signed_qty", "amount"])
+
+
+def ledger_arrays(ledger, origin):
+    """Trades of a ledger frame (symbol, transaction_type, quantity, price, transaction_date)"""
+    day = (pd.to_datetime(ledger["transaction_date"]).dt.normalize() - pd.Timestamp(origin)).dt.days.to_numpy()
+    code, symbols = pd.factorize(ledger["symbol"], sort=True)
+    signed_qty = np.where(ledger["transaction_type"].to_numpy() == "buy", 1.0, -1.0) \
+        * ledger["quantity"].to_numpy(dtype=float)
+    return Trades(day, code, list(symbols), signed_qty, signed_qty * ledger["price"].to_numpy(dtype=float))
+
+
+def forward_fill(matrix):
+    """Each NaN replaced by the last value above it in its column (NaN until the first value)"""
+    rows = np.where(np.isnan(matrix), 0, np.arange(len(matrix))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return matrix[rows, np.arange(matrix.shape[1])]
+
+
+def price_matrix(closes, symbols, days):
+    """
+    len(days) x len(symbols) closes from a DatetimeIndex x symbol frame: every day
+    carries the latest close on or before it (weekends, holidays), 0 before the first.
+    """
+    if closes.empty:
+        return np.zeros((len(days), len(symbols)))
+    closes = closes.reindex(columns=symbols)
+    index = closes.index.union(days)
+    dense = forward_fill(closes.reindex(index).to_numpy(dtype=float))
+    return np.nan_to_num(dense[index.get_indexer(days)], nan=0.0)
+
+
+def compute_timeline(trades, prices, balance):
+    """
+    Daily positions, market value, cost basis (net amount invested) and cash over
+    the days of `prices` (days x symbols):
+    positions are the cumulative sum of each trade's signed quantity placed on its
+    day in a dense days x symbols matrix, market value their row-wise product with
+    prices, and cash is rebuilt backwards from the current balance.
+    """
+    n_days, n_symbols = prices.shape
+    flat = trades.day * n_symbols + trades.code
+    deltas = np.bincount(flat, weights=trades.signed_qty, minlength=n_days * n_symbols).reshape(n_days, n_symbols)
+    positions = np.cumsum(deltas, axis=0)
+    invested = np.cumsum(np.bincount(trades.day, weights=trades.amount, minlength=n_days))
+    return {
+        "positions": positions,
+        "market_value": np.einsum("ij,ij->i", positions, prices),
+        "cost_basis": invested,
+        "cash_balance": float(balance) + invested[-1] - invested,
+    }
@@ -0,0 +1,213 @@
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from mysql.connector import errorcode
+from mysql.connector.errors import DatabaseError
+
+import queries
+from db import pin_to_primary
+from utils.market_data import get_ticker_info
+from utils.stock_metadata import UNKNOWN
+from utils.symbol_index import SYMBOL_INDEX
+
+CENT = Decimal("0.01")
+# A deadlock victim's transaction is rolled back entirely, so the trade can simply be retried
+DEADLOCK_RETRIES = 3
+RETRYABLE = {errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT}
+
+
+class TradeRejected(Exception):
+    """The order is valid but cannot be filled (no account, not enough cash or shares)"""
+
+
+class StockIdCache:
+    """
+    symbol -> stocks.id. Ids never change once a row exists, so entries are kept for
+    the life of the process; only symbols the stocks table knows about are cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, cursor, symbol):
+        """The symbol's id, or None when it is not in the stocks table"""
+        with self._lock:
+            stock_id = self._ids.get(symbol)
+            if stock_id is not None:
+                self.hits += 1
+                return stock_id
+            self.misses += 1
+        cursor.execute(queries.STOCK_ID_BY_SYMBOL, (symbol,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        stock_id = row["id"] if isinstance(row, dict) else row[0]
+        self.put(symbol, stock_id)
+        return stock_id
+
+    def resolve(self, conn, symbol):
+        """The symbol's id, inserting the stock (with its yfinance metadata) when it is new"""
+        cursor = conn.cursor(dictionary=True)
+        try:
+            stock_id = self.lookup(cursor, symbol)
+            if stock_id is not None:
+                return stock_id
+            # The upstream call happens here, before any row of the trade is locked
+            info = get_ticker_info(symbol)
+            company_name = info.get("longName", UNKNOWN)
+            cursor.execute(queries.INSERT_STOCK, (symbol, company_name, info.get("sector", UNKNOWN),
+                                                  info.get("industry", UNKNOWN)))
+            stock_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            cursor.close()
+        SYMBOL_INDEX.add_many([{"symbol": symbol, "name": company_name}], replace=False)
+        self.put(symbol, stock_id)
+        return stock_id
+
+    def resolve_many(self, cursor, symbols):
+        """
+        {symbol: id} for many symbols in two statements, inserting the new ones without
+        metadata (the metadata refresher fills those in). Does not commit.
+        """
+        with self._lock:
+            ids = {symbol: self._ids[symbol] for symbol in symbols if symbol in self._ids}
+        missing = sorted(set(symbols) - set(ids))
+        if missing:
+            cursor.executemany(queries.INSERT_STOCK, [(symbol, UNKNOWN, UNKNOWN, UNKNOWN) for symbol in missing])
+            cursor.execute(f"SELECT id, symbol FROM stocks WHERE symbol IN ({', '.join(['%s'] * len(missing))})",
+                           tuple(missing))
+            for row in cursor.fetchall():
+                ids[row["symbol"]] = row["id"]
+            # Not cached yet: the inserts are only real once the caller commits
+        return ids
+
+    def put(self, symbol, stock_id):
+        with self._lock:
+            self._ids[symbol] = stock_id
+
+    def stats(self):
+        with self._lock:
+            return {"symbols": len(self._ids), "hits": self.hits, "misses": self.misses}
+
+
+STOCK_IDS = StockIdCache()
+
+
+def apply_fill(action, quantity, price, balance, held, average_cost):
+    """
+    (new balance, new quantity, new average cost) after a fill, or TradeRejected.
+    Selling leaves the average cost of the remaining shares unchanged.
+    """
+    total = quantity * price
+    if action == "buy":
+        if balance < total:
+            raise TradeRejected("Insufficient balance for this purchase")
+        new_quantity = held + quantity
+        new_average = ((average_cost * held + total) / new_quantity).quantize(CENT, ROUND_HALF_UP)
+        return balance - total, new_quantity, new_average
+    if held < quantity:
+        raise TradeRejected(f"Insufficient shares. You own {held} shares but trying to sell {quantity}")
+    return balance + total, held - quantity, average_cost
+
+
+def check_order(symbol, action, quantity, price):
+    """Normalized (symbol, quantity, price) of an order, or ValueError"""
+    symbol = symbol.upper()
+    quantity = Decimal(quantity)
+    price = Decimal(price)
+    if action not in ("buy", "sell"):
+        raise ValueError("Action must be 'buy' or 'sell'")
+    if quantity <= 0 or price <= 0:
+        raise ValueError("Quantity and price must be positive")
+    return symbol, quantity, price
+
+
+def order_stock_id(conn, symbol, action):
+    """stocks.id to trade: buying may add the stock, selling one nobody holds is rejected"""
+    if action == "buy":
+        return STOCK_IDS.resolve(conn, symbol)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        stock_id = STOCK_IDS.lookup(cursor, symbol)
+    finally:
+        cursor.close()
+    if stock_id is None:
+        raise TradeRejected(f"You don't own any shares of {symbol}")
+    return stock_id
+
+
+def place_trade(conn, user_id, symbol, action, quantity, price, when=None):
+    """
+    Fill one order as a single transaction: lock the account row (and the holding,
+    if any) with SELECT ... FOR UPDATE, write holding, balance and transaction
+    record, commit once. Trades on the same account therefore run one after the
+    other, and a failure leaves none of the writes behind.
+    Returns the fill details; raises TradeRejected when it cannot be filled.
+    """
+    symbol, quantity, price = check_order(symbol, action, quantity, price)
+    when = when or datetime.now()
+    stock_id = order_stock_id(conn, symbol, action)
+
+    for attempt in range(DEADLOCK_RETRIES):
+        # A read earlier on this connection may have opened a snapshot; start from a clean transaction
+        conn.rollback()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            fill = fill_order(cursor, user_id, symbol, stock_id, action, quantity, price, when)
+            conn.commit()
+            pin_to_primary(user_id)
+            return fill
+        except DatabaseError as e:
+            conn.rollback()
+            if e.errno not in RETRYABLE or attempt == DEADLOCK_RETRIES - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def fill_order(cursor, user_id, symbol, stock_id, action, quantity, price, when):
+    """
+    The writes of one fill inside the caller's transaction (nothing is committed).
+    Validation happens before the first write, so a TradeRejected leaves the
+    transaction untouched.
+    """
+    cursor.execute(queries.TRADE_ACCOUNT_FOR_UPDATE, (stock_id, user_id))
+    row = cursor.fetchone()
+    if row is None:
+        raise TradeRejected("No account found for this user")
+    holding_id = row["holding_id"]
+    held = Decimal(row["quantity"] or 0)
+    if action == "sell" and held <= 0:
+        raise TradeRejected(f"You don't own any shares of {symbol}")
+
+    balance, remaining, average_cost = apply_fill(action, quantity, price, Decimal(row["balance"] or 0),
+                                                  held, Decimal(row["average_cost"] or 0))
+    if holding_id is None:
+        cursor.execute(queries.INSERT_HOLDING, (row["portfolio_id"], stock_id, remaining, average_cost))
+        holding_id = cursor.lastrowid
+    else:
+        cursor.execute(queries.UPDATE_HOLDING, (remaining, average_cost, holding_id))
+    cursor.execute(queries.UPDATE_BALANCE, (balance, row["account_id"]))
+    cursor.execute(queries.INSERT_TRANSACTION, (holding_id, action, quantity, price, when))
+
+    return {
+        "transaction_id": cursor.lastrowid,
+        "symbol": symbol,
+        "action": action,
+        "quantity": quantity,
+        "price": price,
+        "total": quantity * price,
+        "balance": balance,
+        "remaining_shares": remaining,
+        "average_cost": average_cost,
+    }
@@ -0,0 +1,210 @@
+import argparse
+import io
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+
+import queries
+from db import init_db, pin_to_primary
+from utils.snapshots import backfill_snapshots, last_closed_day
+from utils.trade_engine import STOCK_IDS, TradeRejected, apply_fill
+
+INSERT_CHUNK = 5000
+MAX_REPORTED_ERRORS = 50
+
+# Accepted spellings of each column (brokerage exports disagree)
+COLUMN_ALIASES = {
+    "symbol": ("symbol", "ticker"),
+    "action": ("action", "type", "transaction_type", "side"),
+    "quantity": ("quantity", "qty", "shares"),
+    "price": ("price", "fill_price"),
+    "timestamp": ("timestamp", "date", "transaction_date", "time"),
+}
+
+
+class ImportRejected(ValueError):
+    """The fills cannot be imported as a whole; errors lists what is wrong, by row"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} problem(s) in the imported fills")
+        self.errors = errors[:MAX_REPORTED_ERRORS]
+
+
+def read_fills(payload, fmt):
+    """DataFrame (all strings) of the fills in a CSV document or a JSON list of objects"""
+    if fmt == "csv":
+        return pd.read_csv(io.StringIO(payload), dtype=str, keep_default_na=False, skipinitialspace=True)
+    records = json.loads(payload) if isinstance(payload, (str, bytes)) else payload
+    if isinstance(records, dict):
+        records = records.get("fills", [])
+    frame = pd.DataFrame(records)
+    # Missing keys and nulls become "", not the string "nan" (which would pass as a symbol)
+    return frame.astype(object).where(frame.notna(), "").astype(str)
+
+
+def _decimal(value):
+    try:
+        value = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return value if value.is_finite() else None
+
+
+def parse_fills(frame):
+    """
+    Validate and normalize raw fills: columns symbol, action, quantity (whole shares),
+    price (Decimal) and timestamp, sorted by time (ties keep file order).
+    Raises ImportRejected listing every bad row.
+    """
+    if frame.empty:
+        raise ImportRejected(["no fills to import"])
+    lowered = {str(column).strip().lower(): column for column in frame.columns}
+    columns = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        found = next((lowered[alias] for alias in aliases if alias in lowered), None)
+        if found is None:
+            raise ImportRejected([f"missing column: {name}"])
+        columns[name] = frame[found]
+
+    fills = pd.DataFrame({
+        "row": range(1, len(frame) + 1),
+        "symbol": columns["symbol"].str.strip().str.upper(),
+        "action": columns["action"].str.strip().str.lower(),
+        "quantity": columns["quantity"].map(_decimal),
+        "price": columns["price"].map(_decimal),
+        "timestamp": pd.to_datetime(columns["timestamp"], errors="coerce", format="mixed"),
+    })
+
+    errors = []
+    checks = [
+        (fills["symbol"].eq("") | fills["symbol"].str.len().gt(10), "symbol is missing or too long"),
+        (~fills["action"].isin(["buy", "sell"]), "action must be buy or sell"),
+        (fills["quantity"].map(lambda q: q is None or q <= 0 or q != q.to_integral_value()),
+         "quantity must be a positive whole number"),
+        (fills["price"].map(lambda p: p is None or p <= 0), "price must be positive"),
+        (fills["timestamp"].isna(), "timestamp is not a date"),
+    ]
+    for bad, message in checks:
+        errors.extend((row, message) for row in fills.loc[bad, "row"])
+    if errors:
+        raise ImportRejected([f"row {row}: {message}" for row, message in sorted(errors)])
+
+    return fills.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+def compute_positions(fills, balance, holdings):
+    """
+    Replay fills (in time order) on top of the current balance and holdings
+    ({symbol: (quantity, average_cost)}). Returns (balance, holdings) after the last
+    fill; raises ImportRejected at the first fill that overdraws cash or shares.
+    """
+    holdings = dict(holdings)
+    for row, symbol, action, quantity, price in fills[["row", "symbol", "action", "quantity", "price"]].itertuples(
+            index=False):
+        held, average_cost = holdings.get(symbol, (Decimal(0), Decimal(0)))
+        try:
+            balance, held, average_cost = apply_fill(action, quantity, price, balance, held, average_cost)
+        except TradeRejected as e:
+            raise ImportRejected([f"row {row}: {symbol}: {e}"]) from e
+        holdings[symbol] = (held, average_cost)
+    return balance, holdings
+
+
+def rewrite_snapshots(user_id, since):
+    """
+    Recompute the user's snapshots from since to the last closed day. The cached
+    timeline only notices backdated trades while it is warm, and stored days are
+    never recomputed otherwise.
+    """
+    end = last_closed_day()
+    if since > end:
+        return 0
+    try:
+        return backfill_snapshots(since, end, [user_id])
+    except Exception as e:
+        # The import itself is committed; the next read backfills whatever is missing
+        print(f"Error rewriting snapshots of user {user_id} from {since}: {e}")
+        return 0
+
+
+def import_fills(user_id, fills, conn=None):
+    """
+    Write validated fills (see parse_fills) for one user in a single transaction: the
+    account and its holdings are locked, new stocks and holdings inserted and the
+    transaction records, holdings and balance written with batched statements.
+    The user's daily snapshots from the earliest imported day on are then rewritten
+    (fills are usually backdated). Returns a summary of the resulting positions.
+    """
+    own_conn = conn is None
+    conn = conn or init_db()
+    conn.rollback()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(queries.IMPORT_ACCOUNT_FOR_UPDATE, (user_id,))
+        account = cursor.fetchone()
+        if account is None:
+            raise ImportRejected(["no account found for this user"])
+        cursor.execute(queries.PORTFOLIO_HOLDINGS_FOR_UPDATE, (account["portfolio_id"],))
+        current = {row["symbol"]: (Decimal(row["quantity"] or 0), Decimal(row["average_cost"] or 0))
+                   for row in cursor.fetchall()}
+
+        balance, positions = compute_positions(fills, Decimal(account["balance"] or 0), current)
+        touched = sorted(fills["symbol"].unique())
+        stock_ids = STOCK_IDS.resolve_many(cursor, touched)
+
+        portfolio_id = account["portfolio_id"]
+        cursor.executemany(queries.UPSERT_HOLDING, [
+            (portfolio_id, stock_ids[symbol], positions[symbol][0], positions[symbol][1]) for symbol in touched
+        ])
+        cursor.execute(queries.PORTFOLIO_HOLDINGS_FOR_UPDATE, (portfolio_id,))
+        holding_ids = {row["symbol"]: row["id"] for row in cursor.fetchall()}
+
+        rows = [(holding_ids[symbol], action, quantity, price, timestamp.to_pydatetime())
+                for symbol, action, quantity, price, timestamp
+                in fills[["symbol", "action", "quantity", "price", "timestamp"]].itertuples(index=False)]
+        for i in range(0, len(rows), INSERT_CHUNK):
+            cursor.executemany(queries.INSERT_TRANSACTION, rows[i:i + INSERT_CHUNK])
+        cursor.execute(queries.UPDATE_BALANCE, (balance, account["account_id"]))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+
+    pin_to_primary(user_id)
+    for symbol in touched:
+        STOCK_IDS.put(symbol, stock_ids[symbol])
+    rewrite_snapshots(user_id, fills["timestamp"].min().date())
+    return {
+        "imported": len(rows),
+        "balance": balance,
+        "positions": {symbol: {"quantity": positions[symbol][0], "avg_cost": positions[symbol][1]}
+                      for symbol in touched},
+    }
+
+
+if __name__ == '__main__':
+    # python -m utils.trade_import USER_ID fills.csv   (run from the server directory)
+    parser = argparse.ArgumentParser(description="Import historical fills for a user")
+    parser.add_argument("user_id", type=int)
+    parser.add_argument("path", help="CSV or JSON file of fills ('-' reads stdin)")
+    parser.add_argument("--format", choices=["csv", "json"],
+                        help="default: from the file extension (csv unless it ends in .json)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("json" if args.path.endswith(".json") else "csv")
+    payload = sys.stdin.read() if args.path == "-" else open(args.path, encoding="utf-8").read()
+    started = time.perf_counter()
+    try:
+        summary = import_fills(args.user_id, parse_fills(read_fills(payload, fmt)))
+    except ImportRejected as e:
+        print("\n".join(e.errors))
+        sys.exit(1)
+    print(f"{summary['imported']} fills imported in {time.perf_counter() - started:.1f}s, "
+          f"balance {summary['balance']:.2f}")
@@ -0,0 +1,101 @@
+import base64
+from datetime import date, datetime, timedelta
+
+import queries
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows taken off the (unbuffered) cursor at a time while streaming a whole history
+FETCH_ROWS = 1000
+
+
+def encode_cursor(row):
+    """Opaque cursor of the page after row: its (transaction_date, id) keyset position"""
+    key = f"{row['transaction_date'].isoformat()}|{row['transaction_id']}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        when, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(when), int(transaction_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def parse_transaction_filters(args):
+    """Filters and paging of a /transactions request (ValueError for a malformed one)"""
+    transaction_type = args.get("type", "").lower() or None
+    if transaction_type not in (None, "buy", "sell"):
+        raise ValueError("type must be buy or sell")
+    limit = args.get("limit", type=int)
+    after = decode_cursor(args["cursor"]) if args.get("cursor") else None
+    if after is not None and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        start = date.fromisoformat(args["from"]) if args.get("from") else None
+        end = date.fromisoformat(args["to"]) if args.get("to") else None
+    except ValueError as e:
+        raise ValueError("from and to must be dates (YYYY-MM-DD)") from e
+    return {"symbol": args.get("symbol", "").strip().upper() or None, "transaction_type": transaction_type,
+            "start": start, "end": end, "after": after, "limit": limit}
+
+
+def transactions_query(user_id, symbol=None, transaction_type=None, start=None, end=None, after=None, limit=None):
+    """
+    SQL and parameters for a user's transactions, newest first. end is inclusive;
+    after is the (transaction_date, id) of the last row already returned.
+    """
+    sql = queries.USER_TRANSACTIONS
+    params = [user_id]
+    if symbol:
+        sql += " AND s.symbol = %s"
+        params.append(symbol)
+    if transaction_type:
+        sql += " AND st.transaction_type = %s"
+        params.append(transaction_type)
+    if start:
+        sql += " AND st.transaction_date >= %s"
+        params.append(start)
+    if end:
+        sql += " AND st.transaction_date < %s"
+        params.append(end + timedelta(days=1))
+    if after:
+        when, transaction_id = after
+        sql += " AND (st.transaction_date < %s OR (st.transaction_date = %s AND st.id < %s))"
+        params.extend([when, when, transaction_id])
+    sql += queries.USER_TRANSACTIONS_ORDER
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql, tuple(params)
+
+
+def split_page(rows, limit):
+    """(page, next cursor) from up to limit + 1 rows; the cursor is None on the last page"""
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_cursor(rows[limit - 1])
+
+
+def iter_rows(cursor, fetch_rows=FETCH_ROWS):
+    while True:
+        rows = cursor.fetchmany(fetch_rows)
+        if not rows:
+            return
+        yield from rows
+
+
+def json_array(rows, dumps):
+    """A JSON array written one row at a time"""
+    yield "["
+    for i, row in enumerate(rows):
+        yield ("," if i else "") + dumps(row)
+    yield "]\n"
+
+
+def ndjson(rows, dumps):
+    for row in rows:
+        yield dumps(row) + "\n"
@@ -0,0 +1,157 @@
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import queries
+from config import CONFIG
+from db import init_db, init_read_db
+from utils.market_data import get_recent_closes
+from utils.scheduler import PeriodicJob, register_job
+
+INSERT_CHUNK = 1000
+
+# Every user's holdings as a users x symbols sparse matrix in coordinate form: holding
+# i is quantity[i] shares of symbols[col[i]] held by user_ids[row[i]] at average_cost[i]
+# (a symbol held in several portfolios of one user is several entries)
+Holdings = namedtuple("Holdings", ["user_ids", "symbols", "row", "col", "quantity", "average_cost"])
+
+
+def holdings_matrix(rows, user_ids=()):
+    """
+    Holdings from (user_id, symbol, quantity, average_cost) rows; user_ids adds rows
+    for accounts holding nothing (cash only).
+    """
+    frame = pd.DataFrame(rows, columns=["user_id", "symbol", "quantity", "average_cost"])
+    holders = frame["user_id"].to_numpy(dtype=np.int64)
+    all_users = np.union1d(np.asarray(list(user_ids), dtype=np.int64), holders)
+    col, symbols = pd.factorize(frame["symbol"], sort=True)
+    return Holdings(all_users, list(symbols), np.searchsorted(all_users, holders), col,
+                    frame["quantity"].to_numpy(dtype=float), frame["average_cost"].fillna(0).to_numpy(dtype=float))
+
+
+def latest_prices(symbols):
+    """Latest close of every symbol (NaN when unknown), from one bulk download of the missing ones"""
+    if not symbols:
+        return np.zeros(0)
+    closes = get_recent_closes(symbols)
+    if closes.empty:
+        return np.full(len(symbols), np.nan)
+    return closes.ffill().iloc[-1].reindex(symbols).to_numpy(dtype=float)
+
+
+def value_holdings(holdings, prices, cash):
+    """
+    Price every holding at once against prices (one per symbol; an unpriced symbol is
+    carried at its average cost) and total it per user and per symbol with bincount.
+    cash is aligned with holdings.user_ids. Returns (per-user, per-symbol) dicts of arrays.
+    """
+    n_users, n_symbols = len(holdings.user_ids), len(holdings.symbols)
+    line_price = prices[holdings.col]
+    line_price = np.where(np.isnan(line_price), holdings.average_cost, line_price)
+    value = holdings.quantity * line_price
+    cost = holdings.quantity * holdings.average_cost
+
+    market_value = np.bincount(holdings.row, weights=value, minlength=n_users)
+    cost_basis = np.bincount(holdings.row, weights=cost, minlength=n_users)
+    # Distinct (user, symbol) pairs: a symbol spread over portfolios counts once
+    pairs = np.unique(holdings.row * n_symbols + holdings.col)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_pct = np.where(cost_basis > 0, (market_value - cost_basis) / cost_basis * 100, np.nan)
+
+    users = {
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "cash_balance": np.asarray(cash, dtype=float),
+        "gain_loss": market_value - cost_basis,
+        "return_pct": return_pct,
+        "positions": np.bincount(pairs // max(n_symbols, 1), minlength=n_users),
+    }
+    symbols = {
+        "quantity": np.bincount(holdings.col, weights=holdings.quantity, minlength=n_symbols),
+        "price": prices,
+        "market_value": np.bincount(holdings.col, weights=value, minlength=n_symbols),
+        "holders": np.bincount(pairs % max(n_symbols, 1), minlength=n_symbols),
+    }
+    return users, symbols
+
+
+def _money(value, places=2):
+    return None if np.isnan(value) else round(float(value), places)
+
+
+def write_valuations(cursor, valued_at, holdings, users, symbols):
+    """Upsert this run's rows and drop those of users and symbols it no longer saw"""
+    user_rows = [(int(user_id), valued_at, _money(users["market_value"][i]), _money(users["cost_basis"][i]),
+                  _money(users["cash_balance"][i]), _money(users["gain_loss"][i]),
+                  _money(users["return_pct"][i], 4), int(users["positions"][i]))
+                 for i, user_id in enumerate(holdings.user_ids)]
+    symbol_rows = [(symbol, valued_at, int(symbols["quantity"][i]), _money(symbols["price"][i], 4),
+                    _money(symbols["market_value"][i]), int(symbols["holders"][i]))
+                   for i, symbol in enumerate(holdings.symbols)]
+
+    for i in range(0, len(user_rows), INSERT_CHUNK):
+        cursor.executemany("""
+            INSERT INTO portfolio_valuations
+                (user_id, valued_at, market_value, cost_basis, cash_balance, gain_loss, return_pct, positions)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE valued_at = VALUES(valued_at), market_value = VALUES(market_value),
+                                    cost_basis = VALUES(cost_basis), cash_balance = VALUES(cash_balance),
+                                    gain_loss = VALUES(gain_loss), return_pct = VALUES(return_pct),
+                                    positions = VALUES(positions)
+        """, user_rows[i:i + INSERT_CHUNK])
+    for i in range(0, len(symbol_rows), INSERT_CHUNK):
+        cursor.executemany("""
+            INSERT INTO symbol_exposure (symbol, valued_at, quantity, price, market_value, holders)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE valued_at = VALUES(valued_at), quantity = VALUES(quantity),
+                                    price = VALUES(price), market_value = VALUES(market_value),
+                                    holders = VALUES(holders)
+        """, symbol_rows[i:i + INSERT_CHUNK])
+    cursor.execute("DELETE FROM portfolio_valuations WHERE valued_at < %s", (valued_at,))
+    cursor.execute("DELETE FROM symbol_exposure WHERE valued_at < %s", (valued_at,))
+    return len(user_rows), len(symbol_rows)
+
+
+def run_valuation():
+    """
+    Value every account from one read of all holdings and one price per distinct
+    symbol, and rewrite portfolio_valuations and symbol_exposure.
+    Returns {"users": rows written, "symbols": rows written}.
+    """
+    valued_at = datetime.now().replace(microsecond=0)
+    conn = init_read_db()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(queries.ACCOUNT_BALANCES)
+        balances = {row["user_id"]: row["balance"] or 0 for row in cursor.fetchall()}
+        cursor.execute(queries.ALL_HOLDINGS)
+        rows = [(row["user_id"], row["symbol"], row["quantity"], row["average_cost"]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+    holdings = holdings_matrix(rows, balances)
+    # The only network work of the run, and it grows with distinct symbols, not users
+    prices = latest_prices(holdings.symbols)
+    cash = [float(balances.get(int(user_id), 0)) for user_id in holdings.user_ids]
+    users, symbols = value_holdings(holdings, prices, cash)
+
+    conn = init_db()
+    cursor = conn.cursor()
+    try:
+        written = write_valuations(cursor, valued_at, holdings, users, symbols)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    return {"users": written[0], "symbols": written[1]}
+
+
+VALUATION_JOB = register_job(PeriodicJob("portfolio-valuation", run_valuation, CONFIG.VALUATION_INTERVAL_SECONDS))
+
+
+if __name__ == '__main__':
+    # python -m utils.valuation   (run from the server directory)
+    print(run_valuation())